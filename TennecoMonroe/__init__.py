@@ -18,7 +18,6 @@ from global_db.extractors.functions import extract_Exitoffice
 
 from TennecoMonroe.config.coords import first_page_coords, totals_page_coords
 from TennecoMonroe.config.key_maps import first_page_key_map, totals_page_key_map, table_page_key_map
-from global_db.countries.countries import countries
 
 def main(req: func.HttpRequest) -> func.HttpResponse:
     logging.info('Processing file upload request.')
@@ -158,7 +157,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             #cast it to json
             #result = json.loads(extracted_items)
             #update countries to abbr
-            #result = abbr_countries_in_items(result, countries)
+            #result = abbr_countries_in_items(result)
             #update the numbers type
             #result = normalize_the_items_numbers(result)
             result = add_inv_date_to_items(extracted_items, first_page_data.get("Inv No", ""))
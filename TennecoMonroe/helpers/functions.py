@@ -3,6 +3,8 @@ import re
 
 import fitz
 
+from global_db.countries.functions import get_abbreviation_by_country
+
 def clean_data_from_texts_that_above_value(text):
     """
     Cleans the input text by removing any text that appears above a specified value.
@@ -21,18 +23,12 @@ def clean_VAT(VAT_number):
     else:
         return ""
 
-def get_abbreviation_by_country(countries, country_name):
-    for entry in countries:
-        if entry["country"].lower() == country_name.lower():
-            return entry["abbreviation"]
-    return country_name   
-
 def is_valid_number(s):
     # Regex pattern for a valid number (integer or float)
     pattern = r'^[0-9.,]*$'  # Matches integers and floats, including negative numbers
     return bool(re.match(pattern, s))
 
-def abbr_countries_in_items(result, countries):
+def abbr_countries_in_items(result):
     for item in result:
         origin = item.get("Origin", "").split('\n')
         if len(origin) > 1:
@@ -40,7 +36,7 @@ def abbr_countries_in_items(result, countries):
                 if len(itm) < 2:
                     origin.remove(itm)
         origin = ''.join(origin)            
-        item["Origin"] = get_abbreviation_by_country(countries, origin)
+        item["Origin"] = get_abbreviation_by_country(origin)
     return result
 
 def normalize_numbers(s):
@@ -51,7 +51,7 @@ def process_container_data(data):
 
     # If incoterm is not provided, set it to an empty array
     if len(incoterm_array) > 1:
-        dispatch_country = search_ports(incoterm_array[1])
+        dispatch_country = search_ports(" ".join(incoterm_array[1:]))  # the place may span several words
     else:
         dispatch_country = ""    
 
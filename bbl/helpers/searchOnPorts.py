@@ -1,10 +1,6 @@
-from bbl.data.data import ports
+from global_db.ports.functions import get_port_country_code
 
 def search_ports(search_value):
-    # Iterate through the list of dictionaries to find the matching port
-    for port in ports:
-        if port["Port"].lower() == search_value.lower():  # Case-insensitive comparison
-            return port["Country Code"]
-    
-    # If no match is found, return a message
-    return ""
\ No newline at end of file
+    # Country code of the named port, "" when it is not in the ports table.
+    # Resolution (spelling variants, "CIF <port>", truncations) lives in global_db.ports.functions.
+    return get_port_country_code(search_value)
\ No newline at end of file
@@ -14,7 +14,6 @@ from capsugel.helpers.functions import extract_date, extract_vat_number, print_j
 from capsugel.service.extractors import another_version, extract_customs_code_from_pdf_invoice, extract_customs_code_from_text, extract_data_from_pdf, extract_exitoffices_from_body, extract_structured_data_from_pdf_invoice, extract_text_from_last_page, extract_text_from_first_page, find_page_in_invoice, merge_incomplete_objects_invoice, merge_incomplete_records_invoice
 
 from capsugel.config.coords import coordinates, coordinates_be, coordinates_it, coordinates_fr, coordinates_lastpage, coordinates_lastpage_fr, key_map, inv_keyword_params, inv_keyword_params_it, inv_keyword_params_de, inv_keyword_params_fr, fallback_inv_keywords, packingList_keyword_params
-from capsugel.data.countries import countries
 from capsugel.data.keys import invoice_keys, packing_list_keys, invoice_keys_de, invoice_keys_it, invoice_keys_fr
 
 from capsugel.service.language_detection import detect_language
@@ -129,7 +128,7 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
                 parser = AddressParser()
                 parsed_result = parser.parse_address(address)
                 data_1["ship to"] = parsed_result
-                #data_1["ship to"] = get_address_structure(data_1["ship to"], countries)
+                #data_1["ship to"] = get_address_structure(data_1["ship to"])
                 
                 pattern = re.compile(r'[\(]?(incoterms[:]? 2010|incoterms:|incoterms)[\)]?', re.IGNORECASE)
                 
@@ -190,7 +189,7 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
                 logging.error(f"Keyword params2: {keyword_params}")
                 data_3 = merge_incomplete_objects_invoice(data_3)
                 logging.error(f"Keyword params3: {keyword_params}")
-                data_3 = clean_invoice_data(data_3, countries) 
+                data_3 = clean_invoice_data(data_3) 
                 
                 #clean the unwanted stuff
                 data_3 = [item for item in data_3 if item]
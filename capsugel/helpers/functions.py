@@ -3,6 +3,8 @@ import logging
 import fitz
 import re
 
+from global_db.countries.functions import get_abbreviation_by_country
+
 def print_json_to_file(data, filename="output.txt"):
     with open(filename, 'w') as f:
         f.write(data)
@@ -65,13 +67,7 @@ def remove_non_numeric_chars(s):
     """
     return re.sub(r'[^0-9.,]', '', s)
 
-def get_abbreviation_by_country(countries, country_name):
-    for entry in countries:
-        if entry["country"].lower() == country_name.lower():
-            return entry["abbreviation"]
-    return country_name 
-
-def clean_invoice_data (result, countries):
+def clean_invoice_data (result):
     for obj in result:
         for key, value in obj.items():
             if key == "Commodity Code of country of dispatch:" or key == "DN Nbr:" or key == "Batches:" or key == "Codice delle merci del paese di spedizione:":
@@ -86,7 +82,7 @@ def clean_invoice_data (result, countries):
                     country = value    
                 
                 #clean and update the country
-                obj[key] = get_abbreviation_by_country(countries, country)
+                obj[key] = get_abbreviation_by_country(country)
             elif key == "Net Weight:" or key == "Nettogewicht:" or key == "Peso netto" or key == "Poids net: ":
                 #clean and update the net weight
                 obj[key] = safe_float_conversion(normalize_number_format(remove_non_numeric_chars(value)))
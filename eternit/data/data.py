@@ -1,96 +1,10 @@
-ports = [
-    {"Port": "BANGKOK", "Country": "Thailand", "Country Code": "TH"},
-    {"Port": "BELAWAN", "Country": "Indonesia", "Country Code": "ID"},
-    {"Port": "BUSAN", "Country": "South Korea", "Country Code": "KR"},
-    {"Port": "CALCUTTA", "Country": "India", "Country Code": "IN"},
-    {"Port": "CEBU", "Country": "Philippines", "Country Code": "PH"},
-    {"Port": "CHANGSHU", "Country": "China", "Country Code": "CN"},
-    {"Port": "CHAOZHOU", "Country": "China", "Country Code": "CN"},
-    {"Port": "CHENGDU", "Country": "China", "Country Code": "CN"},
-    {"Port": "CHENNAI", "Country": "India", "Country Code": "IN"},
-    {"Port": "CHITTAGONG", "Country": "Bangladesh", "Country Code": "BD"},
-    {"Port": "CHIWAN", "Country": "China", "Country Code": "CN"},
-    {"Port": "CHONG QING", "Country": "China", "Country Code": "CN"},
-    {"Port": "COCHIN", "Country": "India", "Country Code": "IN"},
-    {"Port": "COLOMBO", "Country": "Sri Lanka", "Country Code": "LK"},
-    {"Port": "DA NANG", "Country": "Vietnam", "Country Code": "VN"},
-    {"Port": "DALIAN", "Country": "China", "Country Code": "CN"},
-    {"Port": "ENNORE", "Country": "India", "Country Code": "IN"},
-    {"Port": "DONG GUAN", "Country": "China", "Country Code": "CN"},
-    {"Port": "FANGCHENG", "Country": "China", "Country Code": "CN"},
-    {"Port": "FOSHAN", "Country": "China", "Country Code": "CN"},
-    {"Port": "FUQING", "Country": "China", "Country Code": "CN"},
-    {"Port": "FUZHOU", "Country": "China", "Country Code": "CN"},
-    {"Port": "GUANGDONG", "Country": "China", "Country Code": "CN"},
-    {"Port": "GUANGZHOU", "Country": "China", "Country Code": "CN"},
-    {"Port": "H.C.M.C.", "Country": "Vietnam", "Country Code": "VN"},
-    {"Port": "HAIPHONG", "Country": "Vietnam", "Country Code": "VN"},
-    {"Port": "HONG KONG", "Country": "Hong Kong (SAR of China)", "Country Code": "HK"},
-    {"Port": "HUANGPU", "Country": "China", "Country Code": "CN"},
-    {"Port": "JAKARTA", "Country": "Indonesia", "Country Code": "ID"},
-    {"Port": "JIANGMEN", "Country": "China", "Country Code": "CN"},
-    {"Port": "JIANGYIN", "Country": "China", "Country Code": "CN"},
-    {"Port": "JIUJIANG", "Country": "China", "Country Code": "CN"},
-    {"Port": "KAOHSIUNG", "Country": "Taiwan", "Country Code": "TW"},
-    {"Port": "KARACHI (PORT QASIM)", "Country": "Pakistan", "Country Code": "PK"},
-    {"Port": "KEELUNG", "Country": "Taiwan", "Country Code": "TW"},
-    {"Port": "KOLKATA (CALCUTTA)", "Country": "India", "Country Code": "IN"},
-    {"Port": "LAEM CHABANG", "Country": "Thailand", "Country Code": "TH"},
-    {"Port": "LANSHI", "Country": "China", "Country Code": "CN"},
-    {"Port": "LAT KRABANG", "Country": "Thailand", "Country Code": "TH"},
-    {"Port": "LIANYUNGANG", "Country": "China", "Country Code": "CN"},
-    {"Port": "MAWEI FUZHOU", "Country": "China", "Country Code": "CN"},
-    {"Port": "MIANYANG", "Country": "China", "Country Code": "CN"},
-    {"Port": "MANILLA", "Country": "Philippines", "Country Code": "PH"},
-    {"Port": "MORADABAD", "Country": "India", "Country Code": "IN"},
-    {"Port": "MUMBAI", "Country": "India", "Country Code": "IN"},
-    {"Port": "MUNDRA", "Country": "India", "Country Code": "IN"},
-    {"Port": "NANHAI", "Country": "China", "Country Code": "CN"},
-    {"Port": "NANJING", "Country": "China", "Country Code": "CN"},
-    {"Port": "NANSHA", "Country": "China", "Country Code": "CN"},
-    {"Port": "NANTONG", "Country": "China", "Country Code": "CN"},
-    {"Port": "NEW DELHI", "Country": "India", "Country Code": "IN"},
-    {"Port": "NHAVA SHEVA", "Country": "India", "Country Code": "IN"},
-    {"Port": "NINGBO", "Country": "China", "Country Code": "CN"},
-    {"Port": "PASIR GUDANG", "Country": "Malaysia", "Country Code": "MY"},
-    {"Port": "PENANG", "Country": "Malaysia", "Country Code": "MY"},
-    {"Port": "PT. KLANG", "Country": "Malaysia", "Country Code": "MY"},
-    {"Port": "PUSAN", "Country": "South Korea", "Country Code": "KR"},
-    {"Port": "QINGDAO", "Country": "China", "Country Code": "CN"},
-    {"Port": "QUINHON", "Country": "Vietnam", "Country Code": "VN"},
-    {"Port": "RONGQI", "Country": "China", "Country Code": "CN"},
-    {"Port": "SEMARANG", "Country": "Indonesia", "Country Code": "ID"},
-    {"Port": "SHANGHAI", "Country": "China", "Country Code": "CN"},
-    {"Port": "SHANTOU", "Country": "China", "Country Code": "CN"},
-    {"Port": "SHEKOU", "Country": "China", "Country Code": "CN"},
-    {"Port": "SHENZHEN", "Country": "China", "Country Code": "CN"},
-    {"Port": "SHUNDE", "Country": "China", "Country Code": "CN"},
-    {"Port": "SIHANOUKVILLE (CAMBODJA)", "Country": "Cambodia", "Country Code": "KH"},
-    {"Port": "SINGAPORE", "Country": "Singapore", "Country Code": "SG"},
-    {"Port": "SURABAYA", "Country": "Indonesia", "Country Code": "ID"},
-    {"Port": "SUZHOU", "Country": "China", "Country Code": "CN"},
-    {"Port": "TAICHUNG", "Country": "Taiwan", "Country Code": "TW"},
-    {"Port": "TAIZHOU", "Country": "China", "Country Code": "CN"},
-    {"Port": "TANJUNG PELEPAS", "Country": "Malaysia", "Country Code": "MY"},
-    {"Port": "TAOYUAN", "Country": "Taiwan", "Country Code": "TW"},
-    {"Port": "TUTICORIN", "Country": "India", "Country Code": "IN"},
-    {"Port": "VUNG TAU", "Country": "Vietnam", "Country Code": "VN"},
-    {"Port": "WENZHOU", "Country": "China", "Country Code": "CN"},
-    {"Port": "WUHAN", "Country": "China", "Country Code": "CN"},
-    {"Port": "WUHU", "Country": "China", "Country Code": "CN"},
-    {"Port": "XIAMEN", "Country": "China", "Country Code": "CN"},
-    {"Port": "XIAN", "Country": "China", "Country Code": "CN"},
-    {"Port": "XINHUI", "Country": "China", "Country Code": "CN"},
-    {"Port": "TIANJINXINGANG", "Country": "China", "Country Code": "CN"},
-    {"Port": "YANTIAN", "Country": "China", "Country Code": "CN"},
-    {"Port": "YANGZHOU", "Country": "China", "Country Code": "CN"},
-    {"Port": "ZHANJIANG", "Country": "China", "Country Code": "CN"},
-    {"Port": "ZHANGJIAGANG", "Country": "China", "Country Code": "CN"},
-    {"Port": "ZHAOQING", "Country": "China", "Country Code": "CN"},
-    {"Port": "ZHENGZHOU", "Country": "China", "Country Code": "CN"},
-    {"Port": "ZHENJIANG", "Country": "China", "Country Code": "CN"},
-    {"Port": "ZHONGSHAN", "Country": "China", "Country Code": "CN"},
-    {"Port": "ZHAPU", "Country": "China", "Country Code": "CN"},
-    {"Port": "ZHUHAI", "Country": "China", "Country Code": "CN"},
-    {"Port": "SANTOS", "Country": "Brazil", "Country Code": "BR"},
-]
+# One ports table for every extractor (this copy's extra entries were
+# merged into it). Lookups: global_db.ports.functions.
+# Loaded from its snapshot on first access rather than at import.
+from global_db.ports.functions import get_ports
+
+
+def __getattr__(name):
+    if name == "ports":
+        return get_ports()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,9 +1,3 @@
-def get_abbreviation_by_country(countries, country_name):
-    for entry in countries:
-        if entry["country"].lower() == country_name.lower():
-            return entry["abbreviation"]
-    return country_name
-
 def get_currency_abbr(text):
     return text.split('-', 1)[0]
 
@@ -1,3 +1,5 @@
+# Read through its snapshot (global_db.functions.snapshots); after editing run
+#     python -m global_db.functions.snapshots
 countries = [
     {
         "country": "Afghanistan",
@@ -1119,5 +1121,472 @@ countries = [
     {
         "country": "Zimbabwe",
         "abbreviation": "ZW"
+    },
+
+    # Names seen on documents in other languages (FR / NL / DE / ES / IT) and
+    # spellings the client extractors needed (merged from their own copies).
+    {
+        "country": "Deutschland",
+        "abbreviation": "DE"
+    },
+    {
+        "country": "Allemagne",
+        "abbreviation": "DE"
+    },
+    {
+        "country": "Duitsland",
+        "abbreviation": "DE"
+    },
+    {
+        "country": "Alemania",
+        "abbreviation": "DE"
+    },
+    {
+        "country": "Frankrijk",
+        "abbreviation": "FR"
+    },
+    {
+        "country": "Francia",
+        "abbreviation": "FR"
+    },
+    {
+        "country": "Nederland",
+        "abbreviation": "NL"
+    },
+    {
+        "country": "Pays-Bas",
+        "abbreviation": "NL"
+    },
+    {
+        "country": "Niederlande",
+        "abbreviation": "NL"
+    },
+    {
+        "country": "Países Bajos",
+        "abbreviation": "NL"
+    },
+    {
+        "country": "Holland",
+        "abbreviation": "NL"
+    },
+    {
+        "country": "Belgique",
+        "abbreviation": "BE"
+    },
+    {
+        "country": "België",
+        "abbreviation": "BE"
+    },
+    {
+        "country": "Belgio",
+        "abbreviation": "BE"
+    },
+    {
+        "country": "España",
+        "abbreviation": "ES"
+    },
+    {
+        "country": "Espagne",
+        "abbreviation": "ES"
+    },
+    {
+        "country": "Spanje",
+        "abbreviation": "ES"
+    },
+    {
+        "country": "Spanien",
+        "abbreviation": "ES"
+    },
+    {
+        "country": "Spagna",
+        "abbreviation": "ES"
+    },
+    {
+        "country": "Italie",
+        "abbreviation": "IT"
+    },
+    {
+        "country": "Italië",
+        "abbreviation": "IT"
+    },
+    {
+        "country": "Royaume-Uni",
+        "abbreviation": "GB"
+    },
+    {
+        "country": "Verenigd Koninkrijk",
+        "abbreviation": "GB"
+    },
+    {
+        "country": "Vereinigtes Königreich",
+        "abbreviation": "GB"
+    },
+    {
+        "country": "Reino Unido",
+        "abbreviation": "GB"
+    },
+    {
+        "country": "UK",
+        "abbreviation": "GB"
+    },
+    {
+        "country": "East Sussex",
+        "abbreviation": "GB"
+    },
+    {
+        "country": "United States of America",
+        "abbreviation": "US"
+    },
+    {
+        "country": "Verenigde Staten",
+        "abbreviation": "US"
+    },
+    {
+        "country": "Vereinigte Staaten",
+        "abbreviation": "US"
+    },
+    {
+        "country": "Suisse",
+        "abbreviation": "CH"
+    },
+    {
+        "country": "Schweiz",
+        "abbreviation": "CH"
+    },
+    {
+        "country": "Zwitserland",
+        "abbreviation": "CH"
+    },
+    {
+        "country": "Svizzera",
+        "abbreviation": "CH"
+    },
+    {
+        "country": "Suiza",
+        "abbreviation": "CH"
+    },
+    {
+        "country": "Autriche",
+        "abbreviation": "AT"
+    },
+    {
+        "country": "Oostenrijk",
+        "abbreviation": "AT"
+    },
+    {
+        "country": "Österreich",
+        "abbreviation": "AT"
+    },
+    {
+        "country": "Pologne",
+        "abbreviation": "PL"
+    },
+    {
+        "country": "Polen",
+        "abbreviation": "PL"
+    },
+    {
+        "country": "Polonia",
+        "abbreviation": "PL"
+    },
+    {
+        "country": "Chine",
+        "abbreviation": "CN"
+    },
+    {
+        "country": "People's Republic of China",
+        "abbreviation": "CN"
+    },
+    {
+        "country": "Inde",
+        "abbreviation": "IN"
+    },
+    {
+        "country": "Indien",
+        "abbreviation": "IN"
+    },
+    {
+        "country": "Tchéquie",
+        "abbreviation": "CZ"
+    },
+    {
+        "country": "République tchèque",
+        "abbreviation": "CZ"
+    },
+    {
+        "country": "Tschechien",
+        "abbreviation": "CZ"
+    },
+    {
+        "country": "Tsjechië",
+        "abbreviation": "CZ"
+    },
+    {
+        "country": "Suède",
+        "abbreviation": "SE"
+    },
+    {
+        "country": "Zweden",
+        "abbreviation": "SE"
+    },
+    {
+        "country": "Schweden",
+        "abbreviation": "SE"
+    },
+    {
+        "country": "Danemark",
+        "abbreviation": "DK"
+    },
+    {
+        "country": "Denemarken",
+        "abbreviation": "DK"
+    },
+    {
+        "country": "Dänemark",
+        "abbreviation": "DK"
+    },
+    {
+        "country": "Noorwegen",
+        "abbreviation": "NO"
+    },
+    {
+        "country": "Norwegen",
+        "abbreviation": "NO"
+    },
+    {
+        "country": "Finlande",
+        "abbreviation": "FI"
+    },
+    {
+        "country": "Finnland",
+        "abbreviation": "FI"
+    },
+    {
+        "country": "Irlande",
+        "abbreviation": "IE"
+    },
+    {
+        "country": "Ierland",
+        "abbreviation": "IE"
+    },
+    {
+        "country": "Irland",
+        "abbreviation": "IE"
+    },
+    {
+        "country": "Luxemburg",
+        "abbreviation": "LU"
+    },
+    {
+        "country": "Hongrie",
+        "abbreviation": "HU"
+    },
+    {
+        "country": "Hongarije",
+        "abbreviation": "HU"
+    },
+    {
+        "country": "Ungarn",
+        "abbreviation": "HU"
+    },
+    {
+        "country": "Roumanie",
+        "abbreviation": "RO"
+    },
+    {
+        "country": "Roemenië",
+        "abbreviation": "RO"
+    },
+    {
+        "country": "Rumänien",
+        "abbreviation": "RO"
+    },
+    {
+        "country": "Grèce",
+        "abbreviation": "GR"
+    },
+    {
+        "country": "Griekenland",
+        "abbreviation": "GR"
+    },
+    {
+        "country": "Griechenland",
+        "abbreviation": "GR"
+    },
+    {
+        "country": "Turkije",
+        "abbreviation": "TR"
+    },
+    {
+        "country": "Türkei",
+        "abbreviation": "TR"
+    },
+    {
+        "country": "Maroc",
+        "abbreviation": "MA"
+    },
+    {
+        "country": "Marokko",
+        "abbreviation": "MA"
+    },
+    {
+        "country": "Brésil",
+        "abbreviation": "BR"
+    },
+    {
+        "country": "Brazilië",
+        "abbreviation": "BR"
+    },
+    {
+        "country": "Brasilien",
+        "abbreviation": "BR"
+    },
+    {
+        "country": "Brasil",
+        "abbreviation": "BR"
+    },
+    {
+        "country": "Mexique",
+        "abbreviation": "MX"
+    },
+    {
+        "country": "Mexiko",
+        "abbreviation": "MX"
+    },
+    {
+        "country": "Corée du Sud",
+        "abbreviation": "KR"
+    },
+    {
+        "country": "Zuid-Korea",
+        "abbreviation": "KR"
+    },
+    {
+        "country": "Südkorea",
+        "abbreviation": "KR"
+    },
+    {
+        "country": "Korea, Republic of",
+        "abbreviation": "KR"
+    },
+    {
+        "country": "Republic of Korea",
+        "abbreviation": "KR"
+    },
+    {
+        "country": "Viet Nam",
+        "abbreviation": "VN"
+    },
+    {
+        "country": "Russia",
+        "abbreviation": "RU"
+    },
+    {
+        "country": "Russie",
+        "abbreviation": "RU"
+    },
+    {
+        "country": "Rusland",
+        "abbreviation": "RU"
+    },
+    {
+        "country": "Russland",
+        "abbreviation": "RU"
+    },
+    {
+        "country": "Slovaquie",
+        "abbreviation": "SK"
+    },
+    {
+        "country": "Slowakije",
+        "abbreviation": "SK"
+    },
+    {
+        "country": "Slowakei",
+        "abbreviation": "SK"
+    },
+    {
+        "country": "Slovénie",
+        "abbreviation": "SI"
+    },
+    {
+        "country": "Slovenië",
+        "abbreviation": "SI"
+    },
+    {
+        "country": "Slowenien",
+        "abbreviation": "SI"
+    },
+    {
+        "country": "Croatie",
+        "abbreviation": "HR"
+    },
+    {
+        "country": "Kroatië",
+        "abbreviation": "HR"
+    },
+    {
+        "country": "Kroatien",
+        "abbreviation": "HR"
+    },
+    {
+        "country": "Bulgarie",
+        "abbreviation": "BG"
+    },
+    {
+        "country": "Bulgarije",
+        "abbreviation": "BG"
+    },
+    {
+        "country": "Bulgarien",
+        "abbreviation": "BG"
+    },
+    {
+        "country": "Australie",
+        "abbreviation": "AU"
+    },
+    {
+        "country": "Australië",
+        "abbreviation": "AU"
+    },
+    {
+        "country": "Australien",
+        "abbreviation": "AU"
+    },
+    {
+        "country": "Zuid-Afrika",
+        "abbreviation": "ZA"
+    },
+    {
+        "country": "Südafrika",
+        "abbreviation": "ZA"
+    },
+    {
+        "country": "Indonésie",
+        "abbreviation": "ID"
+    },
+    {
+        "country": "Indonesië",
+        "abbreviation": "ID"
+    },
+    {
+        "country": "Indonesien",
+        "abbreviation": "ID"
+    },
+    {
+        "country": "Thaïlande",
+        "abbreviation": "TH"
+    },
+    {
+        "country": "Taiwan",
+        "abbreviation": "TW"
+    },
+    {
+        "country": "Ouganda",
+        "abbreviation": "UG"
+    },
+    {
+        "country": "Côte d'Ivoire",
+        "abbreviation": "CI"
     }
 ]
\ No newline at end of file
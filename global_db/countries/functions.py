@@ -1,9 +1,70 @@
-from global_db.countries.countries import countries
+from functools import lru_cache
 
-def get_abbreviation_by_country(country_name):
+from global_db.functions.reference import TrigramIndex, normalize_name
+from global_db.functions.snapshots import load_table
+
+
+def get_countries():
+    """The shared countries table (loaded from its snapshot on first use)."""
+    return load_table("countries")
+
+
+@lru_cache(maxsize=None)
+def _country_index():
+    """
+    Hash indexes over the countries table, built once per worker:
+    normalized name -> abbreviation, the same without spaces (catches
+    "Unit. Arab Emir." / "Unit.Arab Emir."), ISO alpha-2 code -> itself,
+    plus a trigram index of every name for approximate matches.
+    """
+    by_name, by_compact, codes = {}, {}, {}
+    fuzzy = TrigramIndex()
+    for entry in get_countries():
+        key = normalize_name(entry["country"])
+        abbreviation = entry["abbreviation"]
+        if key not in by_name:
+            by_name[key] = abbreviation
+            fuzzy.add(key, abbreviation)
+        by_compact.setdefault(key.replace(" ", ""), abbreviation)
+        codes[abbreviation.casefold()] = abbreviation
+    return by_name, by_compact, codes, fuzzy
+
+
+def lookup_country(country_name):
+    """
+    ISO alpha-2 code of a country name, alias (any listed language /
+    spelling) or code, ignoring case, accents and punctuation. None if unknown.
+    """
+    if country_name is None:
+        return None
+    by_name, by_compact, codes, _ = _country_index()
+    key = normalize_name(country_name)
+    if not key:
+        return None
+    return by_name.get(key) or by_compact.get(key.replace(" ", "")) or codes.get(key)
+
+
+def match_countries(country_name, limit=5, min_score=0.5):
+    """
+    Approximate matches for a misspelled or truncated name:
+    [(abbreviation, matched name, score)], best first. An exact hit scores 1.0.
+    """
+    exact = lookup_country(country_name)
+    if exact:
+        return [(exact, normalize_name(country_name), 1.0)]
+    return _country_index()[3].search(normalize_name(country_name), limit=limit, min_score=min_score)
+
+
+def get_abbreviation_by_country(country_name, fuzzy=False):
+    """
+    Abbreviation of a country name, or the name unchanged when it is not in
+    the table. With ``fuzzy``, an unknown name falls back to the best
+    approximate match (score >= 0.6) before giving up.
+    """
     if country_name is None:
         return None
-    for entry in countries:
-        if entry["country"].lower() == country_name.lower():
-            return entry["abbreviation"]
-    return country_name
\ No newline at end of file
+    abbreviation = lookup_country(country_name)
+    if abbreviation is None and fuzzy:
+        best = match_countries(country_name, limit=1, min_score=0.6)
+        abbreviation = best[0][0] if best else None
+    return abbreviation or country_name
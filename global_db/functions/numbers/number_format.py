@@ -7,7 +7,9 @@ decimal: "2.089,34", "12,5") or US format (comma = thousands, dot = decimal:
 so the format must be decided once per document from the unambiguous values it
 contains, then applied to every value in that document.
 
-Canonical version of VanPoppel_Soudal/helpers/number_format.py — keep in sync.
+classify_numbers / detect_column_format / parse_numbers do the same for a
+whole column at once (list, pandas Series or NumPy array) with pyarrow compute
+kernels, and give exactly the scalar functions' results.
 """
 import re
 
@@ -19,7 +21,7 @@ _US_GROUPED = re.compile(r"\d{1,3}(,\d{3})+(\.\d+)?$")
 def _clean(value) -> str:
     s = str(value).strip()
     s = re.sub(r"[€$£¥]", "", s)
-    s = s.replace(" ", "").replace(" ", "").replace("'", "")
+    s = s.replace(" ", "").replace("\xa0", "").replace("'", "")
     while s and s[-1] in ".,":
         s = s[:-1]
     return s
@@ -85,3 +87,165 @@ def parse_number(value, fmt="EU"):
         return float(s)
     except ValueError:
         return None
+
+
+# --- column versions -------------------------------------------------------
+# A string made only of these characters is cleaned by the Arrow kernels below
+# exactly as _clean would, and is ASCII afterwards, where [0-9] and \d agree.
+# Any other string goes through the scalar functions.
+_FAST_STRING = r"^[\x20-\x7e\t\n\r\x0b\x0c\x{a0}€£¥]*$"
+_FAST_TRIM = " \t\n\r\x0b\x0c\xa0"
+_STRIPPED = r"[€$£¥ \x{a0}']"
+_ASCII_NUMERIC = r"^[0-9][0-9.,]*$"
+_ASCII_EU_GROUPED = r"^[0-9]{1,3}(\.[0-9]{3})+(,[0-9]+)?$"
+_ASCII_US_GROUPED = r"^[0-9]{1,3}(,[0-9]{3})+(\.[0-9]+)?$"
+_ASCII_FLOAT = r"^[0-9]+(\.[0-9]*)?$"
+
+
+def _as_strings(values):
+    """values as a list of str (what the scalar functions call str() on)."""
+    return [v if isinstance(v, str) else str(v) for v in values]
+
+
+def _column_kernels(strings):
+    """
+    Clean a list of strings the way _clean does and measure what
+    classification and parsing look at. Returns (kernels, positions of the
+    strings that need the scalar path).
+    """
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    def np_(array):
+        return array.to_numpy(zero_copy_only=False)
+
+    raw = pa.array(strings, type=pa.string())
+    fast = np_(pc.match_substring_regex(raw, _FAST_STRING))
+    s = pc.utf8_rtrim(pc.replace_substring_regex(pc.utf8_trim(raw, _FAST_TRIM), _STRIPPED, ""), ".,")
+    kernels = {
+        "s": s,
+        "valid": np_(pc.match_substring_regex(s, _ASCII_NUMERIC)),
+        "dots": np_(pc.count_substring(s, ".")),
+        "commas": np_(pc.count_substring(s, ",")),
+        "first_dot": np_(pc.find_substring(s, ".")),
+        "first_comma": np_(pc.find_substring(s, ",")),
+        "length": np_(pc.binary_length(s)),
+    }
+    return kernels, np.flatnonzero(~fast)
+
+
+def _classify_column(k):
+    """Boolean arrays (EU, US) of classify_number's verdicts."""
+    import numpy as np
+
+    dots, commas, valid = k["dots"], k["commas"], k["valid"]
+    both = (dots > 0) & (commas > 0)
+    single = dots + commas == 1
+    head = np.where(dots > 0, k["first_dot"], k["first_comma"])
+    tail = k["length"] - head - 1
+    ambiguous = single & (tail == 3) & (head >= 1) & (head <= 3)
+
+    eu = valid & (
+        (both & (k["first_dot"] < k["first_comma"]))
+        | (~both & (dots > 1))
+        | (single & (commas == 1) & ~ambiguous)
+    )
+    us = valid & (
+        (both & (k["first_comma"] < k["first_dot"]))
+        | (~both & (commas > 1))
+        | (single & (dots == 1) & ~ambiguous)
+    )
+    return eu, us
+
+
+def classify_numbers(values):
+    """classify_number over a column: a list of 'EU', 'US' or None."""
+    strings = _as_strings(values)
+    if not strings:
+        return []
+    k, slow = _column_kernels(strings)
+    eu, us = _classify_column(k)
+    verdicts = ["EU" if e else "US" if u else None for e, u in zip(eu.tolist(), us.tolist())]
+    for i in slow.tolist():
+        verdicts[i] = classify_number(strings[i])
+    return verdicts
+
+
+def detect_column_format(values, default="EU"):
+    """detect_format over a column (list, Series or array) in one vectorized pass."""
+    strings = _as_strings(values if values is not None else [])
+    if not strings:
+        return default
+    k, slow = _column_kernels(strings)
+    eu, us = _classify_column(k)
+    eu[slow] = us[slow] = False
+    votes = {"EU": int(eu.sum()), "US": int(us.sum())}
+    for i in slow.tolist():
+        verdict = classify_number(strings[i])
+        if verdict:
+            votes[verdict] += 1
+    if votes["EU"] != votes["US"]:
+        return "EU" if votes["EU"] > votes["US"] else "US"
+    return default
+
+
+def _parse_strings(strings, fmt):
+    """parse_number over a list of str: float64 array, NaN for None."""
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    k, slow = _column_kernels(strings)
+    s = k["s"]
+    has_dot, has_comma = k["dots"] > 0, k["commas"] > 0
+    if fmt == "EU":
+        grouped = pc.match_substring_regex(s, _ASCII_EU_GROUPED).to_numpy(zero_copy_only=False)
+        thousands = pc.replace_substring(pc.replace_substring(s, ".", ""), ",", ".")
+        decimal_comma = pc.replace_substring(s, ",", ".")
+        s = pc.if_else(pa.array(has_dot & (grouped | has_comma)), thousands,
+                       pc.if_else(pa.array(has_dot), s, decimal_comma))
+    else:
+        grouped = pc.match_substring_regex(s, _ASCII_US_GROUPED).to_numpy(zero_copy_only=False)
+        thousands = pc.replace_substring(s, ",", "")
+        decimal_comma = pc.replace_substring(s, ",", ".")
+        s = pc.if_else(pa.array(has_comma & (grouped | has_dot)), thousands,
+                       pc.if_else(pa.array(has_comma), decimal_comma, s))
+    ok = k["valid"] & pc.match_substring_regex(s, _ASCII_FLOAT).to_numpy(zero_copy_only=False)
+    # Arrow's string -> float64 cast rounds like float(); the rest stay null (NaN)
+    parsed = pc.cast(pc.if_else(pa.array(ok), s, pa.scalar(None, pa.string())), pa.float64())
+    parsed = parsed.to_numpy(zero_copy_only=False).copy()
+    for i in slow.tolist():
+        value = parse_number(strings[i], fmt)
+        parsed[i] = np.nan if value is None else value
+    return parsed
+
+
+def parse_numbers(values, fmt="EU"):
+    """
+    parse_number over a column (list, Series or array). Returns float64
+    values, NaN where parse_number gives None: a Series with the same index
+    for a Series, else a NumPy array.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if getattr(values, "dtype", None) is not None and values.dtype.kind == "f":
+        out = np.asarray(values, dtype="float64")  # floats pass through parse_number unchanged
+    else:
+        items = list(values)
+        out = np.full(len(items), np.nan)
+        positions, strings = [], []
+        for i, v in enumerate(items):
+            if v is None:
+                continue
+            if isinstance(v, (int, float)):
+                out[i] = float(v)
+            else:
+                positions.append(i)
+                strings.append(str(v))
+        if strings:
+            out[positions] = _parse_strings(strings, fmt)
+    if isinstance(values, pd.Series):
+        return pd.Series(out, index=values.index, name=getattr(values, "name", None))
+    return out
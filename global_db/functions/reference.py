@@ -0,0 +1,85 @@
+import re
+import unicodedata
+from collections import defaultdict
+
+
+_SEPARATORS = re.compile(r"[^0-9a-z]+")
+_JOINERS = re.compile(r"(?<=[0-9a-z])[.'’](?=[0-9a-z])")
+
+
+def normalize_name(text):
+    """
+    Fold a reference-data name for lookups: accents removed, case folded,
+    punctuation and repeated whitespace collapsed to one space.
+
+    "  Côte d'Ivoire " -> "cote divoire", "Unit.Arab Emir." -> "unitarab emir"
+    """
+    if text is None:
+        return ""
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    text = _JOINERS.sub("", text)
+    return _SEPARATORS.sub(" ", text).strip()
+
+
+def compact_name(text):
+    """normalize_name without any spaces: "H.C.M.C." and "HCMC" -> "hcmc"."""
+    return normalize_name(text).replace(" ", "")
+
+
+def trigrams(key):
+    """Character trigrams of a normalized key, padded so word edges count."""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """
+    Approximate lookup over normalized names. Every name is split into
+    trigrams once; a query only scores the names sharing at least one trigram
+    with it (Dice coefficient of the two trigram sets).
+
+        index = TrigramIndex([("belgium", "BE"), ("belgique", "BE")])
+        index.search("belguim")  ->  [("BE", "belgium", 0.67), ...]
+    """
+
+    def __init__(self, entries=()):
+        self._keys = []
+        self._values = []
+        self._sizes = []
+        self._postings = defaultdict(list)
+        for key, value in entries:
+            self.add(key, value)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, key, value):
+        """Index one normalized key."""
+        grams = trigrams(key)
+        position = len(self._keys)
+        self._keys.append(key)
+        self._values.append(value)
+        self._sizes.append(len(grams))
+        for gram in grams:
+            self._postings[gram].append(position)
+
+    def search(self, key, limit=5, min_score=0.5):
+        """
+        Best matches of a normalized key: [(value, matched key, score)],
+        highest score first, at most ``limit``, none below ``min_score``.
+        """
+        grams = trigrams(key)
+        if not key or not grams:
+            return []
+        shared = defaultdict(int)
+        for gram in grams:
+            for position in self._postings.get(gram, ()):
+                shared[position] += 1
+        scored = []
+        for position, count in shared.items():
+            score = 2 * count / (len(grams) + self._sizes[position])
+            if score >= min_score:
+                scored.append((score, position))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [(self._values[p], self._keys[p], round(score, 3)) for score, p in scored[:limit]]
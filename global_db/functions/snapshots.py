@@ -0,0 +1,99 @@
+"""
+Binary snapshots of the large reference tables.
+
+The tables are maintained as Python literals (global_db/countries/countries.py,
+global_db/plda/bigData.py, global_db/ports/data.py). Importing one of those
+compiles and runs thousands of dict literals on a cold start whenever no
+bytecode cache can be written (read-only deployments). A snapshot is the same
+table marshalled next to its source; load_table reads it instead, once per
+worker, and only when a lookup first needs it. marshal and zlib are built in,
+so loading adds no imports of its own.
+
+A snapshot records the marshal format and the CRC-32 and size of the source it
+was built from. When either changed since, it is ignored and the source module
+is imported instead, so a stale snapshot costs time, never wrong data. Rebuild
+after editing a table:
+
+    python -m global_db.functions.snapshots
+"""
+
+import importlib
+import marshal
+import os
+import zlib
+from functools import lru_cache
+
+# table name -> (source module, attribute holding the table)
+TABLES = {
+    "countries": ("global_db.countries.countries", "countries"),
+    "plda_containers": ("global_db.plda.bigData", "bigData"),
+    "ports": ("global_db.ports.data", "ports"),
+}
+
+SNAPSHOT_SUFFIX = ".snapshot"
+
+# directory holding the global_db package
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _source_path(name):
+    module, _ = TABLES[name]
+    return os.path.join(_ROOT, *module.split(".")) + ".py"
+
+
+def snapshot_path(name):
+    """Where the snapshot of a table lives: next to its source module."""
+    return os.path.splitext(_source_path(name))[0] + SNAPSHOT_SUFFIX
+
+
+def _source_digest(name):
+    with open(_source_path(name), "rb") as f:
+        source = f.read()
+    return marshal.version, zlib.crc32(source), len(source)
+
+
+def _import_table(name):
+    module, attribute = TABLES[name]
+    return getattr(importlib.import_module(module), attribute)
+
+
+def read_snapshot(name):
+    """The table stored in its snapshot, or None when missing, unreadable or stale."""
+    try:
+        with open(snapshot_path(name), "rb") as f:
+            digest, table = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    return table if digest == _source_digest(name) else None
+
+
+@lru_cache(maxsize=None)
+def load_table(name):
+    """
+    A reference table by name (see TABLES), loaded once per worker from its
+    snapshot, or from the source module when there is no current snapshot.
+    Callers share the returned object and must not modify it.
+    """
+    table = read_snapshot(name)
+    return _import_table(name) if table is None else table
+
+
+def build_snapshot(name):
+    """Write the snapshot of one table from its source module; returns its size in bytes."""
+    payload = marshal.dumps((_source_digest(name), _import_table(name)))
+    path = snapshot_path(name)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(payload)
+    os.replace(tmp, path)
+    return len(payload)
+
+
+def build_snapshots(names=None):
+    """Rebuild the snapshots of ``names`` (default: every table). Returns {name: bytes}."""
+    return {name: build_snapshot(name) for name in (names or TABLES)}
+
+
+if __name__ == "__main__":
+    for table_name, size in build_snapshots().items():
+        print(f"{table_name}: {snapshot_path(table_name)} ({size} bytes)")
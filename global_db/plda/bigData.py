@@ -1,3 +1,5 @@
+# Read through its snapshot (global_db.functions.snapshots); after editing run
+#     python -m global_db.functions.snapshots
 bigData = [
     {
         "container": "WFHU1427130",
@@ -0,0 +1,190 @@
+import os
+import sqlite3
+import tempfile
+import threading
+from functools import lru_cache
+
+from global_db.functions.snapshots import _source_digest, load_table
+
+# PLDA container weights: one row per reported container, duplicates kept in
+# the order they were added. The deployed package is read-only, so the store
+# lives in the worker's temp directory by default: entries appended there are
+# lost on a redeploy or when the instance is recycled. Point PLDA_STORE_PATH at
+# persistent storage (e.g. a mounted file share) to keep them. A file seeded
+# from an older bigData.py is reseeded on first use (appended entries kept).
+DEFAULT_STORE_PATH = os.environ.get("PLDA_STORE_PATH") or os.path.join(tempfile.gettempdir(), "plda.sqlite3")
+
+REQUIRED_FIELDS = ["container", "package", "net", "gross"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS containers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    container TEXT NOT NULL,
+    container_key TEXT NOT NULL,
+    package,
+    net,
+    gross
+);
+CREATE INDEX IF NOT EXISTS containers_by_key ON containers (container_key, id);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);
+"""
+
+
+def container_key(container):
+    """Lookup key of a container number (case and surrounding spaces ignored)."""
+    return str(container).strip().lower()
+
+
+class ContainerStore:
+    """
+    Keyed store of PLDA container data in one SQLite file.
+
+    Lookups go through an index on the container number; an append is a
+    single transaction. A missing file is created and seeded from the
+    historical bigData table (loaded only then). The file records which
+    bigData it was seeded from (meta table); when bigData.py has changed since
+    (a later deploy), it is reseeded on first use, keeping the entries appended
+    to it. Each thread keeps its own connection open; entries appended by other
+    workers are seen on the next query.
+
+    When the file cannot be created or opened, the store falls back to an
+    in-memory index of the bigData table: lookups keep working, but appended
+    entries only live as long as the worker.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        self._seed_lock = threading.Lock()
+        self._local = threading.local()
+        self._memory = None  # container key -> entries, once the file is unusable
+        self._seed_checked = False
+
+    def _connect(self):
+        """The thread's connection, or None when running from memory."""
+        if self._memory is not None:
+            return None
+        con = getattr(self._local, "con", None)
+        if con is None:
+            try:
+                self._check_seed()
+                con = sqlite3.connect(self.path, timeout=30)
+            except (OSError, sqlite3.Error):
+                self._use_memory()
+                return None
+            try:
+                con.execute("SELECT 1 FROM containers LIMIT 1")
+            except sqlite3.Error:  # not a seeded store
+                con.close()
+                self._use_memory()
+                return None
+            self._local.con = con
+        return con
+
+    def _use_memory(self):
+        """Switch to an in-memory index of the bigData table (built once)."""
+        with self._seed_lock:
+            if self._memory is None:
+                memory = {}
+                for e in load_table("plda_containers"):
+                    memory.setdefault(container_key(e["container"]), []).append({f: e[f] for f in REQUIRED_FIELDS})
+                self._memory = memory
+
+    def _check_seed(self):
+        """(Re)seed the file when it is missing or was seeded from another bigData (once per store)."""
+        with self._seed_lock:
+            if self._seed_checked:
+                return
+            digest = _seed_digest()
+            seeded = self._seeded_from()
+            if seeded is None or seeded[0] != digest:
+                self._seed(digest, seeded[1] if seeded else None)
+            self._seed_checked = True
+
+    def _seeded_from(self):
+        """(seed digest, seeded row count) of the existing file, None if there is none."""
+        if not os.path.exists(self.path):
+            return None
+        con = sqlite3.connect(self.path, timeout=30)
+        try:
+            try:
+                meta = dict(con.execute("SELECT key, value FROM meta"))
+            except sqlite3.OperationalError:  # seeded before the meta table: reseed, no appends known
+                meta = {"seed_rows": con.execute("SELECT COALESCE(MAX(id), 0) FROM containers").fetchone()[0]}
+            return meta.get("seed_digest"), int(meta.get("seed_rows", 0))
+        finally:
+            con.close()
+
+    def _seed(self, digest, old_seed_rows=None):
+        # Built next to the target and renamed into place, so concurrent
+        # workers never see a half-seeded store. Rows appended to the previous
+        # file (ids after its seed rows) are copied over in order.
+        bigData = load_table("plda_containers")
+        fd, tmp = tempfile.mkstemp(prefix=".plda-", suffix=".sqlite3", dir=os.path.dirname(self.path) or ".")
+        os.close(fd)
+        try:
+            con = sqlite3.connect(tmp)
+            if old_seed_rows is not None:
+                con.execute("ATTACH DATABASE ? AS old", (self.path,))
+            with con:
+                con.executescript(_SCHEMA)
+                con.executemany(
+                    "INSERT INTO containers (container, container_key, package, net, gross) VALUES (?, ?, ?, ?, ?)",
+                    [(e["container"], container_key(e["container"]), e["package"], e["net"], e["gross"]) for e in bigData],
+                )
+                if old_seed_rows is not None:
+                    con.execute(
+                        "INSERT INTO containers (container, container_key, package, net, gross) "
+                        "SELECT container, container_key, package, net, gross FROM old.containers WHERE id > ? ORDER BY id",
+                        (old_seed_rows,),
+                    )
+                con.executemany(
+                    "INSERT INTO meta (key, value) VALUES (?, ?)",
+                    [("seed_digest", digest), ("seed_rows", len(bigData))],
+                )
+            if old_seed_rows is not None:
+                con.execute("DETACH DATABASE old")
+            con.close()
+            os.replace(tmp, self.path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def find(self, container):
+        """Every entry for a container number, oldest first ([] if none)."""
+        con = self._connect()
+        if con is None:
+            return [dict(e) for e in self._memory.get(container_key(container), [])]
+        rows = con.execute(
+            "SELECT container, package, net, gross FROM containers WHERE container_key = ? ORDER BY id",
+            (container_key(container),),
+        ).fetchall()
+        return [dict(zip(REQUIRED_FIELDS, row)) for row in rows]
+
+    def append(self, entry):
+        """Add one entry (all REQUIRED_FIELDS needed); committed atomically."""
+        missing = [field for field in REQUIRED_FIELDS if field not in entry]
+        if missing:
+            raise ValueError(f"Missing required fields: {missing}")
+        con = self._connect()
+        if con is None:
+            with self._seed_lock:
+                self._memory.setdefault(container_key(entry["container"]), []).append({f: entry[f] for f in REQUIRED_FIELDS})
+            return
+        with con:
+            con.execute(
+                "INSERT INTO containers (container, container_key, package, net, gross) VALUES (?, ?, ?, ?, ?)",
+                (entry["container"], container_key(entry["container"]), entry["package"], entry["net"], entry["gross"]),
+            )
+
+
+def _seed_digest():
+    """Identifies the bigData.py the store is seeded from (its size and CRC-32)."""
+    _, crc, size = _source_digest("plda_containers")
+    return f"{crc:08x}-{size}"
+
+
+@lru_cache(maxsize=None)
+def default_store():
+    """The worker-wide store at DEFAULT_STORE_PATH."""
+    return ContainerStore()
@@ -1,5 +1,8 @@
+# Read through its snapshot (global_db.functions.snapshots); after editing run
+#     python -m global_db.functions.snapshots
 ports = [
     {"Port": "BANGKOK", "Country": "Thailand", "Country Code": "TH"},
+    {"Port": "BATAM", "Country": "Indonesia", "Country Code": "ID"},
     {"Port": "BELAWAN", "Country": "Indonesia", "Country Code": "ID"},
     {"Port": "BUSAN", "Country": "South Korea", "Country Code": "KR"},
     {"Port": "CALCUTTA", "Country": "India", "Country Code": "IN"},
@@ -82,6 +85,7 @@ ports = [
     {"Port": "XIAN", "Country": "China", "Country Code": "CN"},
     {"Port": "XINHUI", "Country": "China", "Country Code": "CN"},
     {"Port": "TIANJINXINGANG", "Country": "China", "Country Code": "CN"},
+    {"Port": "XINGANG/TIANJIN", "Country": "China", "Country Code": "CN"},
     {"Port": "YANTIAN", "Country": "China", "Country Code": "CN"},
     {"Port": "YANGZHOU", "Country": "China", "Country Code": "CN"},
     {"Port": "ZHANJIANG", "Country": "China", "Country Code": "CN"},
@@ -93,4 +97,13 @@ ports = [
     {"Port": "ZHAPU", "Country": "China", "Country Code": "CN"},
     {"Port": "ZHUHAI", "Country": "China", "Country Code": "CN"},
     {"Port": "SANTOS", "Country": "Brazil", "Country Code": "BR"},
+    # Other spellings seen on documents (resolved by global_db.ports.functions;
+    # the bracketed / slashed parts of the names above are matched on their own).
+    {"Port": "HO CHI MINH", "Country": "Vietnam", "Country Code": "VN"},
+    {"Port": "SAIGON", "Country": "Vietnam", "Country Code": "VN"},
+    {"Port": "PORT KLANG", "Country": "Malaysia", "Country Code": "MY"},
+    {"Port": "PORT KELANG", "Country": "Malaysia", "Country Code": "MY"},
+    {"Port": "MANILA", "Country": "Philippines", "Country Code": "PH"},
+    {"Port": "JNPT", "Country": "India", "Country Code": "IN"},
+    {"Port": "MADRAS", "Country": "India", "Country Code": "IN"},
 ]
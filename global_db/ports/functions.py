@@ -0,0 +1,117 @@
+import re
+from bisect import bisect_left
+from functools import lru_cache
+
+from global_db.functions.reference import TrigramIndex, normalize_name
+from global_db.functions.snapshots import load_table
+
+# Longest run of words tried when looking for a port inside a longer text.
+_MAX_PORT_WORDS = 4
+# Shortest text completed to a port name by prefix ("NHAVA SH" -> NHAVA SHEVA).
+_MIN_PREFIX = 3
+
+_ALIAS_PARTS = re.compile(r"[()/]")
+
+
+def get_ports():
+    """The shared ports table (loaded from its snapshot on first use)."""
+    return load_table("ports")
+
+
+def _port_keys(name):
+    """
+    Normalized keys of one port name: the whole name, then every bracketed or
+    slashed part on its own ("KARACHI (PORT QASIM)" -> "karachi port qasim",
+    "karachi", "port qasim"; "XINGANG/TIANJIN" -> ..., "xingang", "tianjin").
+    """
+    keys = [normalize_name(name)]
+    keys += [normalize_name(part) for part in _ALIAS_PARTS.split(name)]
+    return [key for key in dict.fromkeys(keys) if key]
+
+
+@lru_cache(maxsize=None)
+def _port_index():
+    """
+    Indexes over the ports table, built once per worker: normalized key ->
+    entry, the same without spaces ("CHONG QING" / "CHONGQING"), the sorted
+    keys for prefix completion, plus a trigram index for approximate matches.
+    The first entry listing a key wins.
+    """
+    by_name, by_compact = {}, {}
+    fuzzy = TrigramIndex()
+    for entry in get_ports():
+        for key in _port_keys(entry["Port"]):
+            if key not in by_name:
+                by_name[key] = entry
+                fuzzy.add(key, entry)
+            by_compact.setdefault(key.replace(" ", ""), entry)
+    return by_name, by_compact, sorted(by_name), fuzzy
+
+
+def _exact(key, by_name, by_compact):
+    return by_name.get(key) or by_compact.get(key.replace(" ", ""))
+
+
+def _within(key, by_name, by_compact):
+    # longest run of words naming a port, leftmost first: "FOB KARACHI PAKISTAN"
+    words = key.split()
+    for size in range(min(_MAX_PORT_WORDS, len(words)), 0, -1):
+        for start in range(len(words) - size + 1):
+            entry = _exact(" ".join(words[start:start + size]), by_name, by_compact)
+            if entry:
+                return entry
+    return None
+
+
+def _completion(key, keys, by_name):
+    # a truncated name, only when every key it starts belongs to one port
+    if len(key) < _MIN_PREFIX:
+        return None
+    found = None
+    for position in range(bisect_left(keys, key), len(keys)):
+        if not keys[position].startswith(key):
+            break
+        entry = by_name[keys[position]]
+        if found is not None and entry is not found:
+            return None
+        found = entry
+    return found
+
+
+def resolve_port(name, fuzzy=False):
+    """
+    Ports table entry ({"Port", "Country", "Country Code"}) of a port name as
+    written on a document, or None.
+
+    Tried in order: the whole name ignoring case, punctuation and spaces
+    ("h.c.m.c.", "Chongqing"); a port named inside the text ("CIF KARACHI",
+    "PORT QASIM"); an unambiguous truncation ("NHAVA SH"); with ``fuzzy``, the
+    best approximate match scoring at least 0.6.
+    """
+    key = normalize_name(name)
+    if not key:
+        return None
+    by_name, by_compact, keys, index = _port_index()
+    entry = _exact(key, by_name, by_compact) or _within(key, by_name, by_compact) or _completion(key, keys, by_name)
+    if entry is None and fuzzy:
+        best = index.search(key, limit=1, min_score=0.6)
+        entry = best[0][0] if best else None
+    return entry
+
+
+def resolve_ports(names, fuzzy=False):
+    """resolve_port over a list of names (e.g. every item of a document); each distinct name is resolved once."""
+    resolved = {}
+    results = []
+    for name in names:
+        key = normalize_name(name)
+        if key not in resolved:
+            resolved[key] = resolve_port(name, fuzzy=fuzzy)
+        results.append(resolved[key])
+    return results
+
+
+def get_port_country_code(name, fuzzy=False):
+    """Country code of the port a name resolves to, "" if none."""
+    entry = resolve_port(name, fuzzy=fuzzy)
+    return entry["Country Code"] if entry else ""
@@ -7,18 +7,44 @@ caches instantly with no calculation at request time.
 
 DAILY cold rebuild (run on a schedule, e.g. 2 AM):
     POST /transform-daily        raw landing JSON   -> one daily parquet
-    POST /build-index            all daily parquets -> file_index.parquet
+    POST /build-index            all daily parquets -> file_index.parquet + declaration_locator.parquet + users_directory.json
+         ?mode=incremental       only new/changed parquets (manifest ETags) -> merged into the index
     POST /refresh-users          all daily parquets -> per-user caches (single pass)
+         ?mode=incremental       only users touching declarations in new parquets
+         ?engine=sharded         users split across worker processes (?workers=N)
+    POST /build-cube             all daily parquets -> activity_cube.parquet (user × day × principal × type × company)
     POST /refresh                last 10 working days -> 10-day summary cache
 
+INTRADAY (every few minutes, today only):
+    POST /ingest-intraday        new landing JSON of today -> micro-batch parquet -> 10-day summary patched in place
+
+MONTHLY maintenance:
+    POST /compact-months         daily parquets of closed months -> one sorted parquet per month
+
   Backfill helper:
-    POST /transform-daily-range?start=YYYY-MM-DD&end=YYYY-MM-DD  (idempotent, resumable)
+    POST /transform-daily-range?start=YYYY-MM-DD&end=YYYY-MM-DD  (idempotent, parallel, checkpointed: call again to resume)
 
 INSTANT GET endpoints (always read from cache — no calculation):
     GET /                        -> 10-day summary cache
     GET ?user=X                  -> per-user cache
-    GET users                    -> discovered users (from the index)
-    GET file-lifecycle?id=...    -> single declaration trace
+    GET ?from=&to=&group_by=     -> any date window from the activity cube (group_by: user,date,principal,type,company)
+    GET users                    -> discovered users (users directory written by build-index)
+    GET file-lifecycle?id=...    -> single declaration trace (locator row group + its day partitions)
+
+  GET /, GET ?user=X and GET users pass the cache blob ETag through (If-None-Match -> 304)
+  and serve the pre-gzipped copy when the client sends Accept-Encoding: gzip.
+  The index, cube and cache blobs are kept in worker memory between requests
+  and revalidated by ETag (BLOB_CACHE_TTL_S), least recently used first out
+  past BLOB_CACHE_MAX_BYTES / BLOB_CACHE_MAX_ENTRIES.
+
+Storage: Azure Blob (default) or a local directory with the same layout
+(PERFORMANCEV3_STORAGE=local, PERFORMANCEV3_LOCAL_ROOT=<dir>), so the whole
+pipeline can run and be profiled on a local copy without cloud credentials.
+
+Telemetry: transform-daily, build-index, refresh-users and refresh return a
+"telemetry" block (per stage: duration, bytes down/up, rows in/out, peak RSS),
+also logged as a "perfv3.telemetry" trace and recorded as perfv3.stage.* custom
+metrics when an OpenTelemetry / Application Insights exporter is configured.
 
 Performance model: every heavy job reads each data file exactly once (parallel,
 column-pruned) and computes all users in a single pass. All jobs only READ
@@ -26,20 +52,38 @@ landing/transformed data and WRITE regenerable caches/index — source landing
 JSON and daily parquets are never modified.
 """
 
-from collections import defaultdict
+from bisect import bisect_left
+from collections import OrderedDict, defaultdict, deque
 from datetime import datetime, timedelta
 import azure.functions as func
 import logging
+import gzip
+import hashlib
 import json
 import io
+import os
+import tempfile
+import threading
+import time
 import pandas as pd
 import pyarrow.parquet as pq
-from concurrent.futures import ThreadPoolExecutor
-from azure.storage.blob import BlobServiceClient, ContainerClient
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from azure.identity import DefaultAzureCredential
 from azure.keyvault.secrets import SecretClient
 
-from performanceV3.common import classify_file_activity, SENDING_STATUSES, SYSTEM_USERS
+from performanceV3.common import classify_file_activity_frame, SENDING_STATUSES, SYSTEM_USERS
+from performanceV3.functions.index_builder import (
+    build_index_frame, build_index_frame_loop, build_locator_frame, build_users_directory,
+    merge_index_rows, upgrade_index_frame,
+)
+from performanceV3.functions.user_metrics import compute_all_user_metrics, compute_rich_user_metrics
+from performanceV3.functions.activity_cube import build_activity_cube, query_activity_cube
+from performanceV3.functions.history_schema import concat_canonical, ensure_canonical, to_canonical
+from performanceV3.functions.landing_stream import DEDUP_COLS, SchemaDrift, write_canonical_stream
+from performanceV3.functions.storage import AzureBlobStorage, LocalStorage
+from performanceV3.functions.telemetry import RouteTelemetry
+from performanceV3.functions.user_shards import frame_to_shared_memory, plan_shards, read_shared_rows
 
 # ---------------------------------------------------------------------------
 # Configuration
@@ -49,19 +93,117 @@ SECRET_NAME = "azure-storage-account-access-key2"
 CONTAINER_NAME = "document-intelligence"
 BLOB_BASE = "streamliner-analytics"  # base prefix inside the container
 
+# Storage backend (app settings / environment):
+#   PERFORMANCEV3_STORAGE=azure (default)  blob container above, key from Key Vault
+#   PERFORMANCEV3_STORAGE=local            files under PERFORMANCEV3_LOCAL_ROOT, laid
+#                                          out like the container — no credentials
+STORAGE_BACKEND = os.environ.get("PERFORMANCEV3_STORAGE", "azure").strip().lower()
+LOCAL_STORAGE_ROOT = os.environ.get("PERFORMANCEV3_LOCAL_ROOT", "")
+
 # Raw landing files (written by Logic App)
 LANDING_PREFIX = f"{BLOB_BASE}/landing/euchistory/"
 
 # Daily transformed parquet files
 TRANSFORMED_PREFIX = f"{BLOB_BASE}/transformed/"
 
+# Closed months are compacted into one parquet per month
+# (transformed/year=YYYY/month=MM/data.parquet) once this many days have passed
+# since month end, so late landing files are still picked up by the daily run.
+COMPACT_GRACE_DAYS = 3
+COMPACT_ROW_GROUP_SIZE = 100_000
+COMPACT_DICTIONARY_COLS = ["USERCODE", "HISTORY_STATUS", "ACTIVECOMPANY"]
+
+# Streaming transform: landing blobs downloaded ahead of the one being
+# converted, and rows buffered per parquet row group.
+STREAM_PREFETCH = 4
+STREAM_ROW_GROUP_ROWS = 50_000
+
+# transform-daily-range: days transformed concurrently, progress checkpointed
+# to blob storage (one JSON per range) so a timed-out call resumes where it
+# stopped. New days stop being started after the time budget, which stays
+# under the ~230 s HTTP response limit.
+BACKFILL_CHECKPOINT_PREFIX = f"{BLOB_BASE}/checkpoints/transform-range/"
+BACKFILL_WORKERS = 4
+BACKFILL_CHECKPOINT_EVERY = 5
+BACKFILL_TIME_BUDGET_S = 180
+# Day statuses that a resumed run does not redo ("no_data" / "error" are retried:
+# landing files may arrive later, errors may be transient).
+BACKFILL_DONE_STATUSES = {"success", "skipped"}
+
 # Pre-computed file index (one row per DECLARATIONID)
 INDEX_BLOB_PATH = f"{BLOB_BASE}/index/file_index.parquet"
 
+# Watermark for incremental build-index: every transformed parquet already
+# merged into the index, with the ETag it had at the time.
+INDEX_MANIFEST_PATH = f"{BLOB_BASE}/index/manifest.json"
+
+# Declaration → partitions locator, written next to the index. Sorted by
+# DECLARATIONID in small row groups: a lookup reads one row group, not the file.
+LOCATOR_BLOB_PATH = f"{BLOB_BASE}/index/declaration_locator.parquet"
+LOCATOR_ROW_GROUP_SIZE = 20_000
+
+# Users directory (GET users), written with the index: every human user with
+# the first / last day they appear, as a ready-to-serve cache blob.
+USERS_DIRECTORY_PATH = f"{BLOB_BASE}/index/users_directory.json"
+
+# Blobs up to this size are fetched in one request; larger ones are read by
+# byte range (parquet footer + only the row groups that are needed).
+RANGE_READ_MIN_BYTES = 4 * 1024 * 1024
+
 # Cache paths (instant-read endpoints)
 SUMMARY_BLOB_PATH = f"Dashboard/cache/users_summaryV3.json"
 USER_CACHE_PATH_PREFIX = "Dashboard/cache/usersV3/"
 
+# Cache blobs are written as compact JSON plus a gzip copy at <path>.gz, which
+# GET hands out as-is (Content-Encoding: gzip) to clients that accept it.
+CACHE_GZIP_SUFFIX = ".gz"
+CACHE_GZIP_LEVEL = 6
+
+# Watermark for incremental refresh-users (partitions + ETags already reflected
+# in the per-user caches, plus users whose cache failed last time).
+USERS_MANIFEST_PATH = f"{BLOB_BASE}/index/users_manifest.json"
+
+# Worker processes of refresh-users ?engine=sharded (override with ?workers=N).
+# Each gets a balanced share of the users and maps only their declarations.
+REFRESH_SHARD_WORKERS = os.cpu_count() or 1
+
+# Concurrent per-user cache uploads (per process). Publishing is bound by blob
+# round-trips, not CPU, so this is well above the core count.
+CACHE_UPLOAD_WORKERS = 16
+
+# 10-day summary window (working days, today included).
+SUMMARY_DAYS = 10
+
+# Intraday micro-batches (POST /ingest-intraday): landing blobs of today not
+# seen yet are appended as one small parquet per call under
+# intraday/day=YYYY-MM-DD/ (outside transformed/, so the index, user and cube
+# jobs keep reading whole days). Each day folder holds a manifest.json of the
+# landing blobs (name → ETag) already ingested.
+INTRADAY_PREFIX = f"{BLOB_BASE}/intraday/"
+
+# Rows behind the 10-day summary (cleaned, deduplicated, sorted by
+# DECLARATIONID in small row groups) plus the window and micro-batches they
+# cover. Written by /refresh; /ingest-intraday reads only the row groups of
+# the declarations in a micro-batch.
+SUMMARY_BASE_PATH = f"{INTRADAY_PREFIX}summary_base.parquet"
+SUMMARY_BASE_MANIFEST_PATH = f"{INTRADAY_PREFIX}summary_base.json"
+SUMMARY_BASE_ROW_GROUP_SIZE = 20_000
+
+# Aggregate activity cube: one row per (user, day, principal, type, company)
+# with creation / modification / deletion / send counts and duration sums.
+CUBE_BLOB_PATH = f"{BLOB_BASE}/index/activity_cube.parquet"
+CUBE_ROW_GROUP_SIZE = 50_000
+
+# In-worker cache of blobs read on every GET (index, cube, summary / user
+# caches). Within BLOB_CACHE_TTL_S a warm worker answers from memory; after
+# that one properties call revalidates the ETag and the blob is downloaded
+# again only when it changed. The cache is an LRU bounded by the downloaded
+# size of its blobs (parsed values take a small multiple of that) and by entry
+# count, so one worker serving many ?user= caches does not keep them all.
+BLOB_CACHE_TTL_S = 15
+BLOB_CACHE_MAX_BYTES = 256 * 1024 * 1024
+BLOB_CACHE_MAX_ENTRIES = 2_000
+
 # Import declaration types — used to determine team membership
 IMPORT_TYPES = {"DMS_IMPORT", "IDMS_IMPORT"}
 
@@ -73,27 +215,26 @@ NEEDED_COLS = [
 ]
 
 # ---------------------------------------------------------------------------
-# Azure Services Initialization
+# Storage Initialization
 # ---------------------------------------------------------------------------
 try:
-    credential = DefaultAzureCredential()
-    kv_client = SecretClient(vault_url=KEY_VAULT_URL, credential=credential)
-    connection_string = kv_client.get_secret(SECRET_NAME).value
-    blob_service_client = BlobServiceClient.from_connection_string(connection_string)
+    if STORAGE_BACKEND == "local":
+        storage = LocalStorage(LOCAL_STORAGE_ROOT)
+        logging.info(f"performanceV3: local storage at {storage.root}")
+    else:
+        credential = DefaultAzureCredential()
+        kv_client = SecretClient(vault_url=KEY_VAULT_URL, credential=credential)
+        connection_string = kv_client.get_secret(SECRET_NAME).value
+        storage = AzureBlobStorage(connection_string, CONTAINER_NAME)
 except Exception as e:
-    logging.critical(f"Failed to initialize Azure services: {e}")
-    connection_string = None
-    blob_service_client = None
+    logging.critical(f"Failed to initialize {STORAGE_BACKEND} storage: {e}")
+    storage = None
 
 
 # ---------------------------------------------------------------------------
 # Helper: generic blob read / write
 # ---------------------------------------------------------------------------
 
-def _blob_client(path: str):
-    return blob_service_client.get_blob_client(CONTAINER_NAME, path)
-
-
 def _read_parquet(path: str, columns=None) -> pd.DataFrame:
     """Read a single parquet file from blob storage into a DataFrame.
 
@@ -102,11 +243,11 @@ def _read_parquet(path: str, columns=None) -> pd.DataFrame:
     size and memory. Columns missing from the file are ignored, so callers may
     safely pass a superset.
     """
-    bc = _blob_client(path)
-    if not bc.exists():
+    try:
+        data = storage.read(path)
+    except FileNotFoundError:
         logging.warning(f"Parquet not found: {path}")
         return pd.DataFrame()
-    data = bc.download_blob().readall()
     buf = io.BytesIO(data)
     if columns:
         available = set(pq.read_schema(buf).names)
@@ -116,32 +257,279 @@ def _read_parquet(path: str, columns=None) -> pd.DataFrame:
     return pd.read_parquet(buf)
 
 
-def _write_parquet(df: pd.DataFrame, path: str):
-    """Write a DataFrame as parquet to blob storage."""
+def _write_parquet(df: pd.DataFrame, path: str, **kwargs):
+    """Write a DataFrame as parquet to blob storage (kwargs go to to_parquet)."""
     buf = io.BytesIO()
-    df.to_parquet(buf, index=False)
-    _blob_client(path).upload_blob(buf.getvalue(), overwrite=True)
+    df.to_parquet(buf, index=False, **kwargs)
+    storage.write(path, buf.getvalue())
+    _forget_cached(path)
     logging.info(f"Saved parquet → {path}")
 
 
+class _BlobRangeReader(io.RawIOBase):
+    """
+    Read-only, seekable file over a blob that downloads only the byte ranges
+    asked for. Lets pyarrow read a parquet footer and selected row groups
+    without pulling the whole blob. Small blobs are fetched in one request.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._size = storage.size(path)
+        self._pos = 0
+        self._data = storage.read(path) if self._size <= RANGE_READ_MIN_BYTES else None
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._pos = max(0, offset)
+        return self._pos
+
+    def read(self, size=-1):
+        end = self._size if size is None or size < 0 else min(self._size, self._pos + size)
+        if end <= self._pos:
+            return b""
+        if self._data is not None:
+            data = self._data[self._pos:end]
+        else:
+            data = storage.read(self._path, offset=self._pos, length=end - self._pos)
+        self._pos += len(data)
+        return data
+
+    def readinto(self, b):
+        data = self.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+
+def _row_group_may_contain(stats, value) -> bool:
+    """True unless the row-group min/max statistics rule ``value`` out."""
+    if stats is None or not stats.has_min_max:
+        return True
+    try:
+        if isinstance(stats.min, (int, float)):
+            value = float(value)
+        return stats.min <= value <= stats.max
+    except (TypeError, ValueError):
+        return True
+
+
+def _read_parquet_rows(path: str, column: str, value) -> pd.DataFrame:
+    """
+    Read only the row groups of a parquet blob whose ``column`` statistics may
+    contain ``value`` (rows are not filtered further). Empty frame if missing.
+    """
+    try:
+        pf = pq.ParquetFile(_BlobRangeReader(path))
+    except FileNotFoundError:
+        logging.warning(f"Parquet not found: {path}")
+        return pd.DataFrame()
+    if column not in pf.schema_arrow.names:
+        return pf.read().to_pandas()
+    col_idx = pf.schema_arrow.get_field_index(column)
+    groups = [
+        i for i in range(pf.metadata.num_row_groups)
+        if _row_group_may_contain(pf.metadata.row_group(i).column(col_idx).statistics, value)
+    ]
+    if not groups:
+        return pd.DataFrame()
+    return pf.read_row_groups(groups).to_pandas()
+
+
+def _read_parquet_rows_in(path: str, column: str, values) -> pd.DataFrame:
+    """
+    Rows of a parquet blob whose ``column`` is one of ``values``. Only row
+    groups whose min/max statistics may hold one of them are downloaded, so a
+    file sorted by ``column`` costs a few row groups. Empty frame if missing.
+    """
+    values = sorted(values)
+    try:
+        pf = pq.ParquetFile(_BlobRangeReader(path))
+    except FileNotFoundError:
+        logging.warning(f"Parquet not found: {path}")
+        return pd.DataFrame()
+    if not values:
+        return pf.schema_arrow.empty_table().to_pandas()
+    col_idx = pf.schema_arrow.get_field_index(column)
+    groups = []
+    for i in range(pf.metadata.num_row_groups):
+        stats = pf.metadata.row_group(i).column(col_idx).statistics
+        if stats is None or not stats.has_min_max:
+            groups.append(i)
+            continue
+        k = bisect_left(values, stats.min)
+        if k < len(values) and values[k] <= stats.max:
+            groups.append(i)
+    if not groups:
+        return pf.schema_arrow.empty_table().to_pandas()
+    df = pf.read_row_groups(groups).to_pandas()
+    return df[df[column].isin(set(values))]
+
+
 def _read_json_blob(path: str):
     """Read a JSON blob and return as Python object. Returns None if missing."""
-    bc = _blob_client(path)
-    if not bc.exists():
+    try:
+        return json.loads(storage.read(path))
+    except FileNotFoundError:
         return None
-    return json.loads(bc.download_blob().readall())
 
 
 def _write_json_blob(data, path: str):
     """Write a Python object as JSON to blob storage."""
-    _blob_client(path).upload_blob(json.dumps(data, indent=2), overwrite=True)
+    storage.write(path, json.dumps(data, indent=2))
+    _forget_cached(path)
     logging.info(f"Saved JSON → {path}")
 
 
+# ---------------------------------------------------------------------------
+# Helper: in-worker blob cache (ETag revalidated)
+# ---------------------------------------------------------------------------
+
+_blob_cache = OrderedDict()  # path -> (etag, checked_at, parsed value, blob bytes), oldest use first
+_blob_cache_bytes = 0
+_blob_cache_lock = threading.Lock()
+
+
+def _cached_blob(path: str, parse):
+    """
+    (etag, parse(bytes)) for a blob, kept in this worker's memory.
+
+    Fresh entries (checked within BLOB_CACHE_TTL_S) are returned without
+    touching storage; older ones are revalidated with one ETag lookup and
+    re-downloaded only when the ETag changed. None when the blob is missing.
+    Cached values are shared between requests — callers must not mutate them.
+    """
+    with _blob_cache_lock:
+        entry = _blob_cache.get(path)
+        if entry:
+            _blob_cache.move_to_end(path)
+    now = time.monotonic()
+    if entry and now - entry[1] < BLOB_CACHE_TTL_S:
+        return entry[0], entry[2]
+
+    try:
+        if entry and storage.etag(path) == entry[0]:
+            etag, value, size = entry[0], entry[2], entry[3]
+        else:
+            data, etag = storage.read_with_etag(path)
+            value, size = parse(data), len(data)
+    except FileNotFoundError:
+        _forget_cached(path)
+        return None
+
+    _remember_cached(path, (etag, now, value, size))
+    return etag, value
+
+
+def _remember_cached(path: str, entry: tuple):
+    """Store a cache entry as most recently used, evicting the least recently used past the limits."""
+    global _blob_cache_bytes
+    with _blob_cache_lock:
+        old = _blob_cache.pop(path, None)
+        if old:
+            _blob_cache_bytes -= old[3]
+        _blob_cache[path] = entry
+        _blob_cache_bytes += entry[3]
+        # the entry just stored always stays, even when it alone is over the limit
+        while len(_blob_cache) > 1 and (
+            _blob_cache_bytes > BLOB_CACHE_MAX_BYTES or len(_blob_cache) > BLOB_CACHE_MAX_ENTRIES
+        ):
+            _, evicted = _blob_cache.popitem(last=False)
+            _blob_cache_bytes -= evicted[3]
+
+
+def _forget_cached(path: str):
+    """Drop a cached blob (called after this worker overwrites it)."""
+    global _blob_cache_bytes
+    with _blob_cache_lock:
+        old = _blob_cache.pop(path, None)
+        if old:
+            _blob_cache_bytes -= old[3]
+
+
+def _cached_parquet(path: str) -> pd.DataFrame:
+    """Parsed parquet from the in-worker cache (empty DataFrame if missing). Read-only."""
+    cached = _cached_blob(path, lambda data: pd.read_parquet(io.BytesIO(data)))
+    return cached[1] if cached else pd.DataFrame()
+
+
+def _cache_body(data) -> bytes:
+    """Compact JSON body of a cache blob (what _write_cache_blob uploads)."""
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+def _write_cache_blob(data, path: str, body: bytes = None) -> int:
+    """
+    Write an instant-read cache: compact JSON at path + gzipped copy at path.gz.
+    ``body`` is the already encoded _cache_body(data), if the caller has it.
+    Returns the number of bytes uploaded.
+    """
+    body = _cache_body(data) if body is None else body
+    packed = gzip.compress(body, CACHE_GZIP_LEVEL)
+    storage.write(path, body)
+    storage.write(path + CACHE_GZIP_SUFFIX, packed)
+    _forget_cached(path)
+    _forget_cached(path + CACHE_GZIP_SUFFIX)
+    logging.info(f"Saved cache → {path} (+{CACHE_GZIP_SUFFIX})")
+    return len(body) + len(packed)
+
+
+def _etag_matches(if_none_match, etag) -> bool:
+    """If-None-Match check (weak comparison, list and * allowed)."""
+    if not if_none_match or not etag:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or any(t.removeprefix("W/") == etag for t in tags)
+
+
+def _serve_cache_blob(req: func.HttpRequest, path: str, not_found: str) -> func.HttpResponse:
+    """
+    Serve a cache blob written by _write_cache_blob, as a conditional GET:
+      - bytes come from the in-worker cache (_cached_blob), so warm workers
+        answer without touching storage;
+      - ETag of the served blob is passed through; a matching If-None-Match
+        gets 304 without a body;
+      - Accept-Encoding: gzip -> the .gz copy with Content-Encoding: gzip
+        (plain blob when the copy is missing, e.g. caches from older runs).
+    """
+    if_none_match = req.headers.get("If-None-Match")
+    accepts_gzip = "gzip" in req.headers.get("Accept-Encoding", "").lower()
+    candidates = [path + CACHE_GZIP_SUFFIX, path] if accepts_gzip else [path]
+
+    for blob_path in candidates:
+        cached = _cached_blob(blob_path, bytes)
+        if cached is None:
+            continue
+        etag, body = cached
+        headers = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding", "ETag": etag}
+        if blob_path != path:
+            headers["Content-Encoding"] = "gzip"
+        if _etag_matches(if_none_match, etag):
+            return func.HttpResponse(status_code=304, headers=headers)
+        return func.HttpResponse(body, status_code=200, headers=headers, mimetype="application/json")
+
+    return func.HttpResponse(json.dumps({"error": not_found}), status_code=404, mimetype="application/json")
+
+
 def _list_blobs(prefix: str):
     """Return list of blob names under a given prefix."""
-    container: ContainerClient = blob_service_client.get_container_client(CONTAINER_NAME)
-    return [b.name for b in container.list_blobs(name_starts_with=prefix)]
+    return list(storage.list_etags(prefix))
+
+
+def _list_blob_etags(prefix: str) -> dict:
+    """Return {blob name: ETag} under a given prefix, in listing order."""
+    return storage.list_etags(prefix)
 
 
 def _download_json_frames(blob_names: list) -> list:
@@ -154,38 +542,70 @@ def _download_json_frames(blob_names: list) -> list:
     if not blob_names:
         return []
 
-    def _load(blob_name):
-        try:
-            raw = _blob_client(blob_name).download_blob().readall()
-            records = json.loads(raw)
-            if isinstance(records, list) and records:
-                return pd.DataFrame(records)
-        except Exception as e:
-            logging.error(f"Failed to read blob {blob_name}: {e}")
-        return None
-
     frames = []
     with ThreadPoolExecutor(max_workers=8) as ex:
-        for df in ex.map(_load, blob_names):
+        for df in ex.map(_load_landing_blob, blob_names):
             if df is not None:
                 frames.append(df)
     return frames
 
 
+def _load_landing_blob(blob_name: str):
+    """Parse one landing JSON blob into a DataFrame; None if empty or unreadable."""
+    try:
+        raw = storage.read(blob_name)
+        records = json.loads(raw)
+        if isinstance(records, list) and records:
+            return pd.DataFrame(records)
+    except Exception as e:
+        logging.error(f"Failed to read blob {blob_name}: {e}")
+    return None
+
+
+def _iter_landing_frames(blob_names: list):
+    """Yield parsed landing frames in blob order, downloading at most
+    STREAM_PREFETCH blobs ahead (so memory does not grow with the day)."""
+    names = iter(blob_names)
+    with ThreadPoolExecutor(max_workers=STREAM_PREFETCH) as ex:
+        pending = deque(ex.submit(_load_landing_blob, n) for _, n in zip(range(STREAM_PREFETCH), names))
+        while pending:
+            df = pending.popleft().result()
+            nxt = next(names, None)
+            if nxt is not None:
+                pending.append(ex.submit(_load_landing_blob, nxt))
+            if df is not None:
+                yield df
+
+
 def _read_all_transformed_df(columns=None) -> pd.DataFrame:
-    """Read every transformed daily parquet once, in parallel, into one frame.
+    """Read every transformed parquet (compacted months + daily files) once, in
+    parallel, into one frame.
 
     Reads are column-pruned (via ``columns``) and run concurrently, but results
     are concatenated in blob-name order so any tie-break-sensitive downstream
     logic (e.g. stable sorts on equal timestamps) stays deterministic.
     """
-    parquet_blobs = [b for b in _list_blobs(TRANSFORMED_PREFIX) if b.endswith(".parquet")]
+    return _read_parquets(list(_transformed_partitions()), columns=columns)
+
+
+def _read_parquets(parquet_blobs: list, columns=None, source_col=None) -> pd.DataFrame:
+    """
+    Read the given transformed parquet blobs in parallel and concat them in
+    list order. Files written before the canonical schema (or with an older
+    version) are normalised per blob; current ones are used as read.
+    With ``source_col``, every row is tagged with the blob it came from.
+    """
     if not parquet_blobs:
         return pd.DataFrame()
 
     def _load(blob_name):
         try:
-            return _read_parquet(blob_name, columns=columns)
+            df = _read_parquet(blob_name, columns=columns)
+            if not df.empty:
+                df = ensure_canonical(df)
+            if source_col and not df.empty:
+                df[source_col] = blob_name
+            return df
         except Exception as e:
             logging.error(f"Failed to read parquet {blob_name}: {e}")
             return None
@@ -197,7 +617,10 @@ def _read_all_transformed_df(columns=None) -> pd.DataFrame:
                 frames.append(df)
     if not frames:
         return pd.DataFrame()
-    return pd.concat(frames, ignore_index=True)
+    out = pd.concat(frames, ignore_index=True)
+    if source_col:
+        out[source_col] = out[source_col].astype("category")
+    return out
 
 
 # ---------------------------------------------------------------------------
@@ -223,10 +646,53 @@ def _daily_parquet_path(day) -> str:
     return f"{TRANSFORMED_PREFIX}year={day.year}/month={day.month:02d}/day={day.day:02d}/data.parquet"
 
 
+def _monthly_parquet_path(year: int, month: int) -> str:
+    return f"{TRANSFORMED_PREFIX}year={year}/month={month:02d}/data.parquet"
+
+
+def _partition_month(path: str):
+    """(year, month) of a daily or monthly transformed parquet, None otherwise."""
+    parts = dict(
+        p.split("=", 1) for p in path[len(TRANSFORMED_PREFIX):].split("/") if "=" in p
+    )
+    try:
+        return int(parts["year"]), int(parts["month"])
+    except (KeyError, ValueError):
+        return None
+
+
+def _transformed_partitions() -> dict:
+    """
+    {blob name: ETag} of the transformed parquets every reader should use:
+    compacted months plus the daily files of months not compacted yet. Daily
+    files of a compacted month are kept but shadowed by the monthly file.
+    """
+    blobs = {
+        name: etag for name, etag in _list_blob_etags(TRANSFORMED_PREFIX).items()
+        if name.endswith(".parquet")
+    }
+    monthly = {name for name in blobs if "/day=" not in name}
+    compacted = {_partition_month(name) for name in monthly}
+    return {
+        name: etag for name, etag in blobs.items()
+        if name in monthly or _partition_month(name) not in compacted
+    }
+
+
+def _invalidate_compacted_month(day):
+    """A day of a compacted month was (re)written: drop the monthly file so
+    readers fall back to the daily files until the month is compacted again."""
+    monthly_path = _monthly_parquet_path(day.year, day.month)
+    if storage.exists(monthly_path):
+        storage.delete(monthly_path)
+        logging.info(f"Dropped compacted month {day.year}-{day.month:02d} (day {day} re-transformed)")
+
+
 # ===========================================================================
 # ROUTE 1 – POST /transform-daily
 # Reads raw landing JSON files for a specific day (or today) and writes a
-# compressed daily parquet file.
+# compressed daily parquet file. Blobs are streamed one by one into the
+# parquet (bounded memory) — see _landing_to_parquet.
 # ===========================================================================
 
 def transform_daily(req: func.HttpRequest) -> func.HttpResponse:
@@ -247,55 +713,52 @@ def transform_daily(req: func.HttpRequest) -> func.HttpResponse:
         )
 
     out_path = _daily_parquet_path(target_date)
+    tel = RouteTelemetry("transform-daily", storage)
 
     # Skip if already transformed and force is not set
-    if not force and _blob_client(out_path).exists():
+    with tel.stage("list"):
+        exists = not force and storage.exists(out_path)
+        day_prefix = f"{LANDING_PREFIX}day={target_date.isoformat()}/"
+        json_blobs = [] if exists else _list_blobs(day_prefix)
+
+    if exists:
         return func.HttpResponse(
-            json.dumps({"status": "skipped", "message": f"Parquet already exists for {target_date}. Use ?force=true to overwrite."}),
+            json.dumps({"status": "skipped", "message": f"Parquet already exists for {target_date}. Use ?force=true to overwrite.",
+                        "telemetry": tel.finish()}),
             status_code=200, mimetype="application/json"
         )
 
-    day_prefix = f"{LANDING_PREFIX}day={target_date.isoformat()}/"
-    json_blobs = _list_blobs(day_prefix)
-
     if not json_blobs:
         return func.HttpResponse(
-            json.dumps({"status": "no_data", "message": f"No landing JSON files found for {target_date} under {day_prefix}"}),
+            json.dumps({"status": "no_data", "message": f"No landing JSON files found for {target_date} under {day_prefix}",
+                        "telemetry": tel.finish()}),
             status_code=200, mimetype="application/json"
         )
 
     logging.info(f"transform-daily: found {len(json_blobs)} JSON files for {target_date}")
 
-    frames = _download_json_frames(json_blobs)
+    # Streamed into the canonical, versioned schema (readers skip normalising)
+    stats = _landing_to_parquet(json_blobs, out_path, tel)
 
-    if not frames:
+    if not stats["rows_written"]:
         return func.HttpResponse(
-            json.dumps({"status": "no_data", "message": f"All JSON files for {target_date} were empty or unreadable."}),
+            json.dumps({"status": "no_data", "message": f"All JSON files for {target_date} were empty or unreadable.",
+                        "telemetry": tel.finish()}),
             status_code=200, mimetype="application/json"
         )
 
-    df = pd.concat(frames, ignore_index=True)
-
-    # Standardise columns
-    for col in ["USERCODE", "HISTORY_STATUS", "ACTIVECOMPANY", "TYPEDECLARATIONSSW", PRINCIPAL_FIELD]:
-        if col in df.columns:
-            df[col] = df[col].astype(str).str.strip().str.upper()
-
-    df["HISTORYDATETIME"] = pd.to_datetime(df["HISTORYDATETIME"], errors="coerce", format="mixed")
-
-    # Remove duplicates
-    dup_cols = [c for c in ["DECLARATIONID", "USERCODE", "HISTORY_STATUS", "HISTORYDATETIME"] if c in df.columns]
-    df = df.drop_duplicates(subset=dup_cols)
-
-    _write_parquet(df, out_path)
+    with tel.stage("invalidate_month"):
+        _invalidate_compacted_month(target_date)
 
     return func.HttpResponse(
         json.dumps({
             "status": "success",
             "date": str(target_date),
-            "rows_written": len(df),
-            "files_processed": len(frames),
-            "output_path": out_path
+            "rows_written": stats["rows_written"],
+            "files_processed": stats["files_read"],
+            "engine": stats["engine"],
+            "output_path": out_path,
+            "telemetry": tel.finish(),
         }),
         status_code=200, mimetype="application/json"
     )
@@ -306,12 +769,59 @@ def transform_daily(req: func.HttpRequest) -> func.HttpResponse:
 # Batch version of transform-daily. Processes every day in a date range.
 # Perfect for backfilling historical data in one single API call.
 #
+# Days run on a bounded worker pool (BACKFILL_WORKERS). Results are saved in a
+# checkpoint blob per range; calling again with the same params resumes:
+# days already "success"/"skipped" are not redone, the others are retried.
+# When the time budget runs out the call returns "partial" — call it again.
+#
 # Params:
 #   ?start=YYYY-MM-DD   (required) first day to process
 #   ?end=YYYY-MM-DD     (optional, defaults to today)
 #   ?force=true         (optional, overwrite days that already have a parquet)
+#   ?reset=true         (optional, ignore and overwrite the range checkpoint)
 # ===========================================================================
 
+def _landing_to_parquet(json_blobs: list, out_path: str, tel: RouteTelemetry = None) -> dict:
+    """
+    Convert a day's landing JSON blobs into ONE canonical, deduplicated parquet.
+
+    Streams blob by blob through write_canonical_stream into a temp file, so
+    peak memory is a few blobs plus one row group, not the whole day. Falls
+    back to the in-memory concat path when the blobs disagree on schema.
+    Returns {"files_read", "rows_written", "engine"}.
+    """
+    tel = tel or RouteTelemetry("transform-day")
+    with tempfile.TemporaryFile() as tmp:
+        try:
+            # download + parse + dedup + encode are pipelined: one stage
+            with tel.stage("stream") as st:
+                stats = write_canonical_stream(
+                    _iter_landing_frames(json_blobs), tmp, row_group_rows=STREAM_ROW_GROUP_ROWS
+                )
+                st["rows_out"] = stats["rows_written"]
+            if stats["rows_written"]:
+                with tel.stage("upload"):
+                    tmp.seek(0)
+                    storage.write(out_path, tmp)
+                logging.info(f"Saved parquet → {out_path}")
+            return {**stats, "engine": "stream"}
+        except SchemaDrift as e:
+            logging.warning(f"transform: schema drift across landing blobs ({e}), using in-memory path")
+
+    with tel.stage("download") as st:
+        frames = _download_json_frames(json_blobs)
+        st["rows_out"] = sum(len(f) for f in frames)
+    if not frames:
+        return {"files_read": 0, "rows_written": 0, "engine": "memory"}
+    with tel.stage("parse") as st:
+        df = to_canonical(pd.concat(frames, ignore_index=True))
+        df = df.drop_duplicates(subset=[c for c in DEDUP_COLS if c in df.columns])
+        st.update(rows_in=sum(len(f) for f in frames), rows_out=len(df))
+    with tel.stage("upload"):
+        _write_parquet(df, out_path)
+    return {"files_read": len(frames), "rows_written": len(df), "engine": "memory"}
+
+
 def _transform_one_day(target_date, force: bool) -> dict:
     """
     Core logic for a single day's transform. Returns a result dict.
@@ -320,7 +830,7 @@ def _transform_one_day(target_date, force: bool) -> dict:
     out_path = _daily_parquet_path(target_date)
     date_str = str(target_date)
 
-    if not force and _blob_client(out_path).exists():
+    if not force and storage.exists(out_path):
         return {"date": date_str, "status": "skipped", "reason": "parquet already exists"}
 
     day_prefix = f"{LANDING_PREFIX}day={date_str}/"
@@ -329,25 +839,18 @@ def _transform_one_day(target_date, force: bool) -> dict:
     if not json_blobs:
         return {"date": date_str, "status": "no_data", "reason": "no landing JSON files found"}
 
-    frames = _download_json_frames(json_blobs)
+    stats = _landing_to_parquet(json_blobs, out_path)
 
-    if not frames:
+    if not stats["rows_written"]:
         return {"date": date_str, "status": "no_data", "reason": "all JSON files were empty or unreadable"}
 
-    df = pd.concat(frames, ignore_index=True)
-    for col in ["USERCODE", "HISTORY_STATUS", "ACTIVECOMPANY", "TYPEDECLARATIONSSW", PRINCIPAL_FIELD]:
-        if col in df.columns:
-            df[col] = df[col].astype(str).str.strip().str.upper()
-    df["HISTORYDATETIME"] = pd.to_datetime(df["HISTORYDATETIME"], errors="coerce", format="mixed")
-    dup_cols = [c for c in ["DECLARATIONID", "USERCODE", "HISTORY_STATUS", "HISTORYDATETIME"] if c in df.columns]
-    df = df.drop_duplicates(subset=dup_cols)
-    _write_parquet(df, out_path)
+    _invalidate_compacted_month(target_date)
 
     return {
         "date": date_str,
         "status": "success",
-        "rows_written": len(df),
-        "files_read": len(frames)
+        "rows_written": stats["rows_written"],
+        "files_read": stats["files_read"]
     }
 
 
@@ -359,6 +862,7 @@ def transform_daily_range(req: func.HttpRequest) -> func.HttpResponse:
     start_str = req.params.get("start")
     end_str = req.params.get("end")
     force = req.params.get("force", "false").lower() == "true"
+    reset = req.params.get("reset", "false").lower() == "true"
 
     if not start_str:
         return func.HttpResponse(
@@ -388,164 +892,388 @@ def transform_daily_range(req: func.HttpRequest) -> func.HttpResponse:
         all_days.append(curr)
         curr += timedelta(days=1)
 
-    logging.info(f"transform-daily-range: processing {len(all_days)} days ({start_date} → {end_date}), force={force}")
+    checkpoint_path = f"{BACKFILL_CHECKPOINT_PREFIX}{start_date}_{end_date}{'_force' if force else ''}.json"
+    checkpoint = None if reset else _read_json_blob(checkpoint_path)
+    day_results = (checkpoint or {}).get("days", {})
+    todo = [d for d in all_days if day_results.get(str(d), {}).get("status") not in BACKFILL_DONE_STATUSES]
 
-    results = []
-    success_count = 0
-    skipped_count = 0
-    no_data_count = 0
+    logging.info(f"transform-daily-range: {len(all_days)} days ({start_date} → {end_date}), force={force}, "
+                 f"{len(all_days) - len(todo)} done per checkpoint, {len(todo)} to process")
 
-    for day in all_days:
+    def _save_checkpoint():
+        _write_json_blob({
+            "start": str(start_date),
+            "end": str(end_date),
+            "force": force,
+            "updated_at": datetime.utcnow().isoformat(),
+            "days": day_results,
+        }, checkpoint_path)
+
+    def _run_day(day):
         try:
-            result = _transform_one_day(day, force)
-            results.append(result)
-            if result["status"] == "success":
-                success_count += 1
-                logging.info(f"  ✔ {day}: {result.get('rows_written', 0)} rows")
-            elif result["status"] == "skipped":
-                skipped_count += 1
-                logging.info(f"  ⏩ {day}: skipped (already exists)")
-            else:
-                no_data_count += 1
-                logging.info(f"  ∅ {day}: no data")
+            return _transform_one_day(day, force)
         except Exception as e:
             logging.error(f"  ✘ {day}: error — {e}")
-            results.append({"date": str(day), "status": "error", "reason": str(e)})
+            return {"date": str(day), "status": "error", "reason": str(e)}
+
+    started = time.monotonic()
+    results = []
+    queue = iter(todo)
+    in_flight = {}
+    with ThreadPoolExecutor(max_workers=BACKFILL_WORKERS) as ex:
+        while True:
+            # Keep the pool full until the time budget is spent
+            while len(in_flight) < BACKFILL_WORKERS and time.monotonic() - started < BACKFILL_TIME_BUDGET_S:
+                day = next(queue, None)
+                if day is None:
+                    break
+                in_flight[ex.submit(_run_day, day)] = day
+            if not in_flight:
+                break
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                in_flight.pop(fut)
+                result = fut.result()
+                results.append(result)
+                day_results[result["date"]] = result
+                logging.info(f"  {result['date']}: {result['status']} ({result.get('rows_written', 0)} rows)")
+                if len(results) % BACKFILL_CHECKPOINT_EVERY == 0:
+                    _save_checkpoint()
+    if results or checkpoint is None:
+        _save_checkpoint()
+
+    remaining = [d for d in all_days if day_results.get(str(d), {}).get("status") not in BACKFILL_DONE_STATUSES]
+    unstarted = len(todo) - len(results)
+    results.sort(key=lambda r: r["date"])
+
+    def _count(status):
+        return sum(1 for r in day_results.values() if r.get("status") == status)
 
     return func.HttpResponse(
         json.dumps({
-            "status": "done",
+            "status": "partial" if unstarted else "done",
             "range": f"{start_date} → {end_date}",
             "total_days": len(all_days),
-            "success": success_count,
-            "skipped": skipped_count,
-            "no_data": no_data_count,
+            "processed_this_call": len(results),
+            "remaining": len(remaining),
+            "elapsed_s": round(time.monotonic() - started, 1),
+            "success": _count("success"),
+            "skipped": _count("skipped"),
+            "no_data": _count("no_data"),
+            "errors": _count("error"),
+            "checkpoint_path": checkpoint_path,
             "per_day": results
         }),
         status_code=200, mimetype="application/json"
     )
 
 
-# Reads ALL daily parquet files and builds/updates the file_index.parquet.
-# The index has ONE row per DECLARATIONID with pre-computed flags.
 # ===========================================================================
-PRINCIPAL_FIELD = "PRINCIPAL"    # principal field from euchistory data
+# ROUTE 1c – POST /compact-months
+# Merges the daily parquets of closed months into ONE parquet per month: rows
+# sorted by DECLARATIONID/HISTORYDATETIME, dictionary-encoded low-cardinality
+# columns and large row groups (with min/max statistics, so file-lifecycle
+# reads a single row group). Full scans then pay per-blob overhead once per
+# month instead of once per day.
+#
+# Daily files are kept (they stay the regenerable source) but every reader
+# skips them once their month is compacted (see _transformed_partitions).
+# Re-transforming a day drops its month's compacted file until the next run.
+# The partition set changes, so the next incremental build-index /
+# refresh-users falls back to a full rebuild.
+#
+# Params:
+#   ?month=YYYY-MM      (optional) only compact this month (must be closed)
+#   ?force=true         (optional) re-compact months that already have a file
+# ===========================================================================
 
-def build_index(req: func.HttpRequest) -> func.HttpResponse:
-    """
-    Reads all transformed/year=.../month=.../day=.../data.parquet files,
-    groups by DECLARATIONID, and writes index/file_index.parquet.
-    """
-    logging.info("build-index: starting full scan of transformed parquet files")
+def _compact_month(year: int, month: int, daily_blobs: list) -> dict:
+    out_path = _monthly_parquet_path(year, month)
+    label = f"{year}-{month:02d}"
 
-    parquet_blobs = [b for b in _list_blobs(TRANSFORMED_PREFIX) if b.endswith(".parquet")]
+    # Not _read_parquets: a day that fails to read must fail the month, or the
+    # compacted file would silently shadow data it does not contain.
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        frames = [df for df in ex.map(_read_parquet, daily_blobs) if not df.empty]
+    if not frames:
+        return {"month": label, "status": "no_data", "daily_files": len(daily_blobs)}
 
-    if not parquet_blobs:
-        return func.HttpResponse(
-            json.dumps({"status": "no_data", "message": "No transformed parquet files found."}),
-            status_code=200, mimetype="application/json"
-        )
+    df = concat_canonical(frames)
+    # Stable sort: rows with equal keys keep their day-file order.
+    df = df.sort_values(["DECLARATIONID", "HISTORYDATETIME"], kind="mergesort")
 
-    logging.info(f"build-index: loading {len(parquet_blobs)} parquet files (parallel, column-pruned)")
+    _write_parquet(
+        df, out_path,
+        row_group_size=COMPACT_ROW_GROUP_SIZE,
+        use_dictionary=[c for c in COMPACT_DICTIONARY_COLS if c in df.columns],
+    )
+    return {"month": label, "status": "success", "daily_files": len(daily_blobs), "rows_written": len(df)}
 
-    df = _read_all_transformed_df(columns=NEEDED_COLS)
 
-    if df.empty:
-        return func.HttpResponse(
-            json.dumps({"error": "Could not read any transformed parquet files."}),
-            status_code=500, mimetype="application/json"
-        )
+def compact_months(req: func.HttpRequest) -> func.HttpResponse:
+    month_str = req.params.get("month")
+    force = req.params.get("force", "false").lower() == "true"
+
+    only = None
+    if month_str:
+        try:
+            parsed = datetime.strptime(month_str, "%Y-%m")
+        except ValueError:
+            return func.HttpResponse(
+                json.dumps({"error": "Invalid month format. Use YYYY-MM"}),
+                status_code=400, mimetype="application/json"
+            )
+        only = (parsed.year, parsed.month)
+
+    # A month is closed once its last day is at least COMPACT_GRACE_DAYS old.
+    cutoff = datetime.utcnow().date() - timedelta(days=COMPACT_GRACE_DAYS)
+    open_from = (cutoff.year, cutoff.month)
+
+    daily = defaultdict(list)
+    compacted = set()
+    for name in _list_blobs(TRANSFORMED_PREFIX):
+        key = _partition_month(name)
+        if not name.endswith(".parquet") or key is None:
+            continue
+        if "/day=" in name:
+            daily[key].append(name)
+        else:
+            compacted.add(key)
+
+    results = []
+    for key in sorted(daily):
+        if only is not None and key != only:
+            continue
+        label = f"{key[0]}-{key[1]:02d}"
+        if key >= open_from:
+            results.append({"month": label, "status": "skipped", "reason": "month not closed yet"})
+            continue
+        if key in compacted and not force:
+            results.append({"month": label, "status": "skipped", "reason": "already compacted"})
+            continue
+        try:
+            result = _compact_month(key[0], key[1], daily[key])
+            logging.info(f"compact-months: {label} → {result['status']} ({result.get('rows_written', 0)} rows)")
+        except Exception as e:
+            logging.error(f"compact-months: {label} failed — {e}")
+            result = {"month": label, "status": "error", "reason": str(e)}
+        results.append(result)
+
+    return func.HttpResponse(
+        json.dumps({
+            "status": "done",
+            "compacted": sum(1 for r in results if r["status"] == "success"),
+            "skipped": sum(1 for r in results if r["status"] == "skipped"),
+            "errors": sum(1 for r in results if r["status"] == "error"),
+            "per_month": results,
+        }),
+        status_code=200, mimetype="application/json"
+    )
 
-    # Standardise
-    for col in ["USERCODE", "HISTORY_STATUS", "ACTIVECOMPANY", "TYPEDECLARATIONSSW", PRINCIPAL_FIELD]:
-        if col in df.columns:
-            df[col] = df[col].astype(str).str.strip().str.upper()
 
-    df["HISTORYDATETIME"] = pd.to_datetime(df["HISTORYDATETIME"], errors="coerce", format="mixed")
+# ===========================================================================
+# ROUTE 2 – POST /build-index
+# Reads ALL transformed parquets (compacted months + daily files of open
+# months) and builds/updates the file_index.parquet.
+# The index has ONE row per DECLARATIONID with pre-computed flags.
+# Also writes declaration_locator.parquet (DECLARATIONID → partitions holding
+# its rows), used by file-lifecycle and by incremental builds.
+#
+# Params:
+#   ?mode=incremental   (optional) only re-index declarations found in new or
+#                       changed partitions (see manifest.json), merge the rows
+#                       into the existing index. Falls back to a full rebuild
+#                       when there is no manifest/index/locator or a partition
+#                       vanished.
+#   ?engine=loop        (optional) use the legacy per-declaration loop
+# ===========================================================================
+
+def _clean_history_df(df: pd.DataFrame) -> pd.DataFrame:
+    """Drop unusable rows the way the index and user caches expect them.
+
+    Frames from _read_parquets are already in the canonical schema, so only
+    frames from elsewhere get standardised here.
+    """
+    if df.empty:
+        return df
+    df = ensure_canonical(df)
     df = df.dropna(subset=["HISTORYDATETIME", "DECLARATIONID"])
 
     # Filter out DKM_VP
     if "ACTIVECOMPANY" in df.columns:
         df = df[df["ACTIVECOMPANY"] != "DKM_VP"]
+    return df
 
-    logging.info(f"build-index: total rows loaded = {len(df)}, building index…")
 
-    index_rows = []
-    system_users = {"BATCHPROC", "ADMIN", "SYSTEM", "BATCH_PROC"}
+def _index_engine(engine: str):
+    # Vectorized engine by default; ?engine=loop runs the original per-declaration loop.
+    return build_index_frame_loop if engine == "loop" else build_index_frame
 
-    for decl_id, group in df.groupby("DECLARATIONID"):
-        group = group.sort_values("HISTORYDATETIME")
 
-        statuses = group["HISTORY_STATUS"].tolist()
-        users = group["USERCODE"].tolist()
+def _write_index_manifest(partitions: dict):
+    _write_json_blob({
+        "built_at": datetime.utcnow().isoformat(),
+        "partitions": partitions,
+    }, INDEX_MANIFEST_PATH)
 
-        has_interface = "INTERFACE" in set(statuses)
-        has_manual_trigger = bool({"COPIED", "COPY", "NEW"}.intersection(set(statuses)))
 
-        first_seen = group["HISTORYDATETIME"].min().date().isoformat()
-        last_seen = group["HISTORYDATETIME"].max().date().isoformat()
+def _write_locator(locator_df: pd.DataFrame):
+    _write_parquet(locator_df, LOCATOR_BLOB_PATH, row_group_size=LOCATOR_ROW_GROUP_SIZE)
 
-        company = str(group["ACTIVECOMPANY"].iloc[0]) if "ACTIVECOMPANY" in group.columns else ""
-        principal = str(group[PRINCIPAL_FIELD].iloc[0]) if PRINCIPAL_FIELD in group.columns else ""
-        type_val = str(group["TYPEDECLARATIONSSW"].iloc[0]) if "TYPEDECLARATIONSSW" in group.columns else ""
 
-        unique_users = list(group["USERCODE"].unique())
-        human_users = [u for u in unique_users if u not in system_users]
+def _users_directory_payload(index_df: pd.DataFrame) -> dict:
+    users = build_users_directory(index_df)
+    return {"status": "success", "total_users": len(users), "users": users}
 
-        # created_by = first user action
-        created_by = str(group.iloc[0]["USERCODE"])
 
-        # modified_by = human with most MODIFIED actions (fallback to first human, then created_by)
-        human_actions = group[~group["USERCODE"].isin(system_users)]
-        mod_rows = human_actions[human_actions["HISTORY_STATUS"] == "MODIFIED"]
-        if not mod_rows.empty:
-            modified_by = str(mod_rows["USERCODE"].value_counts().idxmax())
-        elif not human_actions.empty:
-            modified_by = str(human_actions.iloc[0]["USERCODE"])
-        else:
-            modified_by = created_by
-
-        # file_creation_duration: hours from first MODIFIED → first WRT_ENT
-        session_start = None
-        file_creation_duration = None
-        for _, row in group.iterrows():
-            if row["HISTORY_STATUS"] == "MODIFIED" and session_start is None:
-                session_start = row["HISTORYDATETIME"]
-            elif row["HISTORY_STATUS"] == "WRT_ENT" and session_start is not None:
-                file_creation_duration = round((row["HISTORYDATETIME"] - session_start).total_seconds() / 3600, 3)
-                break
+def _write_users_directory(index_df: pd.DataFrame):
+    _write_cache_blob(_users_directory_payload(index_df), USERS_DIRECTORY_PATH)
+
+
+def _build_index_incremental(partitions: dict, engine: str, tel: RouteTelemetry):
+    """
+    Merge new/changed partitions into the existing index (and locator).
+
+    Returns a response dict, or None when a full rebuild is required.
+    """
+    with tel.stage("read_manifest"):
+        manifest = _read_json_blob(INDEX_MANIFEST_PATH) or {}
+    seen = manifest.get("partitions") or {}
+    if not seen:
+        logging.info("build-index: no manifest yet, full rebuild required")
+        return None
+
+    removed = [p for p in seen if p not in partitions]
+    if removed:
+        logging.info(f"build-index: {len(removed)} partitions disappeared, full rebuild required")
+        return None
 
-        sending_count = int((group["HISTORY_STATUS"] == "DEC_DAT").sum())
-        modification_count = int((group["HISTORY_STATUS"] == "MODIFIED").sum())
-
-        index_rows.append({
-            "DECLARATIONID": decl_id,
-            "first_seen": first_seen,
-            "last_seen": last_seen,
-            "principal": principal,
-            "company": company,
-            "users": json.dumps(unique_users),       # stored as JSON string in parquet
-            "human_users": json.dumps(human_users),
-            "has_interface": has_interface,
-            "has_manual_trigger": has_manual_trigger,
-            "created_by": created_by,
-            "modified_by": modified_by,
-            "file_creation_duration": file_creation_duration,
-            "statuses": json.dumps(list(set(statuses))),
-            "sending_count": sending_count,
-            "modification_count": modification_count,
-            "type": type_val,
-        })
-
-    index_df = pd.DataFrame(index_rows)
-    _write_parquet(index_df, INDEX_BLOB_PATH)
+    changed = [p for p, etag in partitions.items() if seen.get(p) != etag]
+    if not changed:
+        return {"status": "up_to_date", "mode": "incremental", "changed_partitions": 0, "telemetry": tel.finish()}
+
+    with tel.stage("read_index") as st:
+        index_df = upgrade_index_frame(_read_parquet(INDEX_BLOB_PATH))
+        locator_df = _read_parquet(LOCATOR_BLOB_PATH)
+        st["rows_out"] = len(index_df)
+    if index_df.empty or locator_df.empty:
+        logging.info("build-index: index or locator missing, full rebuild required")
+        return None
+
+    with tel.stage("read_delta") as st:
+        delta = _clean_history_df(_read_parquets(changed, columns=NEEDED_COLS))
+        st["rows_out"] = len(delta)
+    affected = set(delta["DECLARATIONID"].astype(str)) if not delta.empty else set()
+
+    with tel.stage("locate"):
+        # Declarations that used to live in a re-written partition must be rebuilt
+        # too, even if they no longer appear in its new version.
+        located = locator_df.explode("partitions")
+        rewritten = {p for p in changed if p in seen}
+        if rewritten:
+            affected.update(located.loc[located["partitions"].isin(rewritten), "DECLARATIONID"])
+
+        # Earlier history of the affected declarations: the partitions the locator
+        # lists for them.
+        history_parts = set(located.loc[located["DECLARATIONID"].isin(affected), "partitions"])
+
+    changed_set = set(changed)
+    to_read = [p for p in partitions if p in changed_set or p in history_parts]
+    logging.info(f"build-index: {len(changed)} changed partitions, {len(affected)} affected declarations, "
+                 f"reading {len(to_read)} of {len(partitions)} partitions")
+
+    with tel.stage("read_history") as st:
+        history = _clean_history_df(_read_parquets(to_read, columns=NEEDED_COLS, source_col="_partition"))
+        if not history.empty:
+            history = history[history["DECLARATIONID"].astype(str).isin(affected)]
+        st["rows_out"] = len(history)
+    with tel.stage("build") as st:
+        new_rows = _index_engine(engine)(history)
+        merged = merge_index_rows(index_df, new_rows, affected)
+        locator_merged = merge_index_rows(locator_df, build_locator_frame(history, "_partition"), affected)
+        st.update(rows_in=len(history), rows_out=len(new_rows))
+
+    with tel.stage("upload"):
+        _write_parquet(merged, INDEX_BLOB_PATH)
+        _write_locator(locator_merged)
+        _write_users_directory(merged)
+        _write_index_manifest(partitions)
+
+    return {
+        "status": "success",
+        "mode": "incremental",
+        "changed_partitions": len(changed),
+        "partitions_read": len(to_read),
+        "declarations_reindexed": len(affected),
+        "total_declarations_indexed": len(merged),
+        "engine": engine,
+        "index_path": INDEX_BLOB_PATH,
+        "telemetry": tel.finish(),
+    }
+
+
+def build_index(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Reads all transformed parquets (see _transformed_partitions), groups by
+    DECLARATIONID, and writes index/file_index.parquet.
+    """
+    engine = req.params.get("engine", "vectorized").lower()
+    mode = req.params.get("mode", "full").lower()
+    logging.info(f"build-index: starting (mode={mode}, engine={engine})")
+    tel = RouteTelemetry("build-index", storage)
+
+    with tel.stage("list"):
+        partitions = _transformed_partitions()
+
+    if not partitions:
+        return func.HttpResponse(
+            json.dumps({"status": "no_data", "message": "No transformed parquet files found.", "telemetry": tel.finish()}),
+            status_code=200, mimetype="application/json"
+        )
+
+    if mode == "incremental":
+        result = _build_index_incremental(partitions, engine, tel)
+        if result is not None:
+            return func.HttpResponse(json.dumps(result), status_code=200, mimetype="application/json")
+
+    parquet_blobs = list(partitions)
+    logging.info(f"build-index: loading {len(parquet_blobs)} parquet files (parallel, column-pruned)")
+
+    with tel.stage("read") as st:
+        df = _read_parquets(parquet_blobs, columns=NEEDED_COLS, source_col="_partition")
+        st["rows_out"] = len(df)
+
+    if df.empty:
+        return func.HttpResponse(
+            json.dumps({"error": "Could not read any transformed parquet files."}),
+            status_code=500, mimetype="application/json"
+        )
+
+    with tel.stage("clean", rows_in=len(df)) as st:
+        df = _clean_history_df(df)
+        st["rows_out"] = len(df)
+
+    logging.info(f"build-index: total rows loaded = {len(df)}, building index…")
+
+    with tel.stage("build") as st:
+        index_df = _index_engine(engine)(df)
+        locator_df = build_locator_frame(df, "_partition")
+        st.update(rows_in=len(df), rows_out=len(index_df))
+    with tel.stage("upload"):
+        _write_parquet(index_df, INDEX_BLOB_PATH)
+        _write_locator(locator_df)
+        _write_users_directory(index_df)
+        _write_index_manifest(partitions)
 
     return func.HttpResponse(
         json.dumps({
             "status": "success",
+            "mode": "full",
             "total_declarations_indexed": len(index_df),
             "source_files": len(parquet_blobs),
-            "index_path": INDEX_BLOB_PATH
+            "engine": engine,
+            "index_path": INDEX_BLOB_PATH,
+            "telemetry": tel.finish(),
         }),
         status_code=200, mimetype="application/json"
     )
@@ -554,20 +1282,89 @@ def build_index(req: func.HttpRequest) -> func.HttpResponse:
 # ===========================================================================
 # ROUTE 3 – POST /refresh-users
 # ===========================================================================
-# Single-pass strategy: read ALL transformed daily parquets ONCE (column-pruned,
-# in parallel), then slice that in-memory frame per user and feed each slice to
-# the UNCHANGED _compute_rich_user_metrics. This produces byte-identical output
-# to the previous per-user version but downloads each parquet once instead of
-# once per user (the old path re-read the same ~40 files for every user).
+# Single-pass strategy: read ALL transformed parquets ONCE (column-pruned,
+# in parallel), then compute every user's metrics in one pass with
+# compute_all_user_metrics: the frame is sorted once and each declaration is
+# analysed once, instead of once per user who touched it. Output matches the
+# per-user compute_rich_user_metrics path.
+#
+# Caches are uploaded by a pool of CACHE_UPLOAD_WORKERS threads. The manifest
+# keeps each cache's content hash: a cache whose body did not change (and is
+# still in storage) is not uploaded again. The response and the "upload"
+# telemetry stage report uploaded / unchanged counts and uploads/s, MB/s.
+#
+# Params:
+#   ?engine=loop        (optional) slice the frame per user and run the
+#                       per-user compute_rich_user_metrics instead
+#   ?engine=sharded     (optional) run the kernel in REFRESH_SHARD_WORKERS
+#                       processes (?workers=N): users are balanced by the rows
+#                       of their declarations, the cleaned frame is shared once
+#                       as Arrow IPC in shared memory, and each worker reads
+#                       only its shard's rows and uploads its own caches. A
+#                       failed shard leaves its users pending for the next run.
+#   ?mode=incremental   (optional) only recompute "dirty" users: everyone who
+#                       touched a declaration that appears in a partition added
+#                       since the last run (users_manifest.json). Other caches
+#                       are left untouched. A rewritten or vanished partition,
+#                       or a missing manifest, falls back to a full refresh.
 # ===========================================================================
 
+def _dirty_users_since_last_run(partitions: dict, manifest: dict):
+    """
+    Compare partitions against the users manifest.
+
+    Returns (new_partitions, pending_users), or None when a full refresh is
+    required. pending_users are users whose cache failed on the previous run.
+    """
+    seen = manifest.get("partitions") or {}
+    if not seen:
+        logging.info("refresh-users: no manifest yet, full refresh required")
+        return None
+
+    if any(p not in partitions for p in seen):
+        logging.info("refresh-users: partitions disappeared, full refresh required")
+        return None
+
+    # A rewritten partition may have dropped rows, so we cannot tell which
+    # users it used to affect.
+    if any(p in seen and seen[p] != etag for p, etag in partitions.items()):
+        logging.info("refresh-users: partitions were rewritten, full refresh required")
+        return None
+
+    new_partitions = [p for p in partitions if p not in seen]
+    return new_partitions, set(manifest.get("pending_users") or [])
+
+
 def refresh_users(req: func.HttpRequest) -> func.HttpResponse:
-    logging.info("refresh-users: starting rich user metrics rebuild (single-pass)")
+    mode = req.params.get("mode", "full").lower()
+    engine = req.params.get("engine", "kernel").lower()
+    try:
+        workers = max(1, int(req.params.get("workers", REFRESH_SHARD_WORKERS)))
+    except ValueError:
+        return func.HttpResponse(
+            json.dumps({"error": "workers must be an integer"}),
+            status_code=400, mimetype="application/json"
+        )
+    logging.info(f"refresh-users: starting rich user metrics rebuild (single-pass, mode={mode}, engine={engine})")
+    tel = RouteTelemetry("refresh-users", storage)
+
+    with tel.stage("list"):
+        partitions = _transformed_partitions()
+        manifest = _read_json_blob(USERS_MANIFEST_PATH) or {}
+        dirty = _dirty_users_since_last_run(partitions, manifest) if mode == "incremental" else None
+    if mode == "incremental" and dirty is not None and not dirty[0] and not dirty[1]:
+        return func.HttpResponse(
+            json.dumps({"status": "up_to_date", "mode": "incremental", "new_partitions": 0, "telemetry": tel.finish()}),
+            status_code=200, mimetype="application/json"
+        )
 
-    full_df = _read_all_transformed_df(columns=NEEDED_COLS)
+    with tel.stage("read") as st:
+        full_df = _read_parquets(list(partitions), columns=NEEDED_COLS)
+        st["rows_out"] = len(full_df)
     if full_df.empty:
         return func.HttpResponse(
-            json.dumps({"status": "skipped", "message": "No transformed parquet data found. Run /transform-daily first."}),
+            json.dumps({"status": "skipped", "message": "No transformed parquet data found. Run /transform-daily first.",
+                        "telemetry": tel.finish()}),
             status_code=200, mimetype="application/json"
         )
 
@@ -575,465 +1372,623 @@ def refresh_users(req: func.HttpRequest) -> func.HttpResponse:
     # path) used: standardise text columns, require a valid datetime/declaration,
     # and drop DKM_VP. This guarantees the discovered user set and per-user
     # declaration sets match the old index-driven behaviour.
-    for col in ["USERCODE", "HISTORY_STATUS", "ACTIVECOMPANY", "TYPEDECLARATIONSSW", PRINCIPAL_FIELD]:
-        if col in full_df.columns:
-            full_df[col] = full_df[col].astype(str).str.strip().str.upper()
-    full_df["HISTORYDATETIME"] = pd.to_datetime(full_df["HISTORYDATETIME"], errors="coerce", format="mixed")
-    full_df = full_df.dropna(subset=["HISTORYDATETIME", "DECLARATIONID"])
-    if "ACTIVECOMPANY" in full_df.columns:
-        full_df = full_df[full_df["ACTIVECOMPANY"] != "DKM_VP"]
-    full_df["DECLARATIONID"] = full_df["DECLARATIONID"].astype(str)
+    with tel.stage("clean", rows_in=len(full_df)) as st:
+        full_df = _clean_history_df(full_df)
+        full_df["DECLARATIONID"] = full_df["DECLARATIONID"].astype(str)
+        st["rows_out"] = len(full_df)
 
     if full_df.empty:
         return func.HttpResponse(
-            json.dumps({"status": "skipped", "message": "No usable rows after cleaning."}),
+            json.dumps({"status": "skipped", "message": "No usable rows after cleaning.", "telemetry": tel.finish()}),
             status_code=200, mimetype="application/json"
         )
 
-    # user -> array(DECLARATIONID) in one vectorized pass (replaces the per-user
-    # index .apply scan that was O(users x declarations)).
-    user_to_decls = full_df.groupby("USERCODE")["DECLARATIONID"].unique()
-    all_users = sorted(
-        u for u in user_to_decls.index
-        if u not in SYSTEM_USERS and u not in ("NAN", "NONE", "")
-    )
+    with tel.stage("discover_users", rows_in=len(full_df)) as st:
+        # user -> array(DECLARATIONID) in one vectorized pass (replaces the per-user
+        # index .apply scan that was O(users x declarations)).
+        user_to_decls = full_df.groupby("USERCODE")["DECLARATIONID"].unique()
+        all_users = sorted(
+            u for u in user_to_decls.index
+            if u not in SYSTEM_USERS and u not in ("NAN", "NONE", "")
+        )
+        st["rows_out"] = len(all_users)
     logging.info(f"refresh-users: discovered {len(all_users)} human users from {len(full_df)} rows")
 
-    processed_count = 0
-    failed_count = 0
-
-    for user in all_users:
-        try:
-            decl_ids = set(user_to_decls.loc[user])
-            # Slice the in-memory frame (no blob re-reads). _compute_rich_user_metrics
-            # copies and re-cleans internally, so this is the exact same input the
-            # old path built from per-day parquet reads.
-            user_df = full_df[full_df["DECLARATIONID"].isin(decl_ids)]
+    target_users = all_users
+    dirty_decls = None
+    if dirty is not None:
+        new_partitions, pending_users = dirty
+        # Any user on a declaration with new rows may gain or lose credit
+        # (ownership/BATCHPROC rules look at the whole declaration history).
+        with tel.stage("read_delta") as st:
+            delta = _clean_history_df(_read_parquets(new_partitions, columns=NEEDED_COLS))
+            dirty_decls = set(delta["DECLARATIONID"].astype(str)) if not delta.empty else set()
+            touched = set(full_df.loc[full_df["DECLARATIONID"].isin(dirty_decls), "USERCODE"])
+            target_users = [u for u in all_users if u in touched or u in pending_users]
+            st["rows_out"] = len(delta)
+        logging.info(f"refresh-users: {len(new_partitions)} new partitions, {len(dirty_decls)} dirty "
+                     f"declarations → {len(target_users)}/{len(all_users)} users to recompute")
 
-            metrics = _compute_rich_user_metrics(user_df, user)
-
-            _write_json_blob(metrics, f"{USER_CACHE_PATH_PREFIX}{user}.json")
-            processed_count += 1
-            logging.info(f"refresh-users: ✔ cached {user} — "
-                         f"{metrics['summary'].get('total_files_handled', 0)} files handled")
-
-        except Exception as e:
-            failed_count += 1
-            logging.error(f"refresh-users: ✘ failed for {user}: {e}", exc_info=True)
+    processed_count = 0
+    failed_users = []
+    # sha256 of each user's cache body as last uploaded; an identical body is
+    # not uploaded again (as long as the blob is still there).
+    cache_hashes = {u: h for u, h in (manifest.get("cache_hashes") or {}).items() if u in user_to_decls.index}
+    published = {"uploaded": 0, "unchanged": 0, "bytes": 0, "seconds": 0.0}
+
+    def _published(result):
+        nonlocal processed_count
+        processed_count += len(result["uploaded"]) + len(result["unchanged"])
+        failed_users.extend(result["failed"])
+        cache_hashes.update(result["hashes"])
+        for user in result["failed"]:
+            cache_hashes.pop(user, None)
+        published["uploaded"] += len(result["uploaded"])
+        published["unchanged"] += len(result["unchanged"])
+        published["bytes"] += result["bytes"]
+        published["seconds"] = max(published["seconds"], result["seconds"])  # shards publish concurrently
+
+    def _publish(user, metrics):
+        nonlocal processed_count
+        _write_cache_blob(metrics, f"{USER_CACHE_PATH_PREFIX}{user}.json")
+        processed_count += 1
+        logging.info(f"refresh-users: ✔ cached {user} — "
+                     f"{metrics['summary'].get('total_files_handled', 0)} files handled")
+
+    if engine != "loop":
+        with tel.stage("list_caches"):
+            existing = _existing_user_caches()
+
+    if engine == "sharded" and workers > 1 and len(target_users) > 1:
+        with tel.stage("sharded_compute_upload", rows_in=len(full_df)) as st:
+            for result in _refresh_users_sharded(full_df, target_users, workers, cache_hashes, existing):
+                _published(result)
+            st.update(rows_out=processed_count, workers=workers, **_upload_rates(published))
+    elif engine == "loop":
+        # compute and upload interleave per user: one stage
+        with tel.stage("compute_upload", rows_in=len(full_df)) as st:
+            for user in target_users:
+                try:
+                    decl_ids = set(user_to_decls.loc[user])
+                    # Slice the in-memory frame (no blob re-reads). compute_rich_user_metrics
+                    # copies and re-cleans internally, so this is the exact same input the
+                    # old path built from per-day parquet reads.
+                    user_df = full_df[full_df["DECLARATIONID"].isin(decl_ids)]
+                    cache_hashes.pop(user, None)
+                    _publish(user, compute_rich_user_metrics(user_df, user))
+                except Exception as e:
+                    failed_users.append(user)
+                    logging.error(f"refresh-users: ✘ failed for {user}: {e}", exc_info=True)
+            st["rows_out"] = processed_count
+    else:
+        # All target users in one pass; each declaration is analysed once.
+        with tel.stage("compute") as st:
+            if dirty_decls is not None:
+                scope = set(full_df.loc[full_df["USERCODE"].isin(target_users), "DECLARATIONID"])
+                kernel_df = full_df[full_df["DECLARATIONID"].isin(scope)]
+            else:
+                kernel_df = full_df
+            all_metrics = compute_all_user_metrics(kernel_df, target_users) if target_users else {}
+            st.update(rows_in=len(kernel_df), rows_out=len(all_metrics))
+        with tel.stage("upload", rows_in=len(all_metrics)) as st:
+            _published(_publish_user_caches(all_metrics, cache_hashes, existing))
+            st.update(rows_out=processed_count, **_upload_rates(published))
+
+    with tel.stage("write_manifest"):
+        _write_json_blob({
+            "refreshed_at": datetime.utcnow().isoformat(),
+            "partitions": partitions,
+            "pending_users": failed_users,
+            "cache_hashes": cache_hashes,
+        }, USERS_MANIFEST_PATH)
 
     return func.HttpResponse(
         json.dumps({
             "status": "success",
+            "mode": "incremental" if dirty is not None else "full",
+            "engine": engine,
             "processed": processed_count,
-            "failed": failed_count,
+            "failed": len(failed_users),
+            "skipped_unchanged": len(all_users) - len(target_users),
+            "upload": {**published, **_upload_rates(published)} if engine != "loop" else None,
+            "dirty_declarations": len(dirty_decls) if dirty_decls is not None else None,
             "total_users_discovered": len(all_users),
-            "users": all_users
+            "users": target_users,
+            "telemetry": tel.finish(),
         }),
         status_code=200, mimetype="application/json"
     )
 
 
-def _safe_json_loads(val):
-    try:
-        return json.loads(val) if isinstance(val, str) else val
-    except Exception:
-        return []
+def _existing_user_caches() -> set:
+    """Names of the per-user cache blobs currently in storage (one listing)."""
+    return set(storage.list_etags(USER_CACHE_PATH_PREFIX))
 
 
-def _compute_rich_user_metrics(df: pd.DataFrame, username: str) -> dict:
+def _publish_user_caches(all_metrics: dict, known_hashes: dict, existing: set) -> dict:
     """
-    Compute full rich user metrics from raw history rows — same format as V2.
+    Upload usersV3/<user>.json (+ .gz) for every user of ``all_metrics``
+    through a pool of CACHE_UPLOAD_WORKERS threads. A user whose cache body
+    hashes to ``known_hashes[user]`` and whose blobs are in ``existing`` is
+    not uploaded again.
 
-    df = all rows for declarations this user is involved in (pre-filtered).
-    Produces:
-      - daily_metrics: per-day breakdown with file IDs
-      - summary: totals, activity_by_hour, company_specialization, inactivity_days, etc.
+    Returns {"uploaded", "unchanged", "failed"} user lists, the new
+    {"hashes"} of uploaded / unchanged users, and "bytes" / "seconds" spent.
     """
-    from collections import defaultdict
+    started = time.perf_counter()
+    result = {"uploaded": [], "unchanged": [], "failed": [], "hashes": {}, "bytes": 0}
+    pending = {}
+    for user, metrics in all_metrics.items():
+        path = f"{USER_CACHE_PATH_PREFIX}{user}.json"
+        body = _cache_body(metrics)
+        digest = hashlib.sha256(body).hexdigest()
+        result["hashes"][user] = digest
+        if (known_hashes.get(user) == digest
+                and path in existing and path + CACHE_GZIP_SUFFIX in existing):
+            result["unchanged"].append(user)
+        else:
+            pending[user] = (path, body)
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(CACHE_UPLOAD_WORKERS, len(pending))) as pool:
+            futures = {pool.submit(_write_cache_blob, all_metrics[user], path, body): user
+                       for user, (path, body) in pending.items()}
+            for future in futures:
+                user = futures[future]
+                try:
+                    result["bytes"] += future.result()
+                    result["uploaded"].append(user)
+                except Exception as e:
+                    result["failed"].append(user)
+                    del result["hashes"][user]
+                    logging.error(f"refresh-users: ✘ failed for {user}: {e}", exc_info=True)
+
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    logging.info(f"refresh-users: {len(result['uploaded'])} caches uploaded, "
+                 f"{len(result['unchanged'])} unchanged, {len(result['failed'])} failed "
+                 f"in {result['seconds']}s")
+    return result
+
+
+def _upload_rates(published: dict) -> dict:
+    """Throughput of _publish_user_caches results (uploads/s, MB/s)."""
+    seconds = published["seconds"]
+    if not seconds:
+        return {"uploads_per_s": None, "upload_mb_per_s": None}
+    return {
+        "uploads_per_s": round(published["uploaded"] / seconds, 1),
+        "upload_mb_per_s": round(published["bytes"] / 2 ** 20 / seconds, 2),
+    }
+
 
-    username_upper = username.upper()
+def _refresh_users_sharded(full_df: pd.DataFrame, users, workers: int, known_hashes: dict, existing: set) -> list:
+    """
+    ?engine=sharded: compute_all_user_metrics + cache upload for ``users``
+    across ``workers`` processes. Returns one _publish_user_caches result per
+    shard (a failed shard reports all its users as failed).
+    """
+    shards = plan_shards(full_df, users, workers)
+    shm, size = frame_to_shared_memory(full_df[NEEDED_COLS])
+    results = []
+    try:
+        # spawn: workers import this module fresh (own storage client), and the
+        # parent's frames are not duplicated into them by fork.
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=len(shards), mp_context=ctx) as pool:
+            futures = {}
+            for shard_users, rows in shards:
+                shard_paths = {f"{USER_CACHE_PATH_PREFIX}{u}.json" for u in shard_users}
+                futures[pool.submit(
+                    _refresh_users_shard, shm.name, size, rows, shard_users,
+                    {u: known_hashes[u] for u in shard_users if u in known_hashes},
+                    {p for p in existing if p.removesuffix(CACHE_GZIP_SUFFIX) in shard_paths},
+                )] = shard_users
+            for future in futures:
+                shard_users = futures[future]
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    results.append({"uploaded": [], "unchanged": [], "failed": list(shard_users),
+                                    "hashes": {}, "bytes": 0, "seconds": 0.0})
+                    logging.error(f"refresh-users: ✘ shard of {len(shard_users)} users failed: {e}", exc_info=True)
+    finally:
+        shm.close()
+        shm.unlink()
+    logging.info(f"refresh-users: {len(shards)} shards done")
+    return results
+
+
+def _refresh_users_shard(shm_name: str, size: int, rows, users, known_hashes: dict, existing: set) -> dict:
+    """Worker process of _refresh_users_sharded: one shard, computed and published."""
+    df = read_shared_rows(shm_name, size, rows)
+    return _publish_user_caches(compute_all_user_metrics(df, users), known_hashes, existing)
 
-    # -----------------------------------------------------------------------
-    # Normalise the DataFrame
-    # -----------------------------------------------------------------------
-    df = df.copy()
-    for col in ["USERCODE", "HISTORY_STATUS", "ACTIVECOMPANY", "TYPEDECLARATIONSSW", PRINCIPAL_FIELD]:
-        if col in df.columns:
-            df[col] = df[col].astype(str).str.strip().str.upper()
 
-    df["HISTORYDATETIME"] = pd.to_datetime(df["HISTORYDATETIME"], errors="coerce", format="mixed")
-    df = df.dropna(subset=["HISTORYDATETIME"])
-    df["HISTORYDATETIME"] = df["HISTORYDATETIME"].dt.tz_localize(None)
-    df["DECLARATIONID"] = df["DECLARATIONID"].astype(str)
-
-    # -----------------------------------------------------------------------
-    # Global user-level stats (from all rows where user is the actor)
-    # -----------------------------------------------------------------------
-    user_actions = df[df["USERCODE"] == username_upper]
-
-    # activity_by_hour
-    activity_by_hour = {}
-    if not user_actions.empty:
-        hours = user_actions["HISTORYDATETIME"].dt.hour.value_counts().to_dict()
-        activity_by_hour = {str(k): int(v) for k, v in sorted(hours.items())}
-
-    # activity_days (date → row count for that user)
-    activity_days = {}
-    if not user_actions.empty:
-        day_counts = user_actions.groupby(
-            user_actions["HISTORYDATETIME"].dt.date
-        ).size().to_dict()
-        activity_days = {d.isoformat(): int(c) for d, c in day_counts.items()}
-
-    # company_specialization (which company the user works for most)
-    company_spec = {}
-    if "ACTIVECOMPANY" in df.columns and not user_actions.empty:
-        comp_counts = user_actions["ACTIVECOMPANY"].value_counts().to_dict()
-        company_spec = {
-            k: int(v) for k, v in comp_counts.items()
-            if k not in ("NAN", "NONE", "", "DKM_VP")
-        }
-
-    # principal_specialization (which client/principal the user handles most)
-    principal_spec = {}
-    if PRINCIPAL_FIELD in df.columns and not user_actions.empty:
-        principal_counts = user_actions[PRINCIPAL_FIELD].value_counts().to_dict()
-        principal_spec = {
-            k: int(v) for k, v in principal_counts.items()
-            if k not in ("NAN", "NONE", "", "0", "0.0")
-        }
-
-    # file_type_counts
-    file_type_counts = {}
-    if "TYPEDECLARATIONSSW" in df.columns and not user_actions.empty:
-        type_counts = user_actions["TYPEDECLARATIONSSW"].value_counts().to_dict()
-        file_type_counts = {
-            k: int(v) for k, v in type_counts.items()
-            if k not in ("NAN", "NONE", "")
-        }
-
-    # -----------------------------------------------------------------------
-    # Per-declaration analysis
-    # -----------------------------------------------------------------------
-    # daily_data[date_str] accumulates what happened per day
-    daily_data = defaultdict(lambda: {
-        "manual_files_created": 0,
-        "automatic_files_created": 0,
-        "modification_count": 0,
-        "modification_file_ids": [],
-        "manual_file_ids": [],
-        "automatic_file_ids": [],
-        "creation_durations": [],
-        "deleted_file_ids": [],
-        "deleted_own_file_ids": [],
-        "deleted_others_file_ids": [],
-    })
-
-    total_manual = 0
-    total_automatic = 0
-    total_modifications = 0
-    total_deletions = 0
-    total_deleted_own = 0
-    total_deleted_others = 0
-    total_deleted_manual = 0
-    total_deleted_automatic = 0
-    all_durations = []
-
-    for decl_id, group in df.groupby("DECLARATIONID"):
-        group = group.sort_values("HISTORYDATETIME")
-        user_decl_rows = group[group["USERCODE"] == username_upper]
-        if user_decl_rows.empty:
-            continue
+# ===========================================================================
+# ROUTE 4 – POST /build-cube
+# Reads ALL transformed parquets once and writes activity_cube.parquet:
+# per (USERCODE, date, PRINCIPAL, TYPEDECLARATIONSSW, ACTIVECOMPANY) counts of
+# credited creations (manual / automatic), modifications, final deletions,
+# sends and creation-duration sums — the same definitions as the per-user
+# caches. GET ?from=&to=&group_by= then answers any window from the cube.
+# ===========================================================================
 
-        global_statuses = group["HISTORY_STATUS"].tolist()
-        user_statuses = user_decl_rows["HISTORY_STATUS"].tolist()
+def build_cube(req: func.HttpRequest) -> func.HttpResponse:
+    partitions = _transformed_partitions()
+    if not partitions:
+        return func.HttpResponse(
+            json.dumps({"status": "no_data", "message": "No transformed parquet files found."}),
+            status_code=200, mimetype="application/json"
+        )
 
-        # Classify manual / automatic using the shared logic
-        is_manual, is_automatic = classify_file_activity(
-            global_history=global_statuses,
-            user_history=user_statuses,
-            group_df=group,
-            target_user=username_upper,
-            prefer_creation_status_owner=True
+    df = _clean_history_df(_read_parquets(list(partitions), columns=NEEDED_COLS))
+    if df.empty:
+        return func.HttpResponse(
+            json.dumps({"error": "Could not read any transformed parquet files."}),
+            status_code=500, mimetype="application/json"
         )
 
-        # Date of user's FIRST action on this declaration
-        first_user_action_date = user_decl_rows["HISTORYDATETIME"].min().date().isoformat()
-
-        if is_manual:
-            total_manual += 1
-            daily_data[first_user_action_date]["manual_files_created"] += 1
-            daily_data[first_user_action_date]["manual_file_ids"].append(decl_id)
-        elif is_automatic:
-            total_automatic += 1
-            daily_data[first_user_action_date]["automatic_files_created"] += 1
-            daily_data[first_user_action_date]["automatic_file_ids"].append(decl_id)
-
-        # Modification tracking per day
-        user_mods = user_decl_rows[user_decl_rows["HISTORY_STATUS"] == "MODIFIED"]
-        if not user_mods.empty:
-            for mod_date, mod_group in user_mods.groupby(
-                user_mods["HISTORYDATETIME"].dt.date
-            ):
-                day_str = mod_date.isoformat()
-                daily_data[day_str]["modification_count"] += len(mod_group)
-                if decl_id not in daily_data[day_str]["modification_file_ids"]:
-                    daily_data[day_str]["modification_file_ids"].append(decl_id)
-            total_modifications += len(user_mods)
-
-        # Deletion tracking: a file counts as deleted only when the FINAL
-        # status in the declaration history is DELETED. Credit goes only to
-        # the user who performed that final deletion event.
-        final_row = group.iloc[-1]
-        final_status = str(final_row["HISTORY_STATUS"]).upper()
-        final_user = str(final_row["USERCODE"]).upper()
-
-        if final_status == "DELETED" and final_user == username_upper:
-            deletion_date = final_row["HISTORYDATETIME"].date().isoformat()
-
-            total_deletions += 1
-            daily_data[deletion_date]["deleted_file_ids"].append(decl_id)
-
-            if is_manual or is_automatic:
-                # User deleted their own file (they get credit for creating it)
-                total_deleted_own += 1
-                daily_data[deletion_date]["deleted_own_file_ids"].append(decl_id)
-            else:
-                # User deleted someone else's file
-                total_deleted_others += 1
-                daily_data[deletion_date]["deleted_others_file_ids"].append(decl_id)
-
-            if is_manual:
-                total_deleted_manual += 1
-            elif is_automatic:
-                total_deleted_automatic += 1
-
-        # File creation duration: user's first MODIFIED → global WRT_ENT
-        session_start = None
-        duration = None
-        for _, row in group.iterrows():
-            if row["HISTORY_STATUS"] == "MODIFIED" and session_start is None:
-                if row["USERCODE"] == username_upper:
-                    session_start = row["HISTORYDATETIME"]
-            elif row["HISTORY_STATUS"] == "WRT_ENT" and session_start is not None:
-                duration = round(
-                    (row["HISTORYDATETIME"] - session_start).total_seconds() / 3600, 3
-                )
-                break
+    logging.info(f"build-cube: {len(df)} rows from {len(partitions)} parquet files")
+    cube = build_activity_cube(df)
+    _write_parquet(cube, CUBE_BLOB_PATH, row_group_size=CUBE_ROW_GROUP_SIZE)
 
-        if duration is not None:
-            all_durations.append(duration)
-            if is_manual or is_automatic:
-                daily_data[first_user_action_date]["creation_durations"].append(duration)
-
-    # -----------------------------------------------------------------------
-    # Build daily_metrics list
-    # -----------------------------------------------------------------------
-    total_files_handled = total_manual + total_automatic
-
-    daily_metrics = []
-    for date_str, data in sorted(daily_data.items()):
-        durations = data["creation_durations"]
-        avg_time = round(sum(durations) / len(durations), 3) if durations else None
-        day_total = data["manual_files_created"] + data["automatic_files_created"]
-        daily_metrics.append({
-            "date": date_str,
-            "manual_files_created": data["manual_files_created"],
-            "automatic_files_created": data["automatic_files_created"],
-            "modification_count": data["modification_count"],
-            "modification_file_ids": data["modification_file_ids"],
-            "total_files_handled": day_total,
-            "avg_creation_time": avg_time,
-            "manual_file_ids": data["manual_file_ids"],
-            "automatic_file_ids": data["automatic_file_ids"],
-            "deleted_file_ids": data["deleted_file_ids"],
-            "deleted_own_file_ids": data["deleted_own_file_ids"],
-            "deleted_others_file_ids": data["deleted_others_file_ids"],
-        })
-
-    # -----------------------------------------------------------------------
-    # Summary
-    # -----------------------------------------------------------------------
-    avg_creation_time = (
-        round(sum(all_durations) / len(all_durations), 3) if all_durations else None
+    return func.HttpResponse(
+        json.dumps({
+            "status": "success",
+            "cube_rows": len(cube),
+            "source_files": len(partitions),
+            "date_range": [cube["date"].min(), cube["date"].max()] if not cube.empty else None,
+            "cube_path": CUBE_BLOB_PATH,
+        }),
+        status_code=200, mimetype="application/json"
     )
 
-    days_with_files = [d for d in daily_metrics if d["total_files_handled"] > 0]
-    days_active = len(set(activity_days.keys()))
-    avg_files_per_day = (
-        round(total_files_handled / len(days_with_files), 2) if days_with_files else 0
-    )
 
-    most_productive_day = None
-    if days_with_files:
-        most_productive_day = max(
-            days_with_files, key=lambda x: x["total_files_handled"]
-        )["date"]
-
-    # Inactivity days (working days between first and last active date with no activity)
-    inactivity_days = []
-    if activity_days:
-        from_date = datetime.strptime(min(activity_days.keys()), "%Y-%m-%d").date()
-        to_date = datetime.strptime(max(activity_days.keys()), "%Y-%m-%d").date()
-        curr = from_date
-        while curr <= to_date:
-            if curr.isoformat() not in activity_days and curr.weekday() < 5:
-                inactivity_days.append(curr.isoformat())
-            curr += timedelta(days=1)
-
-    hour_with_most_activity = None
-    if activity_by_hour:
-        hour_with_most_activity = int(
-            max(activity_by_hour, key=lambda h: activity_by_hour[h])
+def activity_query(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    GET ?from=YYYY-MM-DD&to=YYYY-MM-DD&group_by=user,date
+    Optional equality filters: &user= &principal= &type= &company=
+    group_by fields: user, date, principal, type, company (empty → totals only).
+    """
+    date_from = req.params.get("from")
+    date_to = req.params.get("to")
+    for value in (date_from, date_to):
+        if value:
+            try:
+                datetime.strptime(value, "%Y-%m-%d")
+            except ValueError:
+                return func.HttpResponse(
+                    json.dumps({"error": "Invalid date format. Use YYYY-MM-DD"}),
+                    status_code=400, mimetype="application/json"
+                )
+
+    group_by = [g.strip().lower() for g in req.params.get("group_by", "user").split(",") if g.strip()]
+    filters = {name: req.params.get(name) for name in ("user", "principal", "type", "company") if req.params.get(name)}
+
+    cube = _cached_parquet(CUBE_BLOB_PATH)
+    if cube.empty:
+        return func.HttpResponse(
+            json.dumps({"error": "Activity cube not found. Trigger POST /build-cube first."}),
+            status_code=404, mimetype="application/json"
         )
 
-    modifications_per_file = (
-        round(total_modifications / total_files_handled, 2) if total_files_handled > 0 else 0
-    )
-    manual_percent = (
-        round((total_manual / total_files_handled) * 100, 2) if total_files_handled > 0 else 0
-    )
-    auto_percent = (
-        round((total_automatic / total_files_handled) * 100, 2) if total_files_handled > 0 else 0
-    )
+    try:
+        result = query_activity_cube(cube, date_from, date_to, group_by, filters)
+    except ValueError as e:
+        return func.HttpResponse(json.dumps({"error": str(e)}), status_code=400, mimetype="application/json")
 
-    return {
-        "user": username,
-        "daily_metrics": daily_metrics,
-        "summary": {
-            "total_manual_files": total_manual,
-            "total_automatic_files": total_automatic,
-            "total_files_handled": total_files_handled,
-            "total_modifications": total_modifications,
-            "avg_files_per_day": avg_files_per_day,
-            # avg_creation_time: hours from user's first MODIFIED → file's WRT_ENT
-            # e.g. 0.014 = 0.014h = ~50 seconds per file
-            "avg_creation_time": avg_creation_time,
-            "avg_creation_time_minutes": round(avg_creation_time * 60, 1) if avg_creation_time else None,
-            "most_productive_day": most_productive_day,
-            "file_type_counts": file_type_counts,
-            "activity_by_hour": activity_by_hour,
-            "company_specialization": company_spec,
-            "principal_specialization": principal_spec,
-            "days_active": days_active,
-            "modifications_per_file": modifications_per_file,
-            "manual_vs_auto_ratio": {
-                "manual_percent": manual_percent,
-                "automatic_percent": auto_percent,
-            },
-            "activity_days": activity_days,
-            "inactivity_days": inactivity_days,
-            "hour_with_most_activity": hour_with_most_activity,
-            "total_deletions": total_deletions,
-            "deleted_own_files": total_deleted_own,
-            "deleted_others_files": total_deleted_others,
-            "deleted_manual_files": total_deleted_manual,
-            "deleted_automatic_files": total_deleted_automatic,
-        },
-    }
+    return func.HttpResponse(
+        json.dumps({"from": date_from, "to": date_to, "group_by": group_by, "filters": filters, **result}),
+        status_code=200, mimetype="application/json"
+    )
 
 
 # ===========================================================================
 # ROUTE 5 – POST /refresh
 # Reads last 10 working days parquet files → writes 10-day summary cache.
-# Only reads small daily files, not the entire history.
+# Only reads small daily files, not the entire history. A day without a daily
+# parquet yet (today) is read from its intraday micro-batches. The cleaned
+# rows are kept as the summary base for /ingest-intraday.
 # ===========================================================================
 
-def refresh_10day(req: func.HttpRequest) -> func.HttpResponse:
-    logging.info("refresh (10-day): loading last 10 working days parquet files")
+# Columns the 10-day summary is computed from (and kept in the summary base).
+SUMMARY_COLS = ["DECLARATIONID", "USERCODE", "HISTORY_STATUS", "HISTORYDATETIME"]
+
+
+def _summary_rows(frames: list) -> pd.DataFrame:
+    """Concat canonical history frames and drop what the summary ignores."""
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=SUMMARY_COLS)
+    df = pd.concat(frames, ignore_index=True)
+    df = df.dropna(subset=["HISTORYDATETIME"])
+    if "ACTIVECOMPANY" in df.columns:
+        df = df[df["ACTIVECOMPANY"] != "DKM_VP"]
+    # Dedupe once globally, then classify every (declaration, user) pair in one
+    # vectorized pass (same crediting rules as classify_file_activity with
+    # prefer_creation_status_owner=True) instead of once per user × declaration.
+    df = df.drop_duplicates(subset=SUMMARY_COLS)
+    return df[SUMMARY_COLS].reset_index(drop=True)
+
+
+def _summary_creations(df: pd.DataFrame, working_days) -> pd.Series:
+    """Credited creations per (USERCODE, first action date) within working_days."""
+    if df.empty:
+        # same index shape as the grouped result, so micro-batch deltas align
+        index = pd.MultiIndex(levels=[[], []], codes=[[], []], names=["USERCODE", "first_action_date"])
+        return pd.Series([], index=index, dtype="int64")
+    classified = classify_file_activity_frame(df, prefer_creation_status_owner=True)
+    first_action = df.groupby(["DECLARATIONID", "USERCODE"])["HISTORYDATETIME"].min()
+    classified["first_action_date"] = first_action.reindex(
+        pd.MultiIndex.from_frame(classified[["DECLARATIONID", "USERCODE"]])
+    ).dt.date.to_numpy()
+    credited = classified[
+        (classified["is_manual"] | classified["is_automatic"])
+        & classified["first_action_date"].isin(set(working_days))
+    ]
+    return credited.groupby(["USERCODE", "first_action_date"]).size()
+
+
+def _summary_payload(users, creations: pd.Series, working_days) -> list:
+    """usersV3 summary JSON: one entry per user with creations per dd/mm."""
+    credited_users = set(creations.index.get_level_values(0))
+    results = []
+    for user in sorted(users):
+        user_daily = {day.strftime("%d/%m"): 0 for day in working_days}
+        if user in credited_users:
+            for day, count in creations.loc[user].items():
+                user_daily[day.strftime("%d/%m")] += int(count)
+        results.append({"user": user, "daily_file_creations": user_daily})
+    return results
+
+
+def _intraday_dir(day) -> str:
+    return f"{INTRADAY_PREFIX}day={day.isoformat()}/"
 
-    working_days = _last_n_working_days(10)
 
+def _intraday_batches(day) -> list:
+    """Micro-batch parquets ingested for ``day``, in ingestion order."""
+    return sorted(b for b in _list_blobs(_intraday_dir(day)) if b.endswith(".parquet"))
+
+
+def _rebuild_10day_summary(working_days, tel: RouteTelemetry) -> dict:
+    """
+    Full rebuild of the 10-day summary cache and of the summary base.
+    Returns {"days_processed", "users"} (days_processed 0 → nothing written).
+    """
     frames = []
-    for day in working_days:
-        path = _daily_parquet_path(day)
-        df_day = _read_parquet(path)
-        if not df_day.empty:
-            frames.append(df_day)
+    batches, batch_days = [], []
+    with tel.stage("read") as st:
+        for day in working_days:
+            df_day = _read_parquet(_daily_parquet_path(day))
+            if df_day.empty:
+                day_batches = _intraday_batches(day)
+                df_day = _read_parquets(day_batches)
+                batches.extend(day_batches)
+                batch_days.append(day.isoformat())
+            if not df_day.empty:
+                frames.append(ensure_canonical(df_day))
+        st["rows_out"] = sum(len(f) for f in frames)
 
     if not frames:
+        return {"days_processed": 0, "users": 0}
+
+    with tel.stage("clean", rows_in=sum(len(f) for f in frames)) as st:
+        # Frames are canonical (standardised text, tz-naive HISTORYDATETIME)
+        df = _summary_rows(frames)
+        # Auto-discover all unique users from the raw data
+        all_user_codes = set(df["USERCODE"].dropna().unique())
+        st["rows_out"] = len(df)
+
+    with tel.stage("classify", rows_in=len(df)) as st:
+        creations = _summary_creations(df, working_days)
+        st["rows_out"] = len(creations)
+
+    with tel.stage("aggregate", rows_in=len(creations)) as st:
+        results = _summary_payload(all_user_codes, creations, working_days)
+        st["rows_out"] = len(results)
+
+    with tel.stage("upload"):
+        _write_cache_blob(results, SUMMARY_BLOB_PATH)
+
+    with tel.stage("write_base", rows_in=len(df)):
+        base = df.dropna(subset=["DECLARATIONID"]).sort_values("DECLARATIONID", kind="mergesort")
+        _write_parquet(base, SUMMARY_BASE_PATH, row_group_size=SUMMARY_BASE_ROW_GROUP_SIZE)
+        _write_json_blob({
+            "built_at": datetime.utcnow().isoformat(),
+            "window": [d.isoformat() for d in working_days],
+            "batch_days": batch_days,
+            "batches": batches,
+        }, SUMMARY_BASE_MANIFEST_PATH)
+
+    return {"days_processed": len(frames), "users": len(results)}
+
+
+def refresh_10day(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info("refresh (10-day): loading last 10 working days parquet files")
+    tel = RouteTelemetry("refresh", storage)
+    result = _rebuild_10day_summary(_last_n_working_days(SUMMARY_DAYS), tel)
+
+    if not result["days_processed"]:
         return func.HttpResponse(
-            json.dumps({"status": "no_data", "message": "No parquet files found for the last 10 working days. Run /transform-daily first."}),
+            json.dumps({"status": "no_data", "message": "No parquet files found for the last 10 working days. Run /transform-daily first.",
+                        "telemetry": tel.finish()}),
             status_code=200, mimetype="application/json"
         )
 
-    df = pd.concat(frames, ignore_index=True)
+    return func.HttpResponse(
+        json.dumps({"status": "success", **result, "telemetry": tel.finish()}),
+        status_code=200, mimetype="application/json"
+    )
 
-    # Standardise
-    for col in ["USERCODE", "HISTORY_STATUS", "ACTIVECOMPANY", "TYPEDECLARATIONSSW", PRINCIPAL_FIELD]:
-        if col in df.columns:
-            df[col] = df[col].astype(str).str.strip().str.upper()
 
-    df["HISTORYDATETIME"] = pd.to_datetime(df["HISTORYDATETIME"], errors="coerce", format="mixed")
-    df = df.dropna(subset=["HISTORYDATETIME"])
-    df["HISTORYDATETIME"] = df["HISTORYDATETIME"].dt.tz_localize(None)
+# ===========================================================================
+# ROUTE 5b – POST /ingest-intraday
+# Near-real-time path for today (run every few minutes, one call at a time):
+#   1. landing blobs of today not in the day's intraday manifest are streamed
+#      into ONE micro-batch parquet (intraday/day=<today>/batch-NNNNN.parquet);
+#   2. the 10-day summary is patched from that micro-batch alone: only the
+#      declarations it touches are reclassified, from their rows in the
+#      summary base (a few row groups) + earlier micro-batches, and the
+#      difference in credited creations is applied to the cached summary.
+# The result is what /refresh would produce on the same data. A summary base
+# for another window (first call of a new day) triggers one full rebuild.
+# The nightly transform-daily / refresh remain the source of truth.
+# ===========================================================================
 
-    if "ACTIVECOMPANY" in df.columns:
-        df = df[df["ACTIVECOMPANY"] != "DKM_VP"]
+def _apply_micro_batch(batch_path: str, working_days, tel: RouteTelemetry) -> dict:
+    """
+    Patch the 10-day summary with one micro-batch. Returns the update stats,
+    or None when the summary base does not match ``working_days`` (the caller
+    then rebuilds in full).
+    """
+    with tel.stage("read_base_manifest"):
+        base_manifest = _read_json_blob(SUMMARY_BASE_MANIFEST_PATH) or {}
+        summary = _read_json_blob(SUMMARY_BLOB_PATH)
+    if base_manifest.get("window") != [d.isoformat() for d in working_days] or summary is None:
+        return None
 
-    # Auto-discover all unique users from the raw data
-    all_user_codes = set(df["USERCODE"].dropna().unique())
+    with tel.stage("read_batch") as st:
+        batch = _summary_rows([ensure_canonical(_read_parquet(batch_path))])
+        decls = set(batch["DECLARATIONID"].dropna())
+        st["rows_out"] = len(batch)
+
+    with tel.stage("read_history", rows_in=len(decls)) as st:
+        # Earlier rows of the touched declarations, in the order /refresh reads
+        # them: the summary base, then micro-batches ingested since it was built
+        # (of the days it took from micro-batches, and today).
+        covered = set(base_manifest.get("batches") or [])
+        batch_days = set(base_manifest.get("batch_days") or []) | {batch_path.split("day=")[1][:10]}
+        later = [
+            b for day in working_days if day.isoformat() in batch_days
+            for b in _intraday_batches(day) if b not in covered and b < batch_path
+        ]
+        history = _read_parquet_rows_in(SUMMARY_BASE_PATH, "DECLARATIONID", decls)
+        if later:
+            later_df = _read_parquets(later)
+            history = pd.concat([history, later_df[later_df["DECLARATIONID"].isin(decls)]], ignore_index=True)
+        before = _summary_rows([history])
+        after = _summary_rows([before, batch[batch["DECLARATIONID"].isin(decls)]])
+        st["rows_out"] = len(after)
+
+    with tel.stage("classify", rows_in=len(before) + len(after)) as st:
+        delta = _summary_creations(after, working_days).sub(
+            _summary_creations(before, working_days), fill_value=0
+        )
+        delta = delta[delta != 0].astype("int64")
+        st["rows_out"] = len(delta)
+
+    with tel.stage("upload") as st:
+        by_user = {entry["user"]: entry for entry in summary}
+        new_users = set(batch["USERCODE"].dropna()) - set(by_user)
+        for user in new_users:
+            by_user[user] = {"user": user, "daily_file_creations": {d.strftime("%d/%m"): 0 for d in working_days}}
+        for (user, day), change in delta.items():
+            daily = by_user[user]["daily_file_creations"]
+            key = day.strftime("%d/%m")
+            daily[key] = daily.get(key, 0) + int(change)
+        if len(delta) or new_users:
+            _write_cache_blob([by_user[u] for u in sorted(by_user)], SUMMARY_BLOB_PATH)
+        st["rows_out"] = len(by_user)
 
-    # Dedupe once globally, then pre-group by declaration so we never re-filter or
-    # re-group the frame per user. The per-user crediting logic below is byte-
-    # identical to before — we've only hoisted the shared groupby/dedup out of the
-    # user loop (the part that made this O(users) and slow).
-    df = df.drop_duplicates(
-        subset=["DECLARATIONID", "USERCODE", "HISTORY_STATUS", "HISTORYDATETIME"]
-    )
-    decl_groups = {
-        decl_id: g.sort_values("HISTORYDATETIME")
-        for decl_id, g in df.groupby("DECLARATIONID")
+    return {
+        "affected_declarations": len(decls),
+        "changed_cells": len(delta),
+        "new_users": len(new_users),
     }
-    user_to_decls = df.groupby("USERCODE")["DECLARATIONID"].unique()
-    working_days_set = set(working_days)
 
-    results = []
-    for user in sorted(all_user_codes):
-        user_daily = {day.strftime("%d/%m"): 0 for day in working_days}
 
-        user_decls = user_to_decls.get(user, [])
-        if len(user_decls) == 0:
-            results.append({"user": user, "daily_file_creations": user_daily})
-            continue
+def ingest_intraday(req: func.HttpRequest) -> func.HttpResponse:
+    today = datetime.utcnow().date()
+    working_days = _last_n_working_days(SUMMARY_DAYS)
+    tel = RouteTelemetry("ingest-intraday", storage)
 
-        for decl_id in user_decls:
-            group = decl_groups[decl_id]
-            user_rows = group[group["USERCODE"] == user]
-            if user_rows.empty:
-                continue
-
-            first_action_date = user_rows["HISTORYDATETIME"].min().date()
-            if first_action_date not in working_days_set:
-                continue
-
-            is_manual, is_automatic = classify_file_activity(
-                global_history=group["HISTORY_STATUS"].tolist(),
-                user_history=user_rows["HISTORY_STATUS"].tolist(),
-                group_df=group,
-                target_user=user,
-                prefer_creation_status_owner=True
-            )
+    with tel.stage("list") as st:
+        day_dir = _intraday_dir(today)
+        manifest = _read_json_blob(f"{day_dir}manifest.json") or {"blobs": {}, "batches": []}
+        landing = _list_blob_etags(f"{LANDING_PREFIX}day={today.isoformat()}/")
+        new_blobs = [name for name, etag in landing.items() if manifest["blobs"].get(name) != etag]
+        st["rows_out"] = len(new_blobs)
 
-            if is_manual or is_automatic:
-                key = first_action_date.strftime("%d/%m")
-                user_daily[key] += 1
+    if not new_blobs:
+        return func.HttpResponse(
+            json.dumps({"status": "up_to_date", "date": str(today), "batches": len(manifest["batches"]),
+                        "telemetry": tel.finish()}),
+            status_code=200, mimetype="application/json"
+        )
 
-        results.append({"user": user, "daily_file_creations": user_daily})
+    batch_path = f"{day_dir}batch-{len(manifest['batches']):05d}.parquet"
+    stats = _landing_to_parquet(new_blobs, batch_path, tel)
 
-    _write_json_blob(results, SUMMARY_BLOB_PATH)
+    update = None
+    if stats["rows_written"]:
+        update = _apply_micro_batch(batch_path, working_days, tel)
+        manifest["batches"].append(batch_path)
+
+    # recorded last: a failed call is redone from the same blobs next time
+    manifest["blobs"].update({name: landing[name] for name in new_blobs})
+    with tel.stage("write_manifest"):
+        _write_json_blob(manifest, f"{day_dir}manifest.json")
+
+    mode = "incremental"
+    if stats["rows_written"] and update is None:
+        logging.info("ingest-intraday: summary base is for another window, rebuilding the 10-day summary")
+        mode = "full"
+        update = _rebuild_10day_summary(working_days, tel)
 
     return func.HttpResponse(
-        json.dumps({"status": "success", "days_processed": len(frames), "users": len(results)}),
+        json.dumps({
+            "status": "success" if stats["rows_written"] else "no_data",
+            "date": str(today),
+            "mode": mode,
+            "new_blobs": len(new_blobs),
+            "rows_written": stats["rows_written"],
+            "batch_path": batch_path if stats["rows_written"] else None,
+            "summary": update,
+            "telemetry": tel.finish(),
+        }),
         status_code=200, mimetype="application/json"
     )
 
 
 # ===========================================================================
 # ROUTE 6 – GET /file-lifecycle
-# Looks up a specific DECLARATIONID from the index + relevant daily parquet.
+# Looks up a specific DECLARATIONID in the locator (one row group) and reads
+# only the row groups of the day parquets that hold it.
 # ===========================================================================
 
+def _locate_declaration(decl_id: str):
+    """
+    Partitions holding ``decl_id`` according to the locator ([] if unknown).
+    None when no locator has been built yet.
+    """
+    if not storage.exists(LOCATOR_BLOB_PATH):
+        return None
+    rows = _read_parquet_rows(LOCATOR_BLOB_PATH, "DECLARATIONID", decl_id)
+    if rows.empty:
+        return []
+    match = rows[rows["DECLARATIONID"] == decl_id]
+    return list(match.iloc[0]["partitions"]) if not match.empty else []
+
+
+def _lifecycle_partitions_from_index(decl_id: str) -> list:
+    """Fallback without a locator: every day partition between first_seen and last_seen."""
+    index_df = _cached_parquet(INDEX_BLOB_PATH)
+    if index_df.empty:
+        return []
+    match = index_df[index_df["DECLARATIONID"].astype(str) == decl_id]
+    if match.empty:
+        return []
+    start_date = datetime.strptime(match.iloc[0]["first_seen"], "%Y-%m-%d").date()
+    end_date = datetime.strptime(match.iloc[0]["last_seen"], "%Y-%m-%d").date()
+    paths = []
+    curr = start_date
+    while curr <= end_date:
+        paths.append(_daily_parquet_path(curr))
+        curr += timedelta(days=1)
+    return paths
+
+
 def file_lifecycle(req: func.HttpRequest) -> func.HttpResponse:
     from performanceV3.functions.file_lifecycle import get_file_lifecycle
 
@@ -1044,31 +1999,22 @@ def file_lifecycle(req: func.HttpRequest) -> func.HttpResponse:
             status_code=400, mimetype="application/json"
         )
 
-    # Try to find the declaration in the index first to know which day parquet to load
-    index_df = _read_parquet(INDEX_BLOB_PATH)
-    if not index_df.empty:
-        index_df["DECLARATIONID"] = index_df["DECLARATIONID"].astype(str)
-        decl_id_str = str(int(float(declaration_id))).strip()
-        match = index_df[index_df["DECLARATIONID"] == decl_id_str]
-        if not match.empty:
-            first_seen = match.iloc[0]["first_seen"]
-            last_seen = match.iloc[0]["last_seen"]
-            # Load parquets covering the lifecycle date range
-            start_date = datetime.strptime(first_seen, "%Y-%m-%d").date()
-            end_date = datetime.strptime(last_seen, "%Y-%m-%d").date()
-            frames = []
-            curr = start_date
-            while curr <= end_date:
-                path = _daily_parquet_path(curr)
-                df_day = _read_parquet(path)
+    decl_id_str = str(int(float(declaration_id))).strip()
+    partitions = _locate_declaration(decl_id_str)
+    if partitions is None:
+        partitions = _lifecycle_partitions_from_index(decl_id_str)
+
+    frames = []
+    if partitions:
+        with ThreadPoolExecutor(max_workers=8) as ex:
+            for df_day in ex.map(lambda p: _read_parquet_rows(p, "DECLARATIONID", decl_id_str), partitions):
                 if not df_day.empty:
                     frames.append(df_day)
-                curr += timedelta(days=1)
 
-            if frames:
-                df_full = pd.concat(frames, ignore_index=True)
-                result = get_file_lifecycle(df_full, declaration_id)
-                return func.HttpResponse(json.dumps(result, default=str), status_code=200, mimetype="application/json")
+    if frames:
+        df_full = pd.concat(frames, ignore_index=True)
+        result = get_file_lifecycle(df_full, declaration_id)
+        return func.HttpResponse(json.dumps(result, default=str), status_code=200, mimetype="application/json")
 
     return func.HttpResponse(
         json.dumps({"found": False, "declaration_id": declaration_id, "message": "Declaration not found in index."}),
@@ -1078,58 +2024,27 @@ def file_lifecycle(req: func.HttpRequest) -> func.HttpResponse:
 
 # ===========================================================================
 # ROUTE – GET /users
-# Returns all discovered human users with basic stats from the index.
+# Returns all discovered human users with first / last seen day. Served as-is
+# from the users directory written by build-index (ETag / gzip aware); an
+# index from before the directory existed is aggregated on the fly.
 # ===========================================================================
 
 def list_users(req: func.HttpRequest) -> func.HttpResponse:
     """Return all human users found in the index with summary info."""
-    logging.info("list-users: loading index to discover users")
+    response = _serve_cache_blob(req, USERS_DIRECTORY_PATH, "Users directory not found.")
+    if response.status_code != 404:
+        return response
 
-    index_df = _read_parquet(INDEX_BLOB_PATH)
+    logging.info("list-users: no users directory yet, aggregating the index")
+    index_df = _cached_parquet(INDEX_BLOB_PATH)
     if index_df.empty:
         return func.HttpResponse(
             json.dumps({"status": "no_data", "message": "Index is empty. Run /build-index first.", "users": []}),
             status_code=200, mimetype="application/json"
         )
 
-    index_df["users"] = index_df["users"].apply(_safe_json_loads)
-
-    # Optimized single-pass discovery of min/max dates for all users
-    user_map = {}
-    for _, row in index_df.iterrows():
-        # index_df["users"] is already parsed as list via _safe_json_loads above
-        user_list = row["users"]
-        if not isinstance(user_list, list):
-            continue
-            
-        fs = row["first_seen"]
-        ls = row["last_seen"]
-        
-        for u in user_list:
-            u_upper = u.upper().strip()
-            if not u_upper or u_upper in SYSTEM_USERS or u_upper in ("NAN", "NONE", ""):
-                continue
-                
-            if u_upper not in user_map:
-                user_map[u_upper] = {
-                    "usercode": u_upper,
-                    "first_seen": fs,
-                    "last_seen": ls
-                }
-            else:
-                if fs and (not user_map[u_upper]["first_seen"] or fs < user_map[u_upper]["first_seen"]):
-                    user_map[u_upper]["first_seen"] = fs
-                if ls and (not user_map[u_upper]["last_seen"] or ls > user_map[u_upper]["last_seen"]):
-                    user_map[u_upper]["last_seen"] = ls
-
-    user_details = sorted(user_map.values(), key=lambda x: x["usercode"])
-
     return func.HttpResponse(
-        json.dumps({
-            "status": "success",
-            "total_users": len(user_details),
-            "users": user_details,
-        }, default=str),
+        json.dumps(_users_directory_payload(upgrade_index_frame(index_df)), default=str),
         status_code=200, mimetype="application/json"
     )
 
@@ -1139,7 +2054,7 @@ def list_users(req: func.HttpRequest) -> func.HttpResponse:
 # ===========================================================================
 
 def main(req: func.HttpRequest) -> func.HttpResponse:
-    if not connection_string:
+    if storage is None:
         return func.HttpResponse(
             json.dumps({"error": "Backend service not configured."}),
             status_code=503, mimetype="application/json"
@@ -1162,18 +2077,30 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             # 📦 Batch backfill: process all days from ?start= to ?end= in one call
             return transform_daily_range(req)
 
+        elif method == "POST" and action == "compact-months":
+            # Merge daily parquets of closed months into one sorted parquet per month
+            return compact_months(req)
+
         elif method == "POST" and action == "build-index":
-            # Build/rebuild file_index.parquet from all daily parquets
+            # Build/rebuild file_index.parquet from all daily parquets (?mode=incremental: delta only)
             return build_index(req)
 
         elif method == "POST" and action == "refresh-users":
-            # Build per-user JSON caches in a single pass over all daily parquets
+            # Build per-user JSON caches in a single pass over all daily parquets (?mode=incremental: dirty users only)
             return refresh_users(req)
 
+        elif method == "POST" and action == "build-cube":
+            # Rebuild the user × day × principal × type × company activity cube
+            return build_cube(req)
+
         elif method == "POST" and action == "refresh":
             # Full rebuild of 10-day summary cache (daily cold run)
             return refresh_10day(req)
 
+        elif method == "POST" and action == "ingest-intraday":
+            # Today's new landing blobs → micro-batch parquet + incremental 10-day summary
+            return ingest_intraday(req)
+
         # ---------------------------------------------------------------
         # GET routes (instant reads from cache / index)
         # ---------------------------------------------------------------
@@ -1187,13 +2114,14 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
 
         elif method == "GET" and action == "debug-index":
             # Show a sample of the index for debugging
-            index_df = _read_parquet(INDEX_BLOB_PATH)
+            index_df = _cached_parquet(INDEX_BLOB_PATH)
             if index_df.empty:
                 return func.HttpResponse(
                     json.dumps({"message": "Index is empty. Run /build-index first."}),
                     status_code=200, mimetype="application/json"
                 )
-            sample = index_df.head(20).to_dict(orient="records")
+            # to_json turns the list columns (numpy arrays once read) into JSON lists
+            sample = json.loads(index_df.head(20).to_json(orient="records"))
             return func.HttpResponse(
                 json.dumps({
                     "total_rows": len(index_df),
@@ -1219,28 +2147,25 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                 status_code=200, mimetype="application/json"
             )
 
+        elif method == "GET" and not action and any(req.params.get(p) for p in ("from", "to", "group_by")):
+            # Any date window / grouping, answered from the activity cube
+            return activity_query(req)
+
         elif method == "GET" and user_param:
-            # Instant: read pre-computed user cache
+            # Instant: read pre-computed user cache (ETag / gzip aware)
             user_blob_path = f"{USER_CACHE_PATH_PREFIX}{user_param}.json"
             logging.info(f"Reading user cache: {user_blob_path}")
-            bc = _blob_client(user_blob_path)
-            if not bc.exists():
-                return func.HttpResponse(
-                    json.dumps({"error": f"Cache for user '{user_param}' not found. Trigger POST /refresh-users first."}),
-                    status_code=404, mimetype="application/json"
-                )
-            return func.HttpResponse(bc.download_blob().readall(), status_code=200, mimetype="application/json")
+            return _serve_cache_blob(
+                req, user_blob_path,
+                f"Cache for user '{user_param}' not found. Trigger POST /refresh-users first."
+            )
 
         elif method == "GET" and not action:
-            # Instant: read 10-day summary cache
+            # Instant: read 10-day summary cache (ETag / gzip aware)
             logging.info(f"Reading 10-day summary cache: {SUMMARY_BLOB_PATH}")
-            bc = _blob_client(SUMMARY_BLOB_PATH)
-            if not bc.exists():
-                return func.HttpResponse(
-                    json.dumps({"error": "10-day summary cache not found. Trigger POST /refresh first."}),
-                    status_code=404, mimetype="application/json"
-                )
-            return func.HttpResponse(bc.download_blob().readall(), status_code=200, mimetype="application/json")
+            return _serve_cache_blob(
+                req, SUMMARY_BLOB_PATH, "10-day summary cache not found. Trigger POST /refresh first."
+            )
 
         else:
             return func.HttpResponse(
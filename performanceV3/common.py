@@ -1,4 +1,6 @@
-from typing import List, Set, Tuple
+from typing import Iterable, List, Set, Tuple
+import numpy as np
+import pandas as pd
 
 # --- Constants ---
 
@@ -22,6 +24,7 @@ MANUAL_STATUSES = {"COPIED", "COPY", "NEW"}
 SENDING_STATUSES = {"DEC_DAT"}
 SYSTEM_USERS = {"BATCHPROC", "ADMIN", "SYSTEM", "BATCH_PROC"} # Unified system user identification
 CREATION_STATUSES = MANUAL_STATUSES | {"INTERFACE"}
+PRINCIPAL_FIELD = "PRINCIPAL"    # principal field from euchistory data
 
 # --- Helper Functions ---
 
@@ -127,3 +130,114 @@ def classify_file_activity(
     is_manual = has_manual_trigger and not is_automatic
     
     return is_manual, is_automatic
+
+
+def classify_file_activity_frame(
+    history_df: pd.DataFrame,
+    prefer_creation_status_owner: bool = False,
+    users: Iterable[str] = None
+) -> pd.DataFrame:
+    """
+    Frame-level classify_file_activity: classifies every (declaration, user)
+    pair of a whole history frame in one vectorized pass.
+
+    For each pair the result equals
+        classify_file_activity(
+            global_history=<declaration statuses>,
+            user_history=<user's statuses on the declaration>,
+            group_df=<declaration rows sorted by HISTORYDATETIME>,
+            target_user=<user>,
+            prefer_creation_status_owner=prefer_creation_status_owner)
+    including the BATCHPROC crediting rules. Rows are sorted once (stable), so
+    equal timestamps keep their frame order, and a tie between humans on
+    MODIFIED count goes to the first one to appear.
+
+    Args:
+        history_df: Rows with DECLARATIONID, USERCODE, HISTORY_STATUS, HISTORYDATETIME.
+        prefer_creation_status_owner: Same meaning as in classify_file_activity.
+        users: Only return pairs for these users (default: every user in the frame).
+
+    Returns:
+        DataFrame with one row per pair, sorted by DECLARATIONID then USERCODE:
+        DECLARATIONID, USERCODE, is_manual, is_automatic, owner
+        (owner = upper-cased user that "created" the declaration).
+    """
+    columns = ["DECLARATIONID", "USERCODE", "is_manual", "is_automatic", "owner"]
+    # rows without a declaration id belong to no declaration (groupby drops them too)
+    history_df = history_df[history_df["DECLARATIONID"].notna()]
+    if history_df.empty:
+        return pd.DataFrame(columns=columns)
+
+    s = history_df[["DECLARATIONID", "USERCODE", "HISTORY_STATUS", "HISTORYDATETIME"]].sort_values(
+        ["DECLARATIONID", "HISTORYDATETIME"], kind="mergesort"
+    ).reset_index(drop=True)
+    n = len(s)
+    codes, decl_ids = pd.factorize(s["DECLARATIONID"])
+    n_decls = len(decl_ids)
+    pos = np.arange(n)
+    user = s["USERCODE"].to_numpy(dtype=object)
+    user_up = s["USERCODE"].astype(str).str.upper()
+    status = s["HISTORY_STATUS"].to_numpy(dtype=object)
+    status_up = s["HISTORY_STATUS"].astype(str).str.upper()
+
+    is_human = ~user_up.isin(SYSTEM_USERS).to_numpy()
+    is_creation = status_up.isin(CREATION_STATUSES).to_numpy()
+    user_up = user_up.to_numpy(dtype=object)
+
+    def _first(mask):
+        out = np.full(n_decls, None, dtype=object)
+        uniq, first_idx = np.unique(codes[mask], return_index=True)
+        out[uniq] = user_up[mask][first_idx]
+        return out
+
+    # Declaration-level facts
+    statuses = pd.Series(status)
+    has_creation = np.bincount(codes, weights=statuses.isin(CREATION_STATUSES), minlength=n_decls) > 0
+    has_interface = np.bincount(codes, weights=statuses == "INTERFACE", minlength=n_decls) > 0
+    has_human = np.bincount(codes, weights=is_human, minlength=n_decls) > 0
+
+    owner = _first(np.ones(n, dtype=bool))
+    if prefer_creation_status_owner:
+        creation_owner = _first(is_creation)
+        owner = np.where(pd.isna(creation_owner), owner, creation_owner)
+    owner_is_system = pd.Series(owner).isin(SYSTEM_USERS).to_numpy()
+
+    # Responsible human: most MODIFIED actions, else first human action
+    credited = _first(is_human)
+    human_mods = is_human & (status == "MODIFIED")
+    if human_mods.any():
+        ranked = pd.DataFrame({"code": codes[human_mods], "user": user[human_mods], "pos": pos[human_mods]}) \
+            .groupby(["code", "user"], sort=False)["pos"].agg(["size", "min"]).reset_index() \
+            .sort_values(["code", "size", "min"], ascending=[True, False, True], kind="mergesort") \
+            .drop_duplicates("code")
+        credited[ranked["code"].to_numpy()] = ranked["user"].astype(str).str.upper().to_numpy()
+
+    # Pair-level: one row per (declaration, user)
+    rows = pd.DataFrame({
+        "code": codes,
+        "USERCODE": user,
+        "manual": statuses.isin(MANUAL_STATUSES).to_numpy(),
+    })
+    if users is not None:
+        rows = rows[rows["USERCODE"].isin(set(users))]
+    pairs = rows.groupby(["code", "USERCODE"], sort=True)["manual"].any().reset_index()
+
+    pc = pairs["code"].to_numpy()
+    pu = pairs["USERCODE"].astype(str).str.upper().to_numpy(dtype=object)
+    target_is_system = pd.Series(pu).isin(SYSTEM_USERS).to_numpy()
+
+    # System-created file: automatic, credited to one human (or BATCHPROC alone)
+    system_credit = np.where(has_human[pc], ~target_is_system & (pu == credited[pc]), pu == "BATCHPROC")
+    # Human-created file: only the creator gets credit
+    is_owner = pu == owner[pc]
+    is_automatic = has_creation[pc] & np.where(owner_is_system[pc], system_credit, is_owner & has_interface[pc])
+    is_manual = (has_creation[pc] & ~owner_is_system[pc] & is_owner
+                 & pairs["manual"].to_numpy() & ~has_interface[pc])
+
+    return pd.DataFrame({
+        "DECLARATIONID": np.asarray(decl_ids, dtype=object)[pc],
+        "USERCODE": pairs["USERCODE"].to_numpy(),
+        "is_manual": is_manual.astype(bool),
+        "is_automatic": is_automatic.astype(bool),
+        "owner": owner[pc],
+    }, columns=columns)
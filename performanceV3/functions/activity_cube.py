@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+from performanceV3.common import PRINCIPAL_FIELD, SENDING_STATUSES
+from performanceV3.functions.user_metrics import pair_outcomes, sorted_history
+
+# One row per (user, day, principal, type, company). Principal / type / company
+# are the declaration's (first history row, like the index), so every measure
+# of a declaration lands in the same cell.
+CUBE_KEYS = ["USERCODE", "date", PRINCIPAL_FIELD, "TYPEDECLARATIONSSW", "ACTIVECOMPANY"]
+
+# Same definitions as the per-user caches (daily_data):
+#   manual_created / automatic_created  credited creations, on the user's first action day
+#   modifications                       MODIFIED rows by the user
+#   deletions                           FINAL DELETED event by the user
+#   sends                               DEC_DAT rows by the user
+#   duration_hours_sum / duration_count creation durations of credited creations
+CUBE_MEASURES = [
+    "manual_created", "automatic_created", "modifications", "deletions", "sends",
+    "duration_hours_sum", "duration_count",
+]
+
+# ?group_by= names → cube columns
+GROUP_BY_FIELDS = {
+    "user": "USERCODE",
+    "date": "date",
+    "principal": PRINCIPAL_FIELD,
+    "type": "TYPEDECLARATIONSSW",
+    "company": "ACTIVECOMPANY",
+}
+
+
+def build_activity_cube(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregate a cleaned history frame (see _clean_history_df) into the activity
+    cube, sorted by date then the other keys. Built from the same sorted
+    history and pair outcomes as compute_all_user_metrics.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=CUBE_KEYS + CUBE_MEASURES)
+
+    h = sorted_history(df)
+    s = h["s"]
+    first = h["first_pos"]
+    dims = {
+        col: (s[col].astype(str).to_numpy(dtype=object)[first] if col in s.columns
+              else np.full(len(first), "", dtype=object))
+        for col in (PRINCIPAL_FIELD, "TYPEDECLARATIONSSW", "ACTIVECOMPANY")
+    }
+
+    pairs = pair_outcomes(h)
+    credited = pairs[pairs["is_manual"] | pairs["is_automatic"]]
+    has_duration = credited["duration"].notna()
+    deleted = pairs[pairs["deleted"]]
+    codes, user, status, day = h["codes"], h["user"], h["status"], h["day"]
+    is_mod = h["is_mod"]
+    is_send = pd.Series(status).isin(SENDING_STATUSES).to_numpy()
+
+    events = pd.concat([
+        pd.DataFrame({
+            "USERCODE": credited["user"].to_numpy(dtype=object),
+            "date": credited["first_day"].to_numpy(dtype=object),
+            "code": credited["code"].to_numpy(),
+            "manual_created": credited["is_manual"].to_numpy(dtype=np.int64),
+            "automatic_created": (~credited["is_manual"]).to_numpy(dtype=np.int64),
+            "duration_hours_sum": credited["duration"].where(has_duration, 0.0).to_numpy(dtype=float),
+            "duration_count": has_duration.to_numpy(dtype=np.int64),
+        }),
+        pd.DataFrame({
+            "USERCODE": deleted["user"].to_numpy(dtype=object),
+            "date": h["final_day"][deleted["code"].to_numpy()],
+            "code": deleted["code"].to_numpy(),
+            "deletions": 1,
+        }),
+        pd.DataFrame({"USERCODE": user[is_mod], "date": day[is_mod], "code": codes[is_mod], "modifications": 1}),
+        pd.DataFrame({"USERCODE": user[is_send], "date": day[is_send], "code": codes[is_send], "sends": 1}),
+    ], ignore_index=True)
+
+    event_codes = events["code"].to_numpy()
+    for col, values in dims.items():
+        events[col] = values[event_codes]
+
+    cube = events.groupby(CUBE_KEYS, sort=True)[CUBE_MEASURES].sum().reset_index()
+    for col in CUBE_MEASURES:
+        if col != "duration_hours_sum":
+            cube[col] = cube[col].astype(np.int64)
+    cube = cube.sort_values(["date"] + [k for k in CUBE_KEYS if k != "date"], kind="mergesort")
+    return cube.reset_index(drop=True)[CUBE_KEYS + CUBE_MEASURES]
+
+
+def query_activity_cube(cube: pd.DataFrame, date_from: str = None, date_to: str = None,
+                        group_by=("user",), filters: dict = None) -> dict:
+    """
+    Answer a date-range query from the cube alone.
+
+    date_from / date_to: inclusive 'YYYY-MM-DD' bounds (open when None).
+    group_by: names from GROUP_BY_FIELDS (empty → a single total row).
+    filters: {group_by name: value} equality filters, e.g. {"user": "AMINA.SAISS"}.
+    Returns {"rows": [...], "totals": {...}}; rows carry avg_duration_hours.
+    """
+    unknown = [g for g in list(group_by) + list(filters or {}) if g not in GROUP_BY_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown group_by/filter field(s) {unknown}; use {sorted(GROUP_BY_FIELDS)}")
+
+    mask = np.ones(len(cube), dtype=bool)
+    if date_from:
+        mask &= (cube["date"] >= date_from).to_numpy()
+    if date_to:
+        mask &= (cube["date"] <= date_to).to_numpy()
+    for name, value in (filters or {}).items():
+        mask &= (cube[GROUP_BY_FIELDS[name]].astype(str) == str(value).upper()).to_numpy()
+    sel = cube[mask]
+
+    def _payload(sums: dict) -> dict:
+        out = {m: int(sums[m]) for m in CUBE_MEASURES if m != "duration_hours_sum"}
+        out["duration_hours_sum"] = round(float(sums["duration_hours_sum"]), 3)
+        out["avg_duration_hours"] = (
+            round(float(sums["duration_hours_sum"]) / out["duration_count"], 3) if out["duration_count"] else None
+        )
+        return out
+
+    totals = _payload(sel[CUBE_MEASURES].sum().to_dict())
+    cols = [GROUP_BY_FIELDS[g] for g in group_by]
+    if not cols:
+        return {"rows": [totals], "totals": totals}
+
+    grouped = sel.groupby(cols, sort=True)[CUBE_MEASURES].sum().reset_index()
+    rows = [
+        {**{g: rec[GROUP_BY_FIELDS[g]] for g in group_by}, **_payload(rec)}
+        for rec in grouped.to_dict("records")
+    ]
+    return {"rows": rows, "totals": totals}
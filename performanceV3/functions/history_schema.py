@@ -0,0 +1,66 @@
+import pandas as pd
+from performanceV3.common import PRINCIPAL_FIELD
+
+# Canonical schema of transformed euchistory parquets. Bump SCHEMA_VERSION when
+# to_canonical changes, so older files are normalised again at read time.
+#
+# The version travels in DataFrame.attrs, which pandas writes into the parquet
+# metadata (to_parquet) and restores on read (read_parquet).
+SCHEMA_VERSION = 1
+SCHEMA_ATTR = "euchistory_schema_version"
+
+# Upper-cased, stripped text columns. They stay plain str in memory: as
+# categoricals, value_counts/groupby would report unobserved values and break
+# count ties in category order instead of first appearance, which changes
+# modified_by / specialization results. Parquet dictionary-encodes them on disk.
+TEXT_COLUMNS = ["USERCODE", "HISTORY_STATUS", "ACTIVECOMPANY", "TYPEDECLARATIONSSW", PRINCIPAL_FIELD]
+
+
+def is_canonical(df: pd.DataFrame) -> bool:
+    return df.attrs.get(SCHEMA_ATTR) == SCHEMA_VERSION
+
+
+def _canonical_ids(ids: pd.Series) -> pd.Series:
+    # 123.0 (float column from JSON with gaps) -> "123"; missing stays missing
+    if pd.api.types.is_float_dtype(ids) and (ids.dropna() % 1 == 0).all():
+        ids = ids.astype("Int64")
+    return ids.astype(str).str.strip().where(ids.notna())
+
+
+def to_canonical(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Standardise raw euchistory rows once, the way every stage used to on read:
+      - TEXT_COLUMNS      -> .astype(str).str.strip().str.upper()
+      - HISTORYDATETIME   -> datetime64, timezone-naive (unparseable -> NaT)
+      - DECLARATIONID     -> str (missing stays NaN)
+    Rows are neither dropped nor reordered. The result is tagged with
+    SCHEMA_VERSION, so readers of a written parquet can skip this step.
+    """
+    df = df.copy()
+    for col in TEXT_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(str).str.strip().str.upper()
+
+    if "HISTORYDATETIME" in df.columns:
+        times = pd.to_datetime(df["HISTORYDATETIME"], errors="coerce", format="mixed")
+        if times.dt.tz is not None:
+            times = times.dt.tz_localize(None)
+        df["HISTORYDATETIME"] = times
+
+    if "DECLARATIONID" in df.columns:
+        df["DECLARATIONID"] = _canonical_ids(df["DECLARATIONID"])
+
+    df.attrs[SCHEMA_ATTR] = SCHEMA_VERSION
+    return df
+
+
+def ensure_canonical(df: pd.DataFrame) -> pd.DataFrame:
+    """Return df unchanged when it already carries the current schema version."""
+    return df if is_canonical(df) else to_canonical(df)
+
+
+def concat_canonical(frames: list) -> pd.DataFrame:
+    """Concat frames into one canonical frame (pd.concat drops attrs that differ)."""
+    df = pd.concat([ensure_canonical(f) for f in frames], ignore_index=True)
+    df.attrs[SCHEMA_ATTR] = SCHEMA_VERSION
+    return df
@@ -0,0 +1,260 @@
+import json
+import numpy as np
+import pandas as pd
+from performanceV3.common import MANUAL_STATUSES, SYSTEM_USERS, PRINCIPAL_FIELD
+
+# Column order of index/file_index.parquet (one row per DECLARATIONID).
+INDEX_COLUMNS = [
+    "DECLARATIONID", "first_seen", "last_seen", "principal", "company",
+    "users", "human_users", "has_interface", "has_manual_trigger",
+    "created_by", "modified_by", "file_creation_duration", "statuses",
+    "sending_count", "modification_count", "type",
+]
+
+# users / human_users are native list<string> columns (JSON strings in indexes
+# written before; see upgrade_index_frame).
+USER_LIST_COLUMNS = ["users", "human_users"]
+
+# Column order of index/declaration_locator.parquet (one row per DECLARATIONID).
+LOCATOR_COLUMNS = ["DECLARATIONID", "partitions"]
+
+
+def build_index_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Vectorized index engine: one row per DECLARATIONID.
+
+    df must already be standardised (upper-cased text columns, parsed
+    HISTORYDATETIME, no null DECLARATIONID/HISTORYDATETIME, DKM_VP removed).
+
+    Instead of re-sorting and iterating every declaration, the frame is sorted
+    ONCE by (DECLARATIONID, HISTORYDATETIME) and every column is derived from
+    groupby aggregations:
+      - created_by / company / principal / type  -> first row of each group
+      - modified_by   -> human with most MODIFIED rows (ties: first to appear),
+                         else first human row, else created_by
+      - file_creation_duration -> first MODIFIED row → first WRT_ENT row after
+                         it, located with a per-group cumulative "MODIFIED seen" mask
+
+    The sort is stable, so rows with equal timestamps keep their read order.
+    Output columns and values match build_index_frame_loop.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=INDEX_COLUMNS)
+
+    s = df.sort_values(["DECLARATIONID", "HISTORYDATETIME"], kind="mergesort").reset_index(drop=True)
+    decl = s["DECLARATIONID"]
+    status = s["HISTORY_STATUS"]
+    user = s["USERCODE"].astype(str)
+    is_human = ~user.isin(SYSTEM_USERS)
+    is_mod = status == "MODIFIED"
+
+    first_rows = s[~decl.duplicated()].set_index("DECLARATIONID")
+    out = pd.DataFrame(index=first_rows.index)
+
+    times = s.groupby("DECLARATIONID", sort=True)["HISTORYDATETIME"]
+    out["first_seen"] = times.min().dt.strftime("%Y-%m-%d")
+    out["last_seen"] = times.max().dt.strftime("%Y-%m-%d")
+
+    for out_col, src_col in (("principal", PRINCIPAL_FIELD), ("company", "ACTIVECOMPANY")):
+        out[out_col] = first_rows[src_col].astype(str) if src_col in s.columns else ""
+
+    # users / human_users: unique users in order of first appearance
+    pairs = pd.DataFrame({"DECLARATIONID": decl, "USERCODE": user, "human": is_human})
+    pairs = pairs[~pairs.duplicated(["DECLARATIONID", "USERCODE"])]
+    users = pairs.groupby("DECLARATIONID", sort=False)["USERCODE"].agg(list)
+    humans = pairs[pairs["human"]].groupby("DECLARATIONID", sort=False)["USERCODE"].agg(list)
+    out["users"] = users.reindex(out.index).to_list()
+    out["human_users"] = [h if isinstance(h, list) else [] for h in humans.reindex(out.index)]
+
+    flags = pd.DataFrame({
+        "DECLARATIONID": decl,
+        "has_interface": status == "INTERFACE",
+        "has_manual_trigger": status.isin(MANUAL_STATUSES),
+        "sending_count": status == "DEC_DAT",
+        "modification_count": is_mod,
+    }).groupby("DECLARATIONID", sort=True)
+    anys = flags[["has_interface", "has_manual_trigger"]].any()
+    sums = flags[["sending_count", "modification_count"]].sum().astype(int)
+    out["has_interface"] = anys["has_interface"].astype(bool)
+    out["has_manual_trigger"] = anys["has_manual_trigger"].astype(bool)
+
+    created_by = first_rows["USERCODE"].astype(str)
+    out["created_by"] = created_by
+
+    # modified_by: rank (count desc, first position asc) per declaration
+    pos = pd.Series(np.arange(len(s)), index=s.index)
+    human_mods = pd.DataFrame({"DECLARATIONID": decl, "USERCODE": user, "pos": pos})[is_human & is_mod]
+    top_modifier = pd.Series(dtype=object)
+    if not human_mods.empty:
+        per_user = human_mods.groupby(["DECLARATIONID", "USERCODE"], sort=False)["pos"].agg(["size", "min"]).reset_index()
+        per_user = per_user.sort_values(
+            ["DECLARATIONID", "size", "min"], ascending=[True, False, True], kind="mergesort"
+        )
+        top_modifier = per_user.drop_duplicates("DECLARATIONID").set_index("DECLARATIONID")["USERCODE"]
+    first_human = pd.Series(user[is_human].values, index=decl[is_human].values)
+    first_human = first_human[~first_human.index.duplicated()]
+    modified_by = top_modifier.reindex(out.index)
+    modified_by = modified_by.fillna(first_human.reindex(out.index))
+    out["modified_by"] = modified_by.fillna(created_by).astype(str)
+
+    # file_creation_duration: first MODIFIED → first WRT_ENT that follows it
+    mod_seen = is_mod.astype(np.int64).groupby(decl, sort=False).cumsum() > 0
+    session_start = s.loc[is_mod, ["DECLARATIONID", "HISTORYDATETIME"]].drop_duplicates("DECLARATIONID")
+    session_end = s.loc[(status == "WRT_ENT") & mod_seen, ["DECLARATIONID", "HISTORYDATETIME"]].drop_duplicates("DECLARATIONID")
+    start = session_start.set_index("DECLARATIONID")["HISTORYDATETIME"]
+    end = session_end.set_index("DECLARATIONID")["HISTORYDATETIME"]
+    delta = (end - start.reindex(end.index))
+    # Timedelta.total_seconds() works at microsecond resolution; match it exactly.
+    seconds = delta.values.astype("timedelta64[us]").astype(np.int64) / 1_000_000
+    durations = pd.Series([round(float(v) / 3600, 3) for v in seconds], index=end.index, dtype=float)
+    out["file_creation_duration"] = durations.reindex(out.index)
+
+    statuses = status.groupby(decl, sort=True).unique()
+    out["statuses"] = [json.dumps(sorted(v)) for v in statuses.reindex(out.index)]
+    out["sending_count"] = sums["sending_count"]
+    out["modification_count"] = sums["modification_count"]
+    out["type"] = first_rows["TYPEDECLARATIONSSW"].astype(str) if "TYPEDECLARATIONSSW" in s.columns else ""
+
+    out = out.reset_index()
+    return out[INDEX_COLUMNS]
+
+
+def build_index_frame_loop(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Reference implementation: per-declaration loop (original build-index logic).
+    Kept for parity checks and as a fallback (POST /build-index?engine=loop).
+    """
+    index_rows = []
+
+    for decl_id, group in df.groupby("DECLARATIONID"):
+        group = group.sort_values("HISTORYDATETIME")
+
+        statuses = group["HISTORY_STATUS"].tolist()
+
+        has_interface = "INTERFACE" in set(statuses)
+        has_manual_trigger = bool(MANUAL_STATUSES.intersection(set(statuses)))
+
+        first_seen = group["HISTORYDATETIME"].min().date().isoformat()
+        last_seen = group["HISTORYDATETIME"].max().date().isoformat()
+
+        company = str(group["ACTIVECOMPANY"].iloc[0]) if "ACTIVECOMPANY" in group.columns else ""
+        principal = str(group[PRINCIPAL_FIELD].iloc[0]) if PRINCIPAL_FIELD in group.columns else ""
+        type_val = str(group["TYPEDECLARATIONSSW"].iloc[0]) if "TYPEDECLARATIONSSW" in group.columns else ""
+
+        unique_users = list(group["USERCODE"].unique())
+        human_users = [u for u in unique_users if u not in SYSTEM_USERS]
+
+        # created_by = first user action
+        created_by = str(group.iloc[0]["USERCODE"])
+
+        # modified_by = human with most MODIFIED actions (fallback to first human, then created_by)
+        human_actions = group[~group["USERCODE"].isin(SYSTEM_USERS)]
+        mod_rows = human_actions[human_actions["HISTORY_STATUS"] == "MODIFIED"]
+        if not mod_rows.empty:
+            modified_by = str(mod_rows["USERCODE"].value_counts().idxmax())
+        elif not human_actions.empty:
+            modified_by = str(human_actions.iloc[0]["USERCODE"])
+        else:
+            modified_by = created_by
+
+        # file_creation_duration: hours from first MODIFIED → first WRT_ENT
+        session_start = None
+        file_creation_duration = None
+        for _, row in group.iterrows():
+            if row["HISTORY_STATUS"] == "MODIFIED" and session_start is None:
+                session_start = row["HISTORYDATETIME"]
+            elif row["HISTORY_STATUS"] == "WRT_ENT" and session_start is not None:
+                file_creation_duration = round((row["HISTORYDATETIME"] - session_start).total_seconds() / 3600, 3)
+                break
+
+        sending_count = int((group["HISTORY_STATUS"] == "DEC_DAT").sum())
+        modification_count = int((group["HISTORY_STATUS"] == "MODIFIED").sum())
+
+        index_rows.append({
+            "DECLARATIONID": decl_id,
+            "first_seen": first_seen,
+            "last_seen": last_seen,
+            "principal": principal,
+            "company": company,
+            "users": unique_users,
+            "human_users": human_users,
+            "has_interface": has_interface,
+            "has_manual_trigger": has_manual_trigger,
+            "created_by": created_by,
+            "modified_by": modified_by,
+            "file_creation_duration": file_creation_duration,
+            "statuses": json.dumps(list(set(statuses))),
+            "sending_count": sending_count,
+            "modification_count": modification_count,
+            "type": type_val,
+        })
+
+    return pd.DataFrame(index_rows)
+
+
+def merge_index_rows(index_df: pd.DataFrame, new_rows: pd.DataFrame, affected_ids) -> pd.DataFrame:
+    """
+    Replace the index rows of ``affected_ids`` with ``new_rows``.
+    Works for any frame keyed by DECLARATIONID (index or locator).
+
+    Affected declarations missing from ``new_rows`` (no rows left) are dropped.
+    The result is sorted by DECLARATIONID like a full build.
+    """
+    affected = {str(d) for d in affected_ids}
+    kept = index_df[~index_df["DECLARATIONID"].astype(str).isin(affected)]
+    if new_rows.empty:
+        return kept.reset_index(drop=True)
+    if kept.empty:
+        return new_rows.reset_index(drop=True)
+    merged = pd.concat([kept, new_rows[list(index_df.columns)]], ignore_index=True)
+    return merged.sort_values("DECLARATIONID", kind="mergesort").reset_index(drop=True)
+
+
+def upgrade_index_frame(index_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Index as currently written: users / human_users of an index built before
+    they became list columns are decoded from their JSON strings. Lists read
+    back from parquet (numpy arrays) are left as they are.
+    """
+    if index_df.empty:
+        return index_df
+    updates = {}
+    for col in USER_LIST_COLUMNS:
+        if col in index_df.columns and index_df[col].map(lambda v: isinstance(v, str)).any():
+            updates[col] = [json.loads(v) if isinstance(v, str) else v for v in index_df[col]]
+    return index_df.assign(**updates) if updates else index_df
+
+
+def build_users_directory(index_df: pd.DataFrame) -> list:
+    """
+    Every human user of the index with the first / last day they appear on a
+    declaration: [{"usercode", "first_seen", "last_seen"}] sorted by usercode.
+    """
+    if index_df.empty:
+        return []
+    pairs = index_df[["users", "first_seen", "last_seen"]].explode("users").dropna(subset=["users"])
+    pairs["usercode"] = pairs["users"].astype(str).str.upper().str.strip()
+    pairs = pairs[~pairs["usercode"].isin(SYSTEM_USERS | {"NAN", "NONE", ""})]
+    directory = pairs.groupby("usercode", sort=True).agg(
+        first_seen=("first_seen", "min"), last_seen=("last_seen", "max")
+    ).reset_index()
+    return directory.to_dict("records")
+
+
+def build_locator_frame(df: pd.DataFrame, source_col: str) -> pd.DataFrame:
+    """
+    Declaration → partitions locator: one row per DECLARATIONID (as str) with the
+    sorted list of source partitions (``source_col``) holding its rows.
+
+    Sorted by DECLARATIONID so, written in small row groups, the min/max column
+    statistics of each group identify the single group a lookup has to read.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=LOCATOR_COLUMNS)
+    pairs = pd.DataFrame({
+        "DECLARATIONID": df["DECLARATIONID"].astype(str),
+        "partitions": df[source_col].astype(str),
+    }).drop_duplicates()
+    pairs = pairs.sort_values(["DECLARATIONID", "partitions"], kind="mergesort")
+    locator = pairs.groupby("DECLARATIONID", sort=True)["partitions"].agg(list).reset_index()
+    return locator[LOCATOR_COLUMNS]
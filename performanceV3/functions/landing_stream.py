@@ -0,0 +1,101 @@
+import json
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from performanceV3.functions.history_schema import to_canonical
+
+# Duplicate landing rows are identified by these columns (first occurrence wins).
+DEDUP_COLS = ["DECLARATIONID", "USERCODE", "HISTORY_STATUS", "HISTORYDATETIME"]
+
+# Schema-metadata key where pandas keeps DataFrame.attrs (to_parquet/read_parquet),
+# so streamed files carry the canonical schema version like _write_parquet ones.
+_PANDAS_ATTRS_KEY = b"PANDAS_ATTRS"
+
+
+class SchemaDrift(Exception):
+    """Landing blobs of one day disagree on columns or column types."""
+
+
+def _stream_schema(df: pd.DataFrame) -> pa.Schema:
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    # An all-null column in the first blob would pin the type to null.
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            schema = schema.set(i, field.with_type(pa.string()))
+    metadata = dict(schema.metadata or {})
+    metadata[_PANDAS_ATTRS_KEY] = json.dumps(df.attrs).encode()
+    return schema.with_metadata(metadata)
+
+
+def _batched(frames, batch_rows: int):
+    """Concat consecutive frames until a batch holds at least ``batch_rows`` rows
+    (per-frame pandas overhead dominates on many small landing blobs)."""
+    batch, rows = [], 0
+    for df in frames:
+        batch.append(df)
+        rows += len(df)
+        if rows >= batch_rows:
+            yield len(batch), pd.concat(batch, ignore_index=True)
+            batch, rows = [], 0
+    if batch:
+        yield len(batch), pd.concat(batch, ignore_index=True)
+
+
+def write_canonical_stream(frames, sink, row_group_rows: int = 50_000) -> dict:
+    """
+    Write raw landing frames (an iterable, consumed once, in order) as ONE
+    canonical parquet to ``sink`` without ever holding the whole day in memory.
+
+    Frames are grouped into batches of about ``row_group_rows`` rows. Each
+    batch is standardised with to_canonical, deduplicated on DEDUP_COLS
+    against everything written before it through a sorted uint64 array of
+    row hashes (8 bytes per distinct kept row instead of the rows themselves)
+    and written as one row group through a ParquetWriter.
+
+    Same rows, order and first-occurrence dedup as concat → to_canonical →
+    drop_duplicates. Raises SchemaDrift when a batch does not match the schema
+    of the first one; the caller then falls back to the in-memory path.
+
+    Returns {"files_read", "rows_written"} (nothing is written when no frame
+    had rows).
+    """
+    seen = np.empty(0, dtype=np.uint64)
+    schema = None
+    writer = None
+    files_read = rows_written = 0
+
+    try:
+        for n_frames, raw in _batched(frames, row_group_rows):
+            files_read += n_frames
+            df = to_canonical(raw)
+            keys = [c for c in DEDUP_COLS if c in df.columns]
+            hashes = pd.util.hash_pandas_object(df[keys], index=False).to_numpy()
+            # first occurrence of each hash in the batch, then drop those seen before
+            uniq, first = np.unique(hashes, return_index=True)
+            at = np.searchsorted(seen, uniq)
+            new = seen[np.minimum(at, len(seen) - 1)] != uniq if len(seen) else np.ones(len(uniq), dtype=bool)
+            keep = np.zeros(len(df), dtype=bool)
+            keep[first[new]] = True
+            # two sorted runs: the stable sort merges them in linear time
+            seen = np.sort(np.concatenate([seen, uniq[new]]), kind="stable")
+            df = df[keep]
+            if df.empty:
+                continue
+
+            if schema is None:
+                schema = _stream_schema(df)
+                writer = pq.ParquetWriter(sink, schema)
+            if list(df.columns) != schema.names:
+                raise SchemaDrift(f"columns {list(df.columns)} != {schema.names}")
+            try:
+                table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+            except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                raise SchemaDrift(str(e)) from e
+            writer.write_table(table, row_group_size=len(table))
+            rows_written += len(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return {"files_read": files_read, "rows_written": rows_written}
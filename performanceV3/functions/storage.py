@@ -0,0 +1,232 @@
+import io
+import os
+from abc import ABC, abstractmethod
+import tempfile
+import threading
+from pathlib import Path
+
+from azure.core.exceptions import ResourceNotFoundError
+from azure.storage.blob import BlobServiceClient
+
+# Names of in-progress local writes (skipped by listings).
+_LOCAL_TMP_PREFIX = ".perfv3-tmp-"
+
+
+def _payload_size(data) -> int:
+    """Byte size of bytes / str / a seekable file object (from its position)."""
+    if isinstance(data, str):
+        return len(data.encode("utf-8"))
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return len(data)
+    pos = data.tell()
+    size = data.seek(0, io.SEEK_END) - pos
+    data.seek(pos)
+    return size
+
+
+class BlobStorage(ABC):
+    """
+    Storage used by performanceV3. Paths are '/'-separated blob names inside one
+    container (Azure) or one root directory (local), e.g.
+    "streamliner-analytics/transformed/year=2026/month=03/day=02/data.parquet".
+
+    Reads of a missing blob raise FileNotFoundError on every backend. A backend
+    implements every abstract method (it cannot be instantiated otherwise).
+    bytes_read / bytes_written count the payload moved through this object
+    since it was created (all requests of the worker; see telemetry).
+    """
+
+    def __init__(self):
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self._counter_lock = threading.Lock()
+
+    def _count(self, read: int = 0, written: int = 0):
+        with self._counter_lock:
+            self.bytes_read += read
+            self.bytes_written += written
+
+    @abstractmethod
+    def exists(self, path: str) -> bool:
+        """Whether the blob exists."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def size(self, path: str) -> int:
+        """Size of the blob in bytes."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def etag(self, path: str) -> str:
+        """Current ETag of the blob."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def read(self, path: str, offset: int = None, length: int = None) -> bytes:
+        """Whole blob, or ``length`` bytes from ``offset``."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def read_with_etag(self, path: str):
+        """(bytes, etag) of one consistent version of the blob."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def write(self, path: str, data):
+        """Create or overwrite a blob from bytes, str or a binary file object."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, path: str):
+        """Delete a blob; a missing blob is not an error."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_etags(self, prefix: str) -> dict:
+        """{name: etag} of every blob whose name starts with ``prefix``, by name."""
+        raise NotImplementedError
+
+
+class AzureBlobStorage(BlobStorage):
+    """Blobs of one container in an Azure Storage account."""
+
+    def __init__(self, connection_string: str, container: str):
+        super().__init__()
+        self._service = BlobServiceClient.from_connection_string(connection_string)
+        self._container = container
+
+    def _client(self, path: str):
+        return self._service.get_blob_client(self._container, path)
+
+    def exists(self, path):
+        return self._client(path).exists()
+
+    def size(self, path):
+        try:
+            return self._client(path).get_blob_properties().size
+        except ResourceNotFoundError as e:
+            raise FileNotFoundError(path) from e
+
+    def etag(self, path):
+        try:
+            return self._client(path).get_blob_properties().etag
+        except ResourceNotFoundError as e:
+            raise FileNotFoundError(path) from e
+
+    def read(self, path, offset=None, length=None):
+        try:
+            data = self._client(path).download_blob(offset=offset, length=length).readall()
+        except ResourceNotFoundError as e:
+            raise FileNotFoundError(path) from e
+        self._count(read=len(data))
+        return data
+
+    def read_with_etag(self, path):
+        try:
+            downloader = self._client(path).download_blob()
+            data = downloader.readall()
+        except ResourceNotFoundError as e:
+            raise FileNotFoundError(path) from e
+        self._count(read=len(data))
+        return data, downloader.properties.etag
+
+    def write(self, path, data):
+        size = _payload_size(data)
+        self._client(path).upload_blob(data, overwrite=True)
+        self._count(written=size)
+
+    def delete(self, path):
+        try:
+            self._client(path).delete_blob()
+        except ResourceNotFoundError:
+            pass
+
+    def list_etags(self, prefix):
+        container = self._service.get_container_client(self._container)
+        return {b.name: b.etag for b in container.list_blobs(name_starts_with=prefix)}
+
+
+class LocalStorage(BlobStorage):
+    """
+    Blobs as files under a root directory, with the container layout kept as
+    sub-directories (a downloaded copy of the container works as-is). Writes go
+    through a temp file + rename, so readers never see half-written blobs.
+    The ETag is derived from the file's mtime and size.
+    """
+
+    def __init__(self, root):
+        if not root:
+            raise ValueError("LocalStorage needs a root directory")
+        super().__init__()
+        self.root = Path(root).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _file(self, path: str) -> Path:
+        file = (self.root / path).resolve()
+        if not file.is_relative_to(self.root):
+            raise ValueError(f"Blob path escapes the storage root: {path}")
+        return file
+
+    @staticmethod
+    def _etag_of(stat) -> str:
+        return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+    def exists(self, path):
+        return self._file(path).is_file()
+
+    def size(self, path):
+        return self._file(path).stat().st_size
+
+    def etag(self, path):
+        return self._etag_of(self._file(path).stat())
+
+    def read(self, path, offset=None, length=None):
+        with open(self._file(path), "rb") as f:
+            if offset is not None:
+                f.seek(offset)
+            data = f.read(length if length is not None else -1)
+        self._count(read=len(data))
+        return data
+
+    def read_with_etag(self, path):
+        with open(self._file(path), "rb") as f:
+            stat = os.fstat(f.fileno())
+            data = f.read()
+        self._count(read=len(data))
+        return data, self._etag_of(stat)
+
+    def write(self, path, data):
+        file = self._file(path)
+        file.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        fd, tmp = tempfile.mkstemp(prefix=_LOCAL_TMP_PREFIX, dir=file.parent)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                if isinstance(data, (bytes, bytearray, memoryview)):
+                    out.write(data)
+                else:
+                    while chunk := data.read(1024 * 1024):
+                        out.write(chunk)
+                size = out.tell()
+            os.replace(tmp, file)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self._count(written=size)
+
+    def delete(self, path):
+        self._file(path).unlink(missing_ok=True)
+
+    def list_etags(self, prefix):
+        base = self._file(prefix.rsplit("/", 1)[0]) if "/" in prefix else self.root
+        if not base.is_dir():
+            return {}
+        found = {}
+        for file in base.rglob("*"):
+            if not file.is_file() or file.name.startswith(_LOCAL_TMP_PREFIX):
+                continue
+            name = file.relative_to(self.root).as_posix()
+            if name.startswith(prefix):
+                found[name] = self._etag_of(file.stat())
+        return dict(sorted(found.items()))
@@ -0,0 +1,135 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    # Present when the app exports to Application Insights through
+    # azure-monitor-opentelemetry; without a configured provider it is a no-op.
+    from opentelemetry import metrics as otel_metrics
+except ImportError:
+    otel_metrics = None
+
+# Interval of the RSS sampler running while a stage is timed.
+RSS_SAMPLE_S = 0.02
+
+# Stage fields exported as custom metrics (perfv3.stage.<field>, dimensions
+# route + stage).
+METRIC_FIELDS = ["duration_s", "bytes_downloaded", "bytes_uploaded", "rows_in", "rows_out", "peak_rss_mb"]
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_meter = otel_metrics.get_meter("performanceV3") if otel_metrics else None
+_histograms = {}
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB (Linux /proc; None elsewhere)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _RssSampler(threading.Thread):
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.start_mb = self.peak_mb = current_rss_mb()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(RSS_SAMPLE_S):
+            self._sample()
+
+    def _sample(self):
+        rss = current_rss_mb()
+        if rss is not None and (self.peak_mb is None or rss > self.peak_mb):
+            self.peak_mb = rss
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        self._sample()
+
+
+class RouteTelemetry:
+    """
+    Per-request timing of the phases of a POST route.
+
+        tel = RouteTelemetry("build-index", storage)
+        with tel.stage("download") as st:
+            df = ...
+            st["rows_out"] = len(df)
+        payload["telemetry"] = tel.finish()
+
+    Each stage records duration, bytes downloaded / uploaded through
+    ``storage`` (its worker-wide counters, so overlapping requests on one worker
+    are counted together), optional rows_in / rows_out set by the caller, and
+    the peak RSS sampled while it ran. finish() logs the report as one
+    "perfv3.telemetry" trace and records every stage as custom metrics.
+    """
+
+    def __init__(self, route: str, storage=None):
+        self.route = route
+        self._storage = storage
+        self._started = time.perf_counter()
+        self._stages = []
+        self._report = None
+
+    def _io(self):
+        if self._storage is None:
+            return 0, 0
+        return self._storage.bytes_read, self._storage.bytes_written
+
+    @contextmanager
+    def stage(self, name: str, **counts):
+        record = {"stage": name, **counts}
+        read0, written0 = self._io()
+        sampler = _RssSampler()
+        sampler.start()
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["duration_s"] = round(time.perf_counter() - started, 3)
+            sampler.stop()
+            read1, written1 = self._io()
+            record["bytes_downloaded"] = read1 - read0
+            record["bytes_uploaded"] = written1 - written0
+            if sampler.peak_mb is not None:
+                record["peak_rss_mb"] = round(sampler.peak_mb, 1)
+                record["rss_growth_mb"] = round(sampler.peak_mb - sampler.start_mb, 1)
+            self._stages.append(record)
+
+    def finish(self) -> dict:
+        """Report of all stages (emitted once; later calls return the same dict)."""
+        if self._report is not None:
+            return self._report
+        peaks = [s["peak_rss_mb"] for s in self._stages if "peak_rss_mb" in s]
+        self._report = {
+            "total_s": round(time.perf_counter() - self._started, 3),
+            "bytes_downloaded": sum(s["bytes_downloaded"] for s in self._stages),
+            "bytes_uploaded": sum(s["bytes_uploaded"] for s in self._stages),
+            "peak_rss_mb": max(peaks) if peaks else None,
+            "stages": self._stages,
+        }
+        self._emit()
+        return self._report
+
+    def _emit(self):
+        logging.info(f"perfv3.telemetry {json.dumps({'route': self.route, **self._report})}")
+        if _meter is None:
+            return
+        try:
+            for record in self._stages:
+                attributes = {"route": self.route, "stage": record["stage"]}
+                for field in METRIC_FIELDS:
+                    if record.get(field) is None:
+                        continue
+                    if field not in _histograms:
+                        _histograms[field] = _meter.create_histogram(f"perfv3.stage.{field}")
+                    _histograms[field].record(record[field], attributes=attributes)
+        except Exception as e:
+            logging.warning(f"perfv3.telemetry: custom metrics not recorded: {e}")
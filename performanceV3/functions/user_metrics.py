@@ -0,0 +1,491 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from performanceV3.common import classify_file_activity, classify_file_activity_frame, PRINCIPAL_FIELD
+from performanceV3.functions.history_schema import ensure_canonical
+
+
+# ---------------------------------------------------------------------------
+# Shared building blocks (per-user reference path AND all-users kernel)
+# ---------------------------------------------------------------------------
+
+def _user_profile(user_actions: pd.DataFrame) -> dict:
+    """Global user-level stats from all rows where the user is the actor."""
+    profile = {
+        "activity_by_hour": {},
+        "activity_days": {},
+        "company_specialization": {},
+        "principal_specialization": {},
+        "file_type_counts": {},
+    }
+    if user_actions.empty:
+        return profile
+
+    # activity_by_hour
+    hours = user_actions["HISTORYDATETIME"].dt.hour.value_counts().to_dict()
+    profile["activity_by_hour"] = {str(k): int(v) for k, v in sorted(hours.items())}
+
+    # activity_days (date → row count for that user)
+    day_counts = user_actions.groupby(
+        user_actions["HISTORYDATETIME"].dt.date
+    ).size().to_dict()
+    profile["activity_days"] = {d.isoformat(): int(c) for d, c in day_counts.items()}
+
+    # company_specialization (which company the user works for most)
+    if "ACTIVECOMPANY" in user_actions.columns:
+        comp_counts = user_actions["ACTIVECOMPANY"].value_counts().to_dict()
+        profile["company_specialization"] = {
+            k: int(v) for k, v in comp_counts.items()
+            if k not in ("NAN", "NONE", "", "DKM_VP")
+        }
+
+    # principal_specialization (which client/principal the user handles most)
+    if PRINCIPAL_FIELD in user_actions.columns:
+        principal_counts = user_actions[PRINCIPAL_FIELD].value_counts().to_dict()
+        profile["principal_specialization"] = {
+            k: int(v) for k, v in principal_counts.items()
+            if k not in ("NAN", "NONE", "", "0", "0.0")
+        }
+
+    # file_type_counts
+    if "TYPEDECLARATIONSSW" in user_actions.columns:
+        type_counts = user_actions["TYPEDECLARATIONSSW"].value_counts().to_dict()
+        profile["file_type_counts"] = {
+            k: int(v) for k, v in type_counts.items()
+            if k not in ("NAN", "NONE", "")
+        }
+
+    return profile
+
+
+def _new_accumulator() -> dict:
+    return {
+        # daily_data[date_str] accumulates what happened per day
+        "daily_data": defaultdict(lambda: {
+            "manual_files_created": 0,
+            "automatic_files_created": 0,
+            "modification_count": 0,
+            "modification_file_ids": [],
+            "manual_file_ids": [],
+            "automatic_file_ids": [],
+            "creation_durations": [],
+            "deleted_file_ids": [],
+            "deleted_own_file_ids": [],
+            "deleted_others_file_ids": [],
+        }),
+        "total_manual": 0,
+        "total_automatic": 0,
+        "total_modifications": 0,
+        "total_deletions": 0,
+        "total_deleted_own": 0,
+        "total_deleted_others": 0,
+        "total_deleted_manual": 0,
+        "total_deleted_automatic": 0,
+        "all_durations": [],
+    }
+
+
+def _record_declaration(acc: dict, decl_id, is_manual: bool, is_automatic: bool,
+                        first_user_action_date: str, mod_days, deletion_date, duration):
+    """
+    Fold one (user, declaration) outcome into the accumulator.
+
+    mod_days: [(date_str, n_user_MODIFIED_rows), ...] in date order.
+    deletion_date: date_str when the user performed the FINAL DELETED event, else None.
+    duration: hours from the user's first MODIFIED → next WRT_ENT, else None.
+    """
+    daily_data = acc["daily_data"]
+
+    if is_manual:
+        acc["total_manual"] += 1
+        daily_data[first_user_action_date]["manual_files_created"] += 1
+        daily_data[first_user_action_date]["manual_file_ids"].append(decl_id)
+    elif is_automatic:
+        acc["total_automatic"] += 1
+        daily_data[first_user_action_date]["automatic_files_created"] += 1
+        daily_data[first_user_action_date]["automatic_file_ids"].append(decl_id)
+
+    # Modification tracking per day
+    for day_str, n_mods in mod_days:
+        daily_data[day_str]["modification_count"] += n_mods
+        if decl_id not in daily_data[day_str]["modification_file_ids"]:
+            daily_data[day_str]["modification_file_ids"].append(decl_id)
+        acc["total_modifications"] += n_mods
+
+    # Deletion tracking: a file counts as deleted only when the FINAL
+    # status in the declaration history is DELETED. Credit goes only to
+    # the user who performed that final deletion event.
+    if deletion_date is not None:
+        acc["total_deletions"] += 1
+        daily_data[deletion_date]["deleted_file_ids"].append(decl_id)
+
+        if is_manual or is_automatic:
+            # User deleted their own file (they get credit for creating it)
+            acc["total_deleted_own"] += 1
+            daily_data[deletion_date]["deleted_own_file_ids"].append(decl_id)
+        else:
+            # User deleted someone else's file
+            acc["total_deleted_others"] += 1
+            daily_data[deletion_date]["deleted_others_file_ids"].append(decl_id)
+
+        if is_manual:
+            acc["total_deleted_manual"] += 1
+        elif is_automatic:
+            acc["total_deleted_automatic"] += 1
+
+    if duration is not None:
+        acc["all_durations"].append(duration)
+        if is_manual or is_automatic:
+            daily_data[first_user_action_date]["creation_durations"].append(duration)
+
+
+def _assemble_user_metrics(username: str, profile: dict, acc: dict) -> dict:
+    """Build the usersV3/<user>.json payload from the profile and accumulator."""
+    activity_by_hour = profile["activity_by_hour"]
+    activity_days = profile["activity_days"]
+    total_manual = acc["total_manual"]
+    total_automatic = acc["total_automatic"]
+    total_modifications = acc["total_modifications"]
+    all_durations = acc["all_durations"]
+
+    # -----------------------------------------------------------------------
+    # Build daily_metrics list
+    # -----------------------------------------------------------------------
+    total_files_handled = total_manual + total_automatic
+
+    daily_metrics = []
+    for date_str, data in sorted(acc["daily_data"].items()):
+        durations = data["creation_durations"]
+        avg_time = round(sum(durations) / len(durations), 3) if durations else None
+        day_total = data["manual_files_created"] + data["automatic_files_created"]
+        daily_metrics.append({
+            "date": date_str,
+            "manual_files_created": data["manual_files_created"],
+            "automatic_files_created": data["automatic_files_created"],
+            "modification_count": data["modification_count"],
+            "modification_file_ids": data["modification_file_ids"],
+            "total_files_handled": day_total,
+            "avg_creation_time": avg_time,
+            "manual_file_ids": data["manual_file_ids"],
+            "automatic_file_ids": data["automatic_file_ids"],
+            "deleted_file_ids": data["deleted_file_ids"],
+            "deleted_own_file_ids": data["deleted_own_file_ids"],
+            "deleted_others_file_ids": data["deleted_others_file_ids"],
+        })
+
+    # -----------------------------------------------------------------------
+    # Summary
+    # -----------------------------------------------------------------------
+    avg_creation_time = (
+        round(sum(all_durations) / len(all_durations), 3) if all_durations else None
+    )
+
+    days_with_files = [d for d in daily_metrics if d["total_files_handled"] > 0]
+    days_active = len(set(activity_days.keys()))
+    avg_files_per_day = (
+        round(total_files_handled / len(days_with_files), 2) if days_with_files else 0
+    )
+
+    most_productive_day = None
+    if days_with_files:
+        most_productive_day = max(
+            days_with_files, key=lambda x: x["total_files_handled"]
+        )["date"]
+
+    # Inactivity days (working days between first and last active date with no activity)
+    inactivity_days = []
+    if activity_days:
+        from_date = datetime.strptime(min(activity_days.keys()), "%Y-%m-%d").date()
+        to_date = datetime.strptime(max(activity_days.keys()), "%Y-%m-%d").date()
+        curr = from_date
+        while curr <= to_date:
+            if curr.isoformat() not in activity_days and curr.weekday() < 5:
+                inactivity_days.append(curr.isoformat())
+            curr += timedelta(days=1)
+
+    hour_with_most_activity = None
+    if activity_by_hour:
+        hour_with_most_activity = int(
+            max(activity_by_hour, key=lambda h: activity_by_hour[h])
+        )
+
+    modifications_per_file = (
+        round(total_modifications / total_files_handled, 2) if total_files_handled > 0 else 0
+    )
+    manual_percent = (
+        round((total_manual / total_files_handled) * 100, 2) if total_files_handled > 0 else 0
+    )
+    auto_percent = (
+        round((total_automatic / total_files_handled) * 100, 2) if total_files_handled > 0 else 0
+    )
+
+    return {
+        "user": username,
+        "daily_metrics": daily_metrics,
+        "summary": {
+            "total_manual_files": total_manual,
+            "total_automatic_files": total_automatic,
+            "total_files_handled": total_files_handled,
+            "total_modifications": total_modifications,
+            "avg_files_per_day": avg_files_per_day,
+            # avg_creation_time: hours from user's first MODIFIED → file's WRT_ENT
+            # e.g. 0.014 = 0.014h = ~50 seconds per file
+            "avg_creation_time": avg_creation_time,
+            "avg_creation_time_minutes": round(avg_creation_time * 60, 1) if avg_creation_time else None,
+            "most_productive_day": most_productive_day,
+            "file_type_counts": profile["file_type_counts"],
+            "activity_by_hour": activity_by_hour,
+            "company_specialization": profile["company_specialization"],
+            "principal_specialization": profile["principal_specialization"],
+            "days_active": days_active,
+            "modifications_per_file": modifications_per_file,
+            "manual_vs_auto_ratio": {
+                "manual_percent": manual_percent,
+                "automatic_percent": auto_percent,
+            },
+            "activity_days": activity_days,
+            "inactivity_days": inactivity_days,
+            "hour_with_most_activity": hour_with_most_activity,
+            "total_deletions": acc["total_deletions"],
+            "deleted_own_files": acc["total_deleted_own"],
+            "deleted_others_files": acc["total_deleted_others"],
+            "deleted_manual_files": acc["total_deleted_manual"],
+            "deleted_automatic_files": acc["total_deleted_automatic"],
+        },
+    }
+
+
+# ---------------------------------------------------------------------------
+# Per-user reference path
+# ---------------------------------------------------------------------------
+
+def compute_rich_user_metrics(df: pd.DataFrame, username: str) -> dict:
+    """
+    Compute full rich user metrics from raw history rows — same format as V2.
+
+    df = all rows for declarations this user is involved in (pre-filtered).
+    Produces:
+      - daily_metrics: per-day breakdown with file IDs
+      - summary: totals, activity_by_hour, company_specialization, inactivity_days, etc.
+    """
+    username_upper = username.upper()
+
+    # -----------------------------------------------------------------------
+    # Normalise the DataFrame
+    # -----------------------------------------------------------------------
+    # Skipped when df already carries the canonical schema (see history_schema)
+    df = ensure_canonical(df)
+    df = df.dropna(subset=["HISTORYDATETIME"])
+
+    profile = _user_profile(df[df["USERCODE"] == username_upper])
+
+    # -----------------------------------------------------------------------
+    # Per-declaration analysis
+    # -----------------------------------------------------------------------
+    acc = _new_accumulator()
+
+    for decl_id, group in df.groupby("DECLARATIONID"):
+        group = group.sort_values("HISTORYDATETIME")
+        user_decl_rows = group[group["USERCODE"] == username_upper]
+        if user_decl_rows.empty:
+            continue
+
+        global_statuses = group["HISTORY_STATUS"].tolist()
+        user_statuses = user_decl_rows["HISTORY_STATUS"].tolist()
+
+        # Classify manual / automatic using the shared logic
+        is_manual, is_automatic = classify_file_activity(
+            global_history=global_statuses,
+            user_history=user_statuses,
+            group_df=group,
+            target_user=username_upper,
+            prefer_creation_status_owner=True
+        )
+
+        # Date of user's FIRST action on this declaration
+        first_user_action_date = user_decl_rows["HISTORYDATETIME"].min().date().isoformat()
+
+        user_mods = user_decl_rows[user_decl_rows["HISTORY_STATUS"] == "MODIFIED"]
+        mod_days = [
+            (mod_date.isoformat(), len(mod_group))
+            for mod_date, mod_group in user_mods.groupby(user_mods["HISTORYDATETIME"].dt.date)
+        ]
+
+        final_row = group.iloc[-1]
+        deletion_date = None
+        if (str(final_row["HISTORY_STATUS"]).upper() == "DELETED"
+                and str(final_row["USERCODE"]).upper() == username_upper):
+            deletion_date = final_row["HISTORYDATETIME"].date().isoformat()
+
+        # File creation duration: user's first MODIFIED → global WRT_ENT
+        session_start = None
+        duration = None
+        for _, row in group.iterrows():
+            if row["HISTORY_STATUS"] == "MODIFIED" and session_start is None:
+                if row["USERCODE"] == username_upper:
+                    session_start = row["HISTORYDATETIME"]
+            elif row["HISTORY_STATUS"] == "WRT_ENT" and session_start is not None:
+                duration = round(
+                    (row["HISTORYDATETIME"] - session_start).total_seconds() / 3600, 3
+                )
+                break
+
+        _record_declaration(acc, decl_id, is_manual, is_automatic,
+                            first_user_action_date, mod_days, deletion_date, duration)
+
+    return _assemble_user_metrics(username, profile, acc)
+
+
+# ---------------------------------------------------------------------------
+# All-users kernel
+# ---------------------------------------------------------------------------
+
+def sorted_history(df: pd.DataFrame) -> dict:
+    """
+    Sort a cleaned history frame ONCE by (DECLARATIONID, HISTORYDATETIME) and
+    expose the per-row arrays shared by the all-users kernel and the activity
+    cube. The sort is stable, so equal timestamps keep their read order.
+    """
+    times = pd.to_datetime(df["HISTORYDATETIME"])
+    if times.dt.tz is not None:
+        times = times.dt.tz_localize(None)
+    df = df.assign(HISTORYDATETIME=times, DECLARATIONID=df["DECLARATIONID"].astype(str))
+
+    s = df.sort_values(["DECLARATIONID", "HISTORYDATETIME"], kind="mergesort").reset_index(drop=True)
+    n = len(s)
+    codes, decl_ids = pd.factorize(s["DECLARATIONID"])
+    status = s["HISTORY_STATUS"].astype(str).to_numpy(dtype=object)
+    day = s["HISTORYDATETIME"].dt.strftime("%Y-%m-%d").to_numpy(dtype=object)
+
+    # Final row of every declaration (deletion credit)
+    last_pos = np.r_[np.flatnonzero(codes[1:] != codes[:-1]), n - 1] if n else np.array([], dtype=int)
+    return {
+        "df": df,
+        "s": s,
+        "n": n,
+        "codes": codes,
+        "decl_values": np.asarray(decl_ids, dtype=object),
+        "user": s["USERCODE"].astype(str).to_numpy(dtype=object),
+        "status": status,
+        "t": s["HISTORYDATETIME"].to_numpy(),
+        "day": day,
+        "pos": np.arange(n),
+        "is_mod": status == "MODIFIED",
+        "first_pos": np.r_[0, last_pos[:-1] + 1] if n else np.array([], dtype=int),
+        "final_status": status[last_pos],
+        "final_user": s["USERCODE"].astype(str).to_numpy(dtype=object)[last_pos],
+        "final_day": day[last_pos],
+    }
+
+
+def pair_outcomes(h: dict, targets=None) -> pd.DataFrame:
+    """
+    One row per (user, declaration) pair of ``targets`` (all users when None),
+    sorted by user then declaration code: creation credit (is_manual /
+    is_automatic, classified with prefer_creation_status_owner=True), the
+    user's first action day, FINAL-deletion credit and the creation duration
+    (user's first MODIFIED → next WRT_ENT, hours, None if there is none).
+    """
+    n, codes, user, pos, t = h["n"], h["codes"], h["user"], h["pos"], h["t"]
+    in_scope = pd.Series(user).isin(targets).to_numpy() if targets is not None else np.ones(n, dtype=bool)
+    rows = pd.DataFrame({
+        "user": user[in_scope],
+        "code": codes[in_scope],
+        "pos": pos[in_scope],
+        "mod_pos": np.where(h["is_mod"][in_scope], pos[in_scope], n),
+    })
+    pairs = rows.groupby(["user", "code"], sort=True).agg(
+        first_pos=("pos", "min"), mod_pos=("mod_pos", "min"),
+    ).reset_index()
+
+    pu = pairs["user"].to_numpy(dtype=object)
+    pc = pairs["code"].to_numpy()
+
+    classified = classify_file_activity_frame(
+        h["s"], prefer_creation_status_owner=True, users=targets
+    ).set_index(["DECLARATIONID", "USERCODE"]).reindex(
+        pd.MultiIndex.from_arrays([h["decl_values"][pc], pu])
+    )
+    pairs["is_manual"] = classified["is_manual"].to_numpy(dtype=bool)
+    pairs["is_automatic"] = classified["is_automatic"].to_numpy(dtype=bool)
+    pairs["first_day"] = h["day"][pairs["first_pos"].to_numpy()]
+    pairs["deleted"] = (h["final_status"][pc] == "DELETED") & (h["final_user"][pc] == pu)
+
+    # Duration: user's first MODIFIED → first WRT_ENT after it in the same declaration
+    durations = np.full(len(pairs), None, dtype=object)
+    mod_pos = pairs["mod_pos"].to_numpy()
+    wrt_pos = pos[h["status"] == "WRT_ENT"]
+    has_mod = mod_pos < n
+    if len(wrt_pos) and has_mod.any():
+        nxt = np.searchsorted(wrt_pos, mod_pos[has_mod], side="right")
+        ok = nxt < len(wrt_pos)
+        end_pos = wrt_pos[np.minimum(nxt, len(wrt_pos) - 1)]
+        ok &= codes[end_pos] == pc[has_mod]
+        start_pos = mod_pos[has_mod]
+        # Timedelta.total_seconds() works at microsecond resolution; match it exactly.
+        seconds = (t[end_pos] - t[start_pos]).astype("timedelta64[us]").astype(np.int64) / 1_000_000
+        durations[np.flatnonzero(has_mod)[ok]] = [round(float(v) / 3600, 3) for v in seconds[ok]]
+    pairs["duration"] = durations
+    return pairs.drop(columns=["first_pos", "mod_pos"])
+
+
+def compute_all_user_metrics(df: pd.DataFrame, users) -> dict:
+    """
+    All users in one pass: returns {user: metrics} with the same payload as
+    compute_rich_user_metrics(rows of the user's declarations, user).
+
+    df must already be cleaned (see _clean_history_df in performanceV3): text
+    columns upper-cased, HISTORYDATETIME parsed, DKM_VP removed.
+
+    The frame is sorted ONCE by (DECLARATIONID, HISTORYDATETIME). Every pair is
+    classified by classify_file_activity_frame, and one (user, declaration)
+    groupby yields the first-action dates, modifications, deletions and
+    durations that the per-user loop derived with a re-sort + classify +
+    iterrows per pair. Only the JSON assembly is per user.
+
+    The sort is stable, so equal timestamps keep their read order, and a tie
+    between humans on MODIFIED count goes to the first one to appear.
+    """
+    users = list(users)
+    user_keys = {u: u.upper() for u in users}
+    targets = set(user_keys.values())
+    h = sorted_history(df)
+    pairs = pair_outcomes(h, targets)
+    user, codes, day, is_mod = h["user"], h["codes"], h["day"], h["is_mod"]
+    in_scope = pd.Series(user).isin(targets).to_numpy()
+
+    pu = pairs["user"].to_numpy(dtype=object)
+    pc = pairs["code"].to_numpy()
+    decl_values = h["decl_values"]
+    final_day = h["final_day"]
+    is_manual = pairs["is_manual"].to_numpy(dtype=bool)
+    is_automatic = pairs["is_automatic"].to_numpy(dtype=bool)
+    first_day = pairs["first_day"].to_numpy(dtype=object)
+    deleted = pairs["deleted"].to_numpy(dtype=bool)
+    durations = pairs["duration"].to_numpy(dtype=object)
+
+    # Modifications per (user, declaration, day), in declaration then date order
+    mods = pd.DataFrame({"user": user[in_scope & is_mod], "code": codes[in_scope & is_mod], "day": day[in_scope & is_mod]})
+    mod_days = defaultdict(list)
+    for (u, c, d), cnt in mods.groupby(["user", "code", "day"], sort=True).size().items():
+        mod_days[(u, c)].append((d, int(cnt)))
+
+    # -----------------------------------------------------------------------
+    # Fold pairs per user (declaration order) and assemble the payloads
+    # -----------------------------------------------------------------------
+    accs = defaultdict(_new_accumulator)
+    for u, c, man, auto, fday, dele, dur in zip(pu, pc, is_manual, is_automatic, first_day, deleted, durations):
+        _record_declaration(
+            accs[u], decl_values[c], bool(man), bool(auto), fday,
+            mod_days.get((u, c), ()), final_day[c] if dele else None, dur,
+        )
+
+    scoped = h["df"][h["df"]["USERCODE"].isin(targets)]
+    user_rows = scoped.groupby("USERCODE", sort=False).indices
+    results = {}
+    for u in users:
+        key = user_keys[u]
+        user_actions = scoped.iloc[user_rows[key]] if key in user_rows else scoped.iloc[0:0]
+        results[u] = _assemble_user_metrics(u, _user_profile(user_actions), accs[key])
+    return results
@@ -0,0 +1,85 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+
+def plan_shards(df: pd.DataFrame, users, n_shards: int) -> list:
+    """
+    Split ``users`` into at most ``n_shards`` shards of similar work.
+
+    A user's cost is the number of rows of the declarations they touched (what
+    compute_all_user_metrics has to look at for them). Users are placed
+    largest first on the least loaded shard. Each shard comes with the sorted
+    positions of the rows its users need — every row of every declaration one
+    of them touched — so rows keep their read order (tie-breaks unchanged).
+
+    Returns [(users, row positions)], empty shards dropped.
+    """
+    users = list(users)
+    decl_codes, _ = pd.factorize(df["DECLARATIONID"])
+    rows_per_decl = np.bincount(decl_codes)
+    touched = (
+        pd.DataFrame({"user": df["USERCODE"].to_numpy(), "code": decl_codes})
+        .drop_duplicates()
+    )
+    touched = touched[touched["user"].isin(set(users))]
+    decls_of = touched.groupby("user")["code"].unique()
+    cost = {u: int(rows_per_decl[decls_of[u]].sum()) if u in decls_of.index else 0 for u in users}
+
+    n_shards = max(1, min(n_shards, len(users)))
+    loads = [0] * n_shards
+    members = [[] for _ in range(n_shards)]
+    for user in sorted(users, key=lambda u: -cost[u]):
+        k = loads.index(min(loads))
+        members[k].append(user)
+        loads[k] += cost[user]
+
+    shards = []
+    for shard_users in members:
+        if not shard_users:
+            continue
+        codes = [decls_of[u] for u in shard_users if u in decls_of.index]
+        wanted = np.unique(np.concatenate(codes)) if codes else np.array([], dtype=decl_codes.dtype)
+        rows = np.flatnonzero(np.isin(decl_codes, wanted))
+        shards.append((sorted(shard_users), rows))
+    return shards
+
+
+def frame_to_shared_memory(df: pd.DataFrame):
+    """
+    Write ``df`` once as an Arrow IPC file into a new shared-memory block, so
+    worker processes map it instead of unpickling a copy each.
+
+    Returns (SharedMemory, size). The caller closes and unlinks the block.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.MockOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    size = sink.size()
+
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    try:
+        with pa.ipc.new_file(pa.FixedSizeBufferWriter(pa.py_buffer(shm.buf)), table.schema) as writer:
+            writer.write_table(table)
+    except BaseException:
+        shm.close()
+        shm.unlink()
+        raise
+    return shm, size
+
+
+def read_shared_rows(name: str, size: int, rows) -> pd.DataFrame:
+    """Rows at ``rows`` of a frame written by frame_to_shared_memory (worker side)."""
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        buf = pa.py_buffer(shm.buf[:size])
+        table = pa.ipc.open_file(buf).read_all()  # zero-copy view of the block
+        df = table.take(pa.array(rows)).to_pandas()
+        # the views must be gone before the mapping can be closed
+        del table, buf
+    finally:
+        shm.close()
+    return df
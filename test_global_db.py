@@ -0,0 +1,189 @@
+"""
+global_db reference data - offline parity tests.
+Indexed lookups must agree with the plain scans they replace.
+
+Usage:
+    python -m pytest -q test_global_db.py
+    python test_global_db.py
+"""
+
+from global_db.countries.countries import countries
+from global_db.countries.functions import get_countries
+from global_db.countries.functions import get_abbreviation_by_country, match_countries
+from global_db.functions.numbers.number_format import classify_number, classify_numbers, detect_column_format, detect_format, parse_number, parse_numbers
+from global_db.functions.reference import TrigramIndex, normalize_name
+from global_db.functions.snapshots import TABLES, _import_table, build_snapshot, load_table, read_snapshot
+from global_db.plda.bigData import bigData
+from global_db.plda.store import ContainerStore
+from global_db.ports.data import ports
+from global_db.ports.functions import get_port_country_code, get_ports, resolve_port, resolve_ports
+
+
+def _scan_abbreviation(country_name):
+    # the linear, case-folded scan every extractor used to do
+    for entry in countries:
+        if entry["country"].lower() == country_name.lower():
+            return entry["abbreviation"]
+    return country_name
+
+
+def test_country_index_agrees_with_scan():
+    names = [e["country"] for e in countries]
+    for name in names + [n.upper() for n in names] + ["Atlantis", "", "Nowhere Land"]:
+        assert get_abbreviation_by_country(name) == _scan_abbreviation(name), name
+    assert get_abbreviation_by_country(None) is None
+
+
+def test_country_aliases_codes_and_fuzzy_matches():
+    assert get_abbreviation_by_country("  BELGIË ") == "BE"
+    assert get_abbreviation_by_country("Unit. Arab Emir.") == "AE"
+    assert get_abbreviation_by_country("Côte d'Ivoire") == "CI"
+    assert get_abbreviation_by_country("de") == "DE"
+    assert get_abbreviation_by_country("Germny") == "Germny"
+    assert get_abbreviation_by_country("Germny", fuzzy=True) == "DE"
+    assert match_countries("Netherlnds", limit=1)[0][0] == "NL"
+    assert match_countries("zzzz") == []
+
+
+def test_trigram_index_ranks_closest_name_first():
+    index = TrigramIndex([(normalize_name(n), n) for n in ["Antwerp", "Antwerpen", "Amsterdam", "Rotterdam"]])
+    assert [value for value, _, _ in index.search("antwerp", min_score=0.3)][:2] == ["Antwerp", "Antwerpen"]
+    assert index.search("rotterdm")[0][0] == "Rotterdam"
+
+
+def test_container_store_matches_bigdata_scan(tmp_path):
+    store = ContainerStore(str(tmp_path / "plda.sqlite3"))
+    for entry in bigData:
+        expected = [e for e in bigData if e["container"].lower() == entry["container"].lower()]
+        assert store.find(entry["container"].lower()) == expected
+    assert store.find("NOPE0000000") == []
+
+    store.append({"container": "ABCU1234567", "package": 3, "net": 10.5, "gross": 12})
+    store.append({"container": "abcu1234567", "package": 4, "net": 11, "gross": 13})
+    assert [e["package"] for e in ContainerStore(store.path).find(" ABCU1234567 ")] == [3, 4]
+    try:
+        store.append({"container": "ABCU7654321"})
+        raise AssertionError("an entry missing fields must be rejected")
+    except ValueError:
+        pass
+    assert store.find("ABCU7654321") == []
+
+
+def test_container_store_reseeds_when_bigdata_changes(tmp_path, monkeypatch):
+    path = str(tmp_path / "plda.sqlite3")
+    ContainerStore(path).append({"container": "ABCU1234567", "package": 3, "net": 10.5, "gross": 12})
+
+    # a later deploy adds a container to bigData.py
+    added = {"container": "NEWU0000001", "package": 1, "net": 2.0, "gross": 3.0}
+    monkeypatch.setattr("global_db.plda.store.load_table", lambda name: bigData + [added])
+    monkeypatch.setattr("global_db.plda.store._seed_digest", lambda: "changed")
+    store = ContainerStore(path)
+    assert store.find("newu0000001") == [added]
+    assert [e["package"] for e in store.find("ABCU1234567")] == [3]  # appended entry kept
+    entry = bigData[0]
+    assert store.find(entry["container"]) == [e for e in bigData if e["container"].lower() == entry["container"].lower()]
+
+    # same bigData: the file is reused as it is
+    store.append({"container": "ABCU1234567", "package": 4, "net": 11, "gross": 13})
+    assert [e["package"] for e in ContainerStore(path).find("ABCU1234567")] == [3, 4]
+
+
+def test_container_store_falls_back_to_memory(tmp_path):
+    # the deployed package is read-only: a store that cannot be created still answers
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    store = ContainerStore(str(blocker / "plda.sqlite3"))
+    entry = bigData[0]
+    assert store.find(entry["container"]) == [e for e in bigData if e["container"].lower() == entry["container"].lower()]
+    store.append({"container": "ABCU1234567", "package": 3, "net": 10.5, "gross": 12})
+    assert store.find("abcu1234567") == [{"container": "ABCU1234567", "package": 3, "net": 10.5, "gross": 12}]
+    assert not (blocker / "plda.sqlite3").exists()
+
+
+def test_port_resolver_agrees_with_scan_and_matches_variants():
+    for entry in ports:
+        scanned = next(p for p in get_ports() if p["Port"].lower() == entry["Port"].lower())
+        assert resolve_port(entry["Port"].lower()) is scanned
+    assert get_port_country_code("Atlantis") == ""
+    assert get_port_country_code(None) == ""
+
+    assert get_port_country_code("karachi") == "PK"
+    assert get_port_country_code("Port Qasim") == "PK"
+    assert get_port_country_code("hcmc") == "VN"
+    assert get_port_country_code("Chongqing") == "CN"
+    assert resolve_port("TIANJIN")["Port"] == "XINGANG/TIANJIN"
+    assert get_port_country_code("CIF KARACHI PAKISTAN") == "PK"
+    assert get_port_country_code("NHAVA SH") == "IN"
+    assert get_port_country_code("XIA") == ""  # XIAMEN or XIAN
+    assert get_port_country_code("Shangai") == ""
+    assert get_port_country_code("Shangai", fuzzy=True) == "CN"
+    assert [e and e["Country Code"] for e in resolve_ports(["busan", "BUSAN", "", "Pt. Klang"])] == ["KR", "KR", None, "MY"]
+
+
+def test_snapshots_are_current_and_match_sources():
+    # a failure here means a table was edited: python -m global_db.functions.snapshots
+    for name in TABLES:
+        assert read_snapshot(name) == _import_table(name), name
+        assert load_table(name) == _import_table(name), name
+    assert get_countries() == countries and get_ports() == ports
+
+
+def test_stale_snapshot_falls_back_to_source(tmp_path, monkeypatch):
+    monkeypatch.setattr("global_db.functions.snapshots.snapshot_path", lambda name: str(tmp_path / f"{name}.snapshot"))
+    assert read_snapshot("ports") is None  # missing
+    build_snapshot("ports")
+    assert read_snapshot("ports") == ports
+    monkeypatch.setattr("global_db.functions.snapshots._source_digest", lambda name: "edited")
+    assert read_snapshot("ports") is None
+    (tmp_path / "ports.snapshot").write_bytes(b"not a snapshot")
+    assert read_snapshot("ports") is None
+
+
+NUMBER_STRINGS = [
+    "2.089,34", "12,5", "2,089.34", "112.500", "1.996", "1,345.0", "17.280", "695,832", "1.234.567,891",
+    "€ 1.234,50 ", "1\xa0234,5", "1'234.5", "12.", "\t3,5\n", ".5", "0,001", "1234", "9" * 400,
+    "1.2.3", "1,2,3", "", "  ,", "abc", "-5", "1 2\n3", "١٢,٥",
+]
+
+
+def test_number_columns_match_scalar_functions():
+    import math
+    import random
+
+    import numpy as np
+    import pandas as pd
+
+    rng = random.Random(7)
+    values = NUMBER_STRINGS + ["".join(rng.choice("0123456789.,, '€\xa0") for _ in range(rng.randint(0, 9))) for _ in range(5000)]
+    assert classify_numbers(values) == [classify_number(v) for v in values]
+    for fmt in ("EU", "US"):
+        expected = [parse_number(v, fmt) for v in values]
+        got = parse_numbers(values, fmt).tolist()
+        assert all(g == e or (e is None and math.isnan(g)) for g, e in zip(got, expected)), fmt
+        for sample in (values[:9], values[9:40], values, ["1.234"], []):
+            assert detect_column_format(sample, fmt) == detect_format(sample, fmt)
+
+    mixed = [None, 3, 2.5, True, np.int64(-5), "1.234,5"]
+    assert np.isnan(parse_numbers(mixed)[[0, 4]]).all() and parse_numbers(mixed)[[1, 2, 3, 5]].tolist() == [3.0, 2.5, 1.0, 1234.5]
+    column = parse_numbers(pd.Series(["1.234,5", "x"], index=[4, 9], name="Gross"))
+    assert column.index.tolist() == [4, 9] and column.name == "Gross" and column[4] == 1234.5 and np.isnan(column[9])
+
+
+if __name__ == "__main__":
+    test_country_index_agrees_with_scan()
+    print("✅ country index agrees with scan")
+    test_country_aliases_codes_and_fuzzy_matches()
+    print("✅ country aliases, codes and fuzzy matches")
+    test_trigram_index_ranks_closest_name_first()
+    print("✅ trigram index ranks closest name first")
+    import pathlib, tempfile
+    test_container_store_matches_bigdata_scan(pathlib.Path(tempfile.mkdtemp()))
+    print("✅ container store matches bigData scan")
+    test_container_store_falls_back_to_memory(pathlib.Path(tempfile.mkdtemp()))
+    print("✅ container store falls back to memory")
+    test_port_resolver_agrees_with_scan_and_matches_variants()
+    print("✅ port resolver agrees with scan and matches variants")
+    test_snapshots_are_current_and_match_sources()
+    print("✅ snapshots are current and match sources")
+    test_number_columns_match_scalar_functions()
+    print("✅ number columns match scalar functions")
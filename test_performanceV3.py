@@ -0,0 +1,431 @@
+"""
+performanceV3 - offline parity tests.
+Runs against synthetic euchistory rows, no Azure access needed.
+
+Usage:
+    python -m pytest -q test_performanceV3.py
+    python test_performanceV3.py
+"""
+import io
+import json
+import random
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from performanceV3.common import classify_file_activity, classify_file_activity_frame
+from performanceV3.functions.activity_cube import build_activity_cube, query_activity_cube
+from performanceV3.functions.index_builder import (
+    build_index_frame, build_index_frame_loop, build_locator_frame, build_users_directory,
+    merge_index_rows, upgrade_index_frame,
+)
+from performanceV3.functions.history_schema import ensure_canonical, is_canonical, to_canonical
+from performanceV3.functions.landing_stream import DEDUP_COLS, write_canonical_stream
+from performanceV3.functions.storage import LocalStorage
+from performanceV3.functions.telemetry import RouteTelemetry
+from performanceV3.functions.user_metrics import compute_all_user_metrics, compute_rich_user_metrics
+from performanceV3.functions.user_shards import frame_to_shared_memory, plan_shards, read_shared_rows
+
+HUMANS = ["AMINA.SAISS", "SIMO.ONSI", "HIND.EZZAOUI", "AYA.HANNI", "MOURAD.ELBAHAZ"]
+COMPANIES = ["DKM", "DKM_BE", "DKM_VP"]
+TYPES = ["DMS_IMPORT", "IDMS_IMPORT", "DMS_EXPORT"]
+
+
+def make_history(n_decls=400, seed=7):
+    """Synthetic standardised history: unique timestamps within a declaration and
+    distinct per-human MODIFIED counts, so tie-breaking never decides a result."""
+    rng = random.Random(seed)
+    base = datetime(2026, 3, 2, 7, 0, 0)
+    rows = []
+    for i in range(n_decls):
+        decl_id = str(100000 + i)
+        t = base + timedelta(days=rng.randint(0, 40), minutes=rng.randint(0, 600))
+        company = rng.choice(COMPANIES)
+        type_val = rng.choice(TYPES)
+        principal = rng.choice(["ACME", "GLOBEX", "NAN"])
+        events = []
+
+        creator = "BATCHPROC" if rng.random() < 0.35 else rng.choice(HUMANS)
+        if rng.random() < 0.1:
+            events.append(("WRT_ENT", rng.choice(HUMANS + ["BATCHPROC"])))  # WRT_ENT before creation
+        if rng.random() > 0.05:
+            events.append((rng.choice(["INTERFACE", "NEW", "COPY", "COPIED"]), creator))
+
+        modifiers = rng.sample(HUMANS, rng.randint(0, 3))
+        mods = [u for k, u in enumerate(modifiers) for _ in range(len(modifiers) - k)]
+        rng.shuffle(mods)
+        if creator == "BATCHPROC" and rng.random() < 0.3:
+            mods = ["BATCHPROC"] * rng.randint(1, 2)
+        events += [("MODIFIED", u) for u in mods]
+        if rng.random() < 0.8:
+            events.append(("WRT_ENT", rng.choice(mods or [creator])))
+        if rng.random() < 0.6:
+            events.append(("DEC_DAT", rng.choice(mods or [creator])))
+        if rng.random() < 0.1:
+            events.append(("DELETED", rng.choice(HUMANS)))
+
+        for status, user in events:
+            t += timedelta(seconds=rng.randint(1, 7200), microseconds=rng.randint(0, 999999))
+            rows.append({
+                "DECLARATIONID": decl_id,
+                "USERCODE": user,
+                "HISTORY_STATUS": status,
+                "HISTORYDATETIME": t,
+                "ACTIVECOMPANY": company,
+                "TYPEDECLARATIONSSW": type_val,
+                "PRINCIPAL": principal,
+            })
+
+    df = pd.DataFrame(rows).sample(frac=1, random_state=seed).reset_index(drop=True)
+    df["HISTORYDATETIME"] = pd.to_datetime(df["HISTORYDATETIME"])
+    return df[df["ACTIVECOMPANY"] != "DKM_VP"]
+
+
+def test_index_engine_matches_loop():
+    df = make_history()
+    expected = build_index_frame_loop(df)
+    actual = build_index_frame(df)
+
+    assert list(actual.columns) == list(expected.columns)
+    assert len(actual) == len(expected)
+
+    # statuses is a JSON list built from a set in the loop — order is arbitrary
+    for col in ["statuses"]:
+        assert [set(json.loads(v)) for v in actual[col]] == [set(json.loads(v)) for v in expected[col]]
+    same = [c for c in expected.columns if c != "statuses"]
+    pd.testing.assert_frame_equal(
+        actual[same].reset_index(drop=True),
+        expected[same].reset_index(drop=True),
+        check_dtype=False,
+    )
+
+
+def test_incremental_merge_matches_full_build():
+    df = make_history()
+    cutoff = df["HISTORYDATETIME"].quantile(0.8)
+    old = df[df["HISTORYDATETIME"] < cutoff]
+    new = df[df["HISTORYDATETIME"] >= cutoff]
+
+    affected = set(new["DECLARATIONID"])
+    rebuilt = build_index_frame(df[df["DECLARATIONID"].isin(affected)])
+    merged = merge_index_rows(build_index_frame(old), rebuilt, affected)
+
+    pd.testing.assert_frame_equal(merged, build_index_frame(df))
+
+
+def test_compacted_row_order_keeps_index():
+    # compact-months rewrites a month sorted by (DECLARATIONID, HISTORYDATETIME)
+    df = make_history()
+    compacted = df.sort_values(["DECLARATIONID", "HISTORYDATETIME"], kind="mergesort")
+    pd.testing.assert_frame_equal(build_index_frame(compacted), build_index_frame(df))
+
+
+def test_incremental_locator_matches_full_build():
+    df = make_history()
+    df["_partition"] = df["HISTORYDATETIME"].dt.strftime("day=%Y-%m-%d")
+    cutoff = df["HISTORYDATETIME"].quantile(0.8)
+    old = df[df["HISTORYDATETIME"] < cutoff]
+    new = df[df["HISTORYDATETIME"] >= cutoff]
+
+    affected = set(new["DECLARATIONID"])
+    rebuilt = build_locator_frame(df[df["DECLARATIONID"].isin(affected)], "_partition")
+    merged = merge_index_rows(build_locator_frame(old, "_partition"), rebuilt, affected)
+    full = build_locator_frame(df, "_partition")
+
+    assert merged["DECLARATIONID"].tolist() == full["DECLARATIONID"].tolist()
+    assert merged["partitions"].tolist() == full["partitions"].tolist()
+    for decl_id, parts in zip(full["DECLARATIONID"], full["partitions"]):
+        assert parts == sorted(set(df.loc[df["DECLARATIONID"] == decl_id, "_partition"]))
+
+
+def test_users_directory_from_list_and_legacy_index():
+    index = build_index_frame(make_history())
+    stored = pd.read_parquet(io.BytesIO(index.to_parquet(index=False)))
+    legacy = index.assign(**{c: index[c].map(json.dumps) for c in ["users", "human_users"]})
+
+    expected = {}
+    for users, first, last in zip(index["users"], index["first_seen"], index["last_seen"]):
+        for u in users:
+            if u in HUMANS:
+                seen = expected.setdefault(u, [first, last])
+                seen[0], seen[1] = min(seen[0], first), max(seen[1], last)
+    expected = [{"usercode": u, "first_seen": f, "last_seen": l} for u, (f, l) in sorted(expected.items())]
+
+    assert upgrade_index_frame(legacy)["users"].tolist() == index["users"].tolist()
+    assert build_users_directory(index) == expected
+    assert build_users_directory(stored) == expected
+    assert build_users_directory(upgrade_index_frame(legacy)) == expected
+
+
+def test_canonical_schema_roundtrips_through_parquet():
+    raw = make_history(50).reset_index(drop=True)
+    raw["USERCODE"] = " " + raw["USERCODE"].str.lower()
+    raw["DECLARATIONID"] = raw["DECLARATIONID"].astype(float)
+    raw["HISTORYDATETIME"] = raw["HISTORYDATETIME"].dt.strftime("%Y-%m-%dT%H:%M:%S.%f")
+
+    canonical = to_canonical(raw)
+    assert canonical["USERCODE"].isin(HUMANS + ["BATCHPROC"]).all()
+    assert canonical["DECLARATIONID"].str.fullmatch(r"\d+").all()
+
+    buf = io.BytesIO()
+    canonical.to_parquet(buf, index=False)
+    read = pd.read_parquet(io.BytesIO(buf.getvalue()))
+    assert is_canonical(read)
+    assert ensure_canonical(read) is read
+    pd.testing.assert_frame_equal(read, canonical)
+
+
+def test_streamed_transform_matches_in_memory_transform():
+    raw = make_history(300)
+    raw["HISTORYDATETIME"] = raw["HISTORYDATETIME"].dt.strftime("%Y-%m-%dT%H:%M:%S.%f")
+    records = raw.to_dict("records")
+    # landing blobs with duplicates inside a blob and across blobs
+    blobs = [records[i:i + 40] + records[i:i + 3] + records[:2] for i in range(0, len(records), 40)]
+    frames = [pd.DataFrame(b) for b in blobs]
+
+    expected = to_canonical(pd.concat(frames, ignore_index=True)).drop_duplicates(subset=DEDUP_COLS)
+    expected = expected.reset_index(drop=True)
+
+    sink = io.BytesIO()
+    stats = write_canonical_stream(iter(frames), sink, row_group_rows=100)
+    streamed = pd.read_parquet(io.BytesIO(sink.getvalue()))
+
+    assert stats == {"files_read": len(frames), "rows_written": len(expected)}
+    assert is_canonical(streamed)
+    pd.testing.assert_frame_equal(streamed, expected)
+
+
+def test_all_users_kernel_matches_per_user_metrics():
+    df = make_history()
+    users = HUMANS + ["BATCHPROC", "NOBODY.HERE"]
+    actual = compute_all_user_metrics(df, users)
+
+    for user in users:
+        decl_ids = set(df.loc[df["USERCODE"] == user, "DECLARATIONID"])
+        expected = compute_rich_user_metrics(df[df["DECLARATIONID"].isin(decl_ids)], user)
+        assert json.dumps(actual[user], indent=2) == json.dumps(expected, indent=2), user
+
+
+def test_sharded_kernel_matches_single_pass():
+    df = make_history()
+    users = HUMANS + ["BATCHPROC"]
+    expected = compute_all_user_metrics(df, users)
+
+    shards = plan_shards(df, users, 3)
+    assert sorted(u for shard_users, _ in shards for u in shard_users) == sorted(users)
+    shm, size = frame_to_shared_memory(df)
+    try:
+        for shard_users, rows in shards:
+            actual = compute_all_user_metrics(read_shared_rows(shm.name, size, rows), shard_users)
+            for user in shard_users:
+                assert json.dumps(actual[user]) == json.dumps(expected[user]), user
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def test_activity_cube_matches_per_user_daily_metrics():
+    df = make_history()
+    cube = build_activity_cube(df)
+    users = HUMANS + ["BATCHPROC"]
+    metrics = compute_all_user_metrics(df, users)
+
+    rows = query_activity_cube(cube, group_by=("user", "date"))["rows"]
+    for user in users:
+        actual = {r["date"]: r for r in rows if r["user"] == user}
+        for day in metrics[user]["daily_metrics"]:
+            cell = actual.pop(day["date"], None) or {}
+            assert cell.get("manual_created", 0) == day["manual_files_created"], (user, day["date"])
+            assert cell.get("automatic_created", 0) == day["automatic_files_created"], (user, day["date"])
+            assert cell.get("modifications", 0) == day["modification_count"], (user, day["date"])
+        # cube-only days hold sends / deletions without any creation or modification
+        assert all(r["manual_created"] + r["automatic_created"] + r["modifications"] == 0 for r in actual.values())
+
+    window = query_activity_cube(cube, "2026-03-10", "2026-03-20", group_by=(), filters={"user": "amina.saiss"})
+    expected = [
+        d for d in metrics["AMINA.SAISS"]["daily_metrics"] if "2026-03-10" <= d["date"] <= "2026-03-20"
+    ]
+    assert window["totals"]["manual_created"] == sum(d["manual_files_created"] for d in expected)
+
+
+def test_local_storage_behaves_like_blob_storage(tmp_path):
+    store = LocalStorage(tmp_path)
+    store.write("base/day=2026-03-02/a.json", "[1, 2]")
+    store.write("base/day=2026-03-02/b.json", io.BytesIO(b"0123456789"))
+    store.write("base/day=2026-03-03/a.json", b"[]")
+
+    assert store.read("base/day=2026-03-02/b.json", offset=3, length=4) == b"3456"
+    assert store.size("base/day=2026-03-02/b.json") == 10
+    assert list(store.list_etags("base/day=2026-03-02/")) == ["base/day=2026-03-02/a.json", "base/day=2026-03-02/b.json"]
+    assert len(store.list_etags("base/day=2026-03")) == 3
+
+    data, etag = store.read_with_etag("base/day=2026-03-02/a.json")
+    assert (data, etag) == (b"[1, 2]", store.etag("base/day=2026-03-02/a.json"))
+    store.write("base/day=2026-03-02/a.json", "[1, 2, 3]")
+    assert store.etag("base/day=2026-03-02/a.json") != etag
+
+    store.delete("base/day=2026-03-03/a.json")
+    store.delete("base/day=2026-03-03/a.json")
+    assert not store.exists("base/day=2026-03-03/a.json")
+    for read in (store.read, store.etag, store.size):
+        try:
+            read("base/missing.json")
+            raise AssertionError("missing blob must raise FileNotFoundError")
+        except FileNotFoundError:
+            pass
+
+
+def test_storage_backend_must_implement_interface():
+    from performanceV3.functions.storage import BlobStorage
+
+    class Incomplete(BlobStorage):
+        def read(self, path, offset=None, length=None):
+            return b""
+
+    try:
+        Incomplete()
+        raise AssertionError("a backend missing methods must not instantiate")
+    except TypeError as e:
+        assert "write" in str(e)
+
+
+def test_route_telemetry_counts_stage_io(tmp_path):
+    store = LocalStorage(tmp_path)
+    tel = RouteTelemetry("test-route", store)
+    with tel.stage("upload", rows_in=3):
+        store.write("a/b.json", b"x" * 100)
+    with tel.stage("download") as st:
+        st["rows_out"] = len(store.read("a/b.json", offset=10, length=40))
+    report = tel.finish()
+
+    assert tel.finish() is report
+    assert [s["stage"] for s in report["stages"]] == ["upload", "download"]
+    upload, download = report["stages"]
+    assert (upload["bytes_uploaded"], upload["bytes_downloaded"], upload["rows_in"]) == (100, 0, 3)
+    assert (download["bytes_uploaded"], download["bytes_downloaded"], download["rows_out"]) == (0, 40, 40)
+    assert (report["bytes_uploaded"], report["bytes_downloaded"]) == (100, 40)
+    assert all(s["duration_s"] >= 0 for s in report["stages"])
+
+
+def test_frame_classifier_matches_per_pair_classifier():
+    df = make_history()
+    # a history row with no declaration id is skipped, as groupby skips it
+    orphan = df.iloc[[0]].assign(DECLARATIONID=float("nan"))
+    df = pd.concat([df.astype({"DECLARATIONID": object}), orphan], ignore_index=True)
+    for prefer in (False, True):
+        actual = classify_file_activity_frame(df, prefer_creation_status_owner=prefer)
+        assert len(actual) == df.groupby(["DECLARATIONID", "USERCODE"]).ngroups
+        groups = {d: g.sort_values("HISTORYDATETIME") for d, g in df.groupby("DECLARATIONID")}
+        for row in actual.itertuples(index=False):
+            group = groups[row.DECLARATIONID]
+            expected = classify_file_activity(
+                global_history=group["HISTORY_STATUS"].tolist(),
+                user_history=group.loc[group["USERCODE"] == row.USERCODE, "HISTORY_STATUS"].tolist(),
+                group_df=group,
+                target_user=row.USERCODE,
+                prefer_creation_status_owner=prefer,
+            )
+            assert (row.is_manual, row.is_automatic) == expected, (prefer, row)
+
+
+def test_blob_cache_evicts_least_recently_used(tmp_path, monkeypatch):
+    import performanceV3
+
+    store = LocalStorage(tmp_path)
+    for name in "abcd":
+        store.write(f"c/{name}.json", b"x" * 100)
+    monkeypatch.setattr(performanceV3, "storage", store)
+    monkeypatch.setattr(performanceV3, "_blob_cache", type(performanceV3._blob_cache)())
+    monkeypatch.setattr(performanceV3, "_blob_cache_bytes", 0)
+    monkeypatch.setattr(performanceV3, "BLOB_CACHE_MAX_BYTES", 250)
+
+    for name in "abac":  # a is used again before c arrives, so b goes
+        performanceV3._cached_blob(f"c/{name}.json", len)
+    assert list(performanceV3._blob_cache) == ["c/a.json", "c/c.json"]
+    assert performanceV3._blob_cache_bytes == 200
+
+    monkeypatch.setattr(performanceV3, "BLOB_CACHE_MAX_ENTRIES", 1)
+    performanceV3._cached_blob("c/d.json", len)
+    assert list(performanceV3._blob_cache) == ["c/d.json"]
+    performanceV3._forget_cached("c/d.json")
+    assert (len(performanceV3._blob_cache), performanceV3._blob_cache_bytes) == (0, 0)
+
+
+def test_intraday_batches_patch_summary_like_full_refresh(tmp_path, monkeypatch):
+    import performanceV3
+    from performanceV3 import _rebuild_10day_summary, ingest_intraday, SUMMARY_BLOB_PATH
+
+    class Today(datetime):
+        @classmethod
+        def utcnow(cls):
+            return datetime(2026, 3, 20, 18, 0)  # a Friday
+
+    store = LocalStorage(tmp_path)
+    monkeypatch.setattr(performanceV3, "storage", store)
+    monkeypatch.setattr(performanceV3, "datetime", Today)
+    monkeypatch.setattr(performanceV3, "_blob_cache", type(performanceV3._blob_cache)())
+    monkeypatch.setattr(performanceV3, "_blob_cache_bytes", 0)
+    today = Today.utcnow().date()
+    working_days = performanceV3._last_n_working_days(performanceV3.SUMMARY_DAYS)
+
+    df = make_history(1500)
+    day = df["HISTORYDATETIME"].dt.date
+    for d, rows in df[(day >= working_days[0]) & (day < today)].groupby(day):
+        performanceV3._write_parquet(to_canonical(rows), performanceV3._daily_parquet_path(d))
+    first_day = df.groupby("DECLARATIONID")["HISTORYDATETIME"].transform("min").dt.date
+    todays = df[day == today].sort_values("HISTORYDATETIME", kind="mergesort")
+    new = todays[first_day[todays.index] == today]
+    ongoing = todays.drop(new.index)
+    new_ids = sorted(set(new["DECLARATIONID"]))
+    half = new[new["DECLARATIONID"].isin(new_ids[: len(new_ids) // 2])]
+    batches = [ongoing.iloc[: len(ongoing) // 2], half, new.drop(half.index), ongoing.iloc[len(ongoing) // 2:]]
+    assert all(len(b) for b in batches)
+
+    class Request:
+        method, params, headers = "POST", {}, {}
+
+    modes = []
+    for i, batch in enumerate(batches):
+        records = batch.assign(HISTORYDATETIME=batch["HISTORYDATETIME"].dt.strftime("%Y-%m-%dT%H:%M:%S.%f"))
+        store.write(f"{performanceV3.LANDING_PREFIX}day={today}/blob-{i:03d}.json", json.dumps(records.to_dict("records")))
+        response = ingest_intraday(Request())
+        assert response.status_code == 200, response.get_body()
+        modes.append(json.loads(response.get_body())["mode"])
+        patched = json.loads(store.read(SUMMARY_BLOB_PATH))
+        _rebuild_10day_summary(working_days, RouteTelemetry("refresh", store))
+        assert patched == json.loads(store.read(SUMMARY_BLOB_PATH)), i
+    # batches 1 and 2 hold only declarations first seen today
+    assert modes == ["full", "incremental", "incremental", "incremental"]
+    assert sum(entry["daily_file_creations"][today.strftime("%d/%m")] for entry in patched) > 0
+
+
+if __name__ == "__main__":
+    test_index_engine_matches_loop()
+    print("✅ index engine matches loop")
+    test_incremental_merge_matches_full_build()
+    print("✅ incremental merge matches full build")
+    test_compacted_row_order_keeps_index()
+    print("✅ compacted row order keeps index")
+    test_incremental_locator_matches_full_build()
+    print("✅ incremental locator matches full build")
+    test_activity_cube_matches_per_user_daily_metrics()
+    print("✅ activity cube matches per-user daily metrics")
+    import pathlib, tempfile
+    test_local_storage_behaves_like_blob_storage(pathlib.Path(tempfile.mkdtemp()))
+    print("✅ local storage behaves like blob storage")
+    test_storage_backend_must_implement_interface()
+    print("✅ storage backend must implement interface")
+    test_route_telemetry_counts_stage_io(pathlib.Path(tempfile.mkdtemp()))
+    print("✅ route telemetry counts stage I/O")
+    test_frame_classifier_matches_per_pair_classifier()
+    print("✅ frame classifier matches per-pair classifier")
+    test_users_directory_from_list_and_legacy_index()
+    print("✅ users directory from list and legacy index")
+    test_canonical_schema_roundtrips_through_parquet()
+    print("✅ canonical schema roundtrips through parquet")
+    test_streamed_transform_matches_in_memory_transform()
+    print("✅ streamed transform matches in-memory transform")
+    test_all_users_kernel_matches_per_user_metrics()
+    print("✅ all-users kernel matches per-user metrics")
+    test_sharded_kernel_matches_single_pass()
+    print("✅ sharded kernel matches single pass")
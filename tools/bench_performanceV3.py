@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Benchmark the performanceV3 pipeline on synthetic euchistory data, locally.
+
+Generates realistic landing JSON (Logic App layout: landing/euchistory/day=.../*.json)
+into a local storage root, then runs every pipeline stage in order against the
+local storage backend (PERFORMANCEV3_STORAGE=local), each in a fresh process
+like a cold function instance:
+
+    transform          transform-daily-range (resumed until done)
+    index              build-index
+    index-incremental  build-index?mode=incremental   (nothing changed)
+    users              refresh-users
+    users-incremental  refresh-users?mode=incremental (nothing changed)
+    refresh            refresh (10-day summary; data ends today so it has work)
+    cube               build-cube
+    compact            compact-months
+
+Per stage it reports wall time, peak RSS of the stage process (and the part
+added by the stage itself) and input rows/sec. Results can be saved as a
+baseline and later runs compared against it; a stage slower or bigger than
+the baseline by more than --tolerance is flagged and the exit code is 1.
+
+Usage:
+    python tools/bench_performanceV3.py                          # small profile
+    python tools/bench_performanceV3.py --profile medium --save-baseline
+    python tools/bench_performanceV3.py --profile medium         # compare to baseline
+    python tools/bench_performanceV3.py --declarations 20000 --days 60 --batchproc-share 0.5
+
+Options:
+    --profile          small | medium | large (sizes below), overridden by:
+    --users --declarations --days --blobs-per-day
+    --batchproc-share  share of declarations created by BATCHPROC (default 0.35)
+    --interface-share  share of BATCHPROC creations that come in through INTERFACE
+                       (automatic); the rest are NEW/COPY/COPIED (default 0.7)
+    --duplicate-share  share of rows repeated in a later landing blob (default 0.01)
+    --end              last generated day (default today UTC), --seed (default 7)
+    --stages           comma-separated subset of the stages above
+    --root             storage root (default: a temp dir, removed afterwards unless --keep)
+    --baseline         baseline JSON file (default tools/bench_performanceV3_baseline.json)
+    --save-baseline    store this run as the baseline of its profile/parameters
+    --tolerance        allowed slowdown / growth vs baseline (default 0.25 = +25 %)
+    --output           also write this run's results as JSON
+"""
+import argparse
+import datetime as dt
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "bench_performanceV3_baseline.json"
+
+PROFILES = {
+    "small": {"users": 20, "declarations": 5_000, "days": 30, "blobs_per_day": 6},
+    "medium": {"users": 40, "declarations": 40_000, "days": 90, "blobs_per_day": 12},
+    "large": {"users": 60, "declarations": 200_000, "days": 365, "blobs_per_day": 24},
+}
+
+# (name, action, query params) — order matters, like tools/run_performanceV3.py
+STAGES = [
+    ("transform", "transform-daily-range", {"force": "true"}),
+    ("index", "build-index", {}),
+    ("index-incremental", "build-index", {"mode": "incremental"}),
+    ("users", "refresh-users", {}),
+    ("users-incremental", "refresh-users", {"mode": "incremental"}),
+    ("refresh", "refresh", {}),
+    ("cube", "build-cube", {}),
+    ("compact", "compact-months", {}),
+]
+
+COMPANIES = [("DKM", 0.6), ("DKM_BE", 0.3), ("DKM_VP", 0.1)]
+IMPORT_TYPES = ["DMS_IMPORT", "IDMS_IMPORT"]
+EXPORT_TYPES = ["DMS_EXPORT"]
+NEUTRAL_STATUSES = ["WRT_ENT", "ACC_DAT", "REL_TRA"]
+
+
+# ---------------------------------------------------------------------------
+# Synthetic landing data
+# ---------------------------------------------------------------------------
+
+def _users(n):
+    """(import team, export team): real user codes first, then synthetic ones."""
+    from performanceV3.common import EXPORT_USERS, IMPORT_USERS
+
+    humans_import = [u for u in IMPORT_USERS if u != "BATCHPROC"]
+    humans_export = [u for u in EXPORT_USERS if u != "BATCHPROC"]
+    n_import = max(1, round(n * len(humans_import) / (len(humans_import) + len(humans_export))))
+    n_export = max(1, n - n_import)
+    pad = lambda team, k, tag: team[:k] + [f"SYNTH.{tag}{i:03d}" for i in range(max(0, k - len(team)))]
+    return pad(humans_import, n_import, "IMP"), pad(humans_export, n_export, "EXP")
+
+
+def _workday_start(rng, days):
+    """A random working-hours timestamp, mostly on weekdays."""
+    while True:
+        day = rng.choice(days)
+        if day.weekday() < 5 or rng.random() < 0.1:
+            break
+    return dt.datetime.combine(day, dt.time(6)) + dt.timedelta(seconds=rng.randint(0, 13 * 3600))
+
+
+def _declaration_events(rng, team, batchproc_share, interface_share):
+    """(status, user) sequence of one declaration, like the real histories."""
+    events = []
+    by_batch = rng.random() < batchproc_share
+    creator = "BATCHPROC" if by_batch else rng.choice(team)
+    if by_batch and rng.random() < interface_share:
+        creation = "INTERFACE"
+    else:
+        creation = rng.choice(["NEW", "NEW", "COPY", "COPIED"])
+
+    if rng.random() < 0.05:
+        events.append(("WRT_ENT", rng.choice(team + ["BATCHPROC"])))
+    if rng.random() < 0.97:
+        events.append((creation, creator))
+
+    editors = rng.sample(team, min(len(team), rng.choice([0, 1, 1, 1, 2, 2, 3])))
+    if not editors and not by_batch:
+        editors = [creator]
+    mods = [user for user in editors for _ in range(max(1, int(rng.expovariate(1 / 3))))]
+    if by_batch and not editors:
+        mods = ["BATCHPROC"] * rng.randint(0, 2)
+    rng.shuffle(mods)
+    events += [("MODIFIED", user) for user in mods]
+
+    last = editors[-1] if editors else creator
+    for status in NEUTRAL_STATUSES:
+        if rng.random() < 0.5:
+            events.append((status, last))
+    if rng.random() < 0.6:
+        events.append(("DEC_DAT", last))
+    if rng.random() < 0.05:
+        events.append(("DELETED", rng.choice(team)))
+    return events
+
+
+def generate_landing(storage, landing_prefix, *, users, declarations, days, end, blobs_per_day,
+                     batchproc_share, interface_share, duplicate_share, seed):
+    """
+    Write synthetic landing JSON for ``days`` days ending at ``end`` into
+    ``storage`` (day=YYYY-MM-DD/partNN.json, time-ordered blobs). Returns
+    {"rows", "rows_per_day", "blobs"}.
+    """
+    rng = random.Random(seed)
+    import_team, export_team = _users(users)
+    principals = [f"PRINCIPAL{i:02d}" for i in range(50)]
+    day_list = [end - dt.timedelta(days=k) for k in range(days - 1, -1, -1)]
+
+    by_day = defaultdict(list)
+    for i in range(declarations):
+        is_import = rng.random() < 0.65
+        team = import_team if is_import else export_team
+        company = rng.choices([c for c, _ in COMPANIES], [w for _, w in COMPANIES])[0]
+        type_val = rng.choice(IMPORT_TYPES if is_import else EXPORT_TYPES)
+        principal = rng.choice(principals)
+        t = _workday_start(rng, day_list)
+        spans_days = rng.random() < 0.15
+
+        for status, user in _declaration_events(rng, team, batchproc_share, interface_share):
+            gap = rng.randint(1, 4 * 3600) if not spans_days else rng.randint(600, 30 * 3600)
+            t += dt.timedelta(seconds=gap, microseconds=rng.randint(0, 999_999))
+            if t.date() > end:
+                break
+            by_day[t.date()].append({
+                "DECLARATIONID": 5_000_000 + i,
+                "USERCODE": user,
+                "HISTORY_STATUS": status,
+                "HISTORYDATETIME": t.strftime("%Y-%m-%dT%H:%M:%S.%f"),
+                "ACTIVECOMPANY": company,
+                "TYPEDECLARATIONSSW": type_val,
+                "PRINCIPAL": principal,
+            })
+
+    rows = blobs = 0
+    rows_per_day = {}
+    for day, records in sorted(by_day.items()):
+        records.sort(key=lambda r: r["HISTORYDATETIME"])
+        size = -(-len(records) // blobs_per_day)
+        chunks = [records[k:k + size] for k in range(0, len(records), size)]
+        for k in range(1, len(chunks)):
+            # the Logic App occasionally re-sends rows already in an earlier blob
+            chunks[k] = chunks[k] + [r for r in chunks[k - 1] if rng.random() < duplicate_share]
+        for k, chunk in enumerate(chunks):
+            storage.write(f"{landing_prefix}day={day.isoformat()}/part{k:02d}.json", json.dumps(chunk))
+            blobs += 1
+        rows_per_day[day.isoformat()] = len(records)
+        rows += len(records)
+    return {"rows": rows, "rows_per_day": rows_per_day, "blobs": blobs}
+
+
+# ---------------------------------------------------------------------------
+# Stage runner (one fresh process per stage)
+# ---------------------------------------------------------------------------
+
+def _peak_rss_mb():
+    """Peak resident set size of this process in MB (None if unavailable)."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / 2 ** 20
+        except (ImportError, AttributeError):
+            return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+def _run_stage(root, action, params):
+    os.environ["PERFORMANCEV3_STORAGE"] = "local"
+    os.environ["PERFORMANCEV3_LOCAL_ROOT"] = root
+    import azure.functions as func
+    import performanceV3
+
+    rss_before = _peak_rss_mb()
+    started = time.perf_counter()
+    calls = 0
+    while True:
+        req = func.HttpRequest(
+            "POST", f"http://localhost/api/performanceV3/{action}",
+            params=params, route_params={"action": action}, body=b"",
+        )
+        resp = performanceV3.main(req)
+        calls += 1
+        body = json.loads(resp.get_body())
+        # transform-daily-range stops at its time budget; call again to resume
+        if resp.status_code != 200 or body.get("status") != "partial":
+            break
+    wall = time.perf_counter() - started
+    peak = _peak_rss_mb()
+    return {
+        "http_status": resp.status_code,
+        "status": body.get("status"),
+        "calls": calls,
+        "wall_s": round(wall, 3),
+        "peak_rss_mb": round(peak, 1) if peak is not None else None,
+        "stage_rss_mb": round(peak - rss_before, 1) if peak is not None else None,
+    }
+
+
+def run_stages(root, stages, start, end, rows, rows_per_day):
+    from performanceV3 import _last_n_working_days
+
+    ten_days = {d.isoformat() for d in _last_n_working_days(10)}
+    ten_day_rows = sum(n for day, n in rows_per_day.items() if day in ten_days)
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    for name, action, params in STAGES:
+        if name not in stages:
+            continue
+        if action == "transform-daily-range":
+            params = {**params, "start": start.isoformat(), "end": end.isoformat()}
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as ex:
+            result = ex.submit(_run_stage, root, action, params).result()
+        stage_rows = ten_day_rows if name == "refresh" else rows
+        result["rows"] = stage_rows
+        result["rows_per_s"] = round(stage_rows / result["wall_s"]) if result["wall_s"] else None
+        results[name] = result
+        print(f"  {name:<18} {result['wall_s']:>8.2f} s  {_fmt(result['peak_rss_mb']):>8} MB peak"
+              f"  {_fmt(result['stage_rss_mb']):>8} MB stage  {result['rows_per_s'] or 0:>10,} rows/s"
+              f"  [{result['http_status']} {result['status'] or ''}]", flush=True)
+        if result["http_status"] != 200:
+            sys.exit(f"[FAIL] {name}: HTTP {result['http_status']} — later stages depend on it.")
+    return results
+
+
+def _fmt(value):
+    return "n/a" if value is None else f"{value:.0f}"
+
+
+# ---------------------------------------------------------------------------
+# Baselines
+# ---------------------------------------------------------------------------
+
+def compare(results, baseline, tolerance):
+    """Lines describing each stage vs the baseline; (lines, regressed?)."""
+    lines, regressed = [], False
+    for name, now in results.items():
+        then = baseline.get(name)
+        if not then:
+            continue
+        for key, label in (("wall_s", "wall"), ("peak_rss_mb", "peak RSS")):
+            if not now.get(key) or not then.get(key):
+                continue
+            ratio = now[key] / then[key]
+            flag = ratio > 1 + tolerance
+            regressed |= flag
+            lines.append(f"  {name:<18} {label:<9} {then[key]:>9.2f} -> {now[key]:>9.2f}  "
+                         f"({ratio - 1:+.0%}){'  REGRESSION' if flag else ''}")
+    return lines, regressed
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark the performanceV3 pipeline on synthetic data.")
+    p.add_argument("--profile", choices=sorted(PROFILES), default="small")
+    p.add_argument("--users", type=int)
+    p.add_argument("--declarations", type=int)
+    p.add_argument("--days", type=int)
+    p.add_argument("--blobs-per-day", type=int)
+    p.add_argument("--batchproc-share", type=float, default=0.35)
+    p.add_argument("--interface-share", type=float, default=0.7)
+    p.add_argument("--duplicate-share", type=float, default=0.01)
+    p.add_argument("--end", type=dt.date.fromisoformat, default=dt.datetime.utcnow().date())
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--stages", help="comma-separated subset of: " + ",".join(s for s, _, _ in STAGES))
+    p.add_argument("--root", help="storage root (default: temp dir)")
+    p.add_argument("--keep", action="store_true", help="keep the generated storage root")
+    p.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    p.add_argument("--save-baseline", action="store_true")
+    p.add_argument("--tolerance", type=float, default=0.25)
+    p.add_argument("--output", type=Path)
+    args = p.parse_args()
+
+    sizes = dict(PROFILES[args.profile])
+    for key in sizes:
+        if getattr(args, key) is not None:
+            sizes[key] = getattr(args, key)
+    params = {
+        **sizes,
+        "batchproc_share": args.batchproc_share,
+        "interface_share": args.interface_share,
+        "duplicate_share": args.duplicate_share,
+        "seed": args.seed,
+    }
+    stages = {s.strip() for s in args.stages.split(",")} if args.stages else {s for s, _, _ in STAGES}
+    unknown = stages - {s for s, _, _ in STAGES}
+    if unknown:
+        sys.exit(f"ERROR: unknown --stages: {', '.join(sorted(unknown))}")
+
+    root = args.root or tempfile.mkdtemp(prefix="perfv3-bench-")
+    # before the first performanceV3 import: no Key Vault / Azure in this process either
+    os.environ["PERFORMANCEV3_STORAGE"] = "local"
+    os.environ["PERFORMANCEV3_LOCAL_ROOT"] = root
+    from performanceV3.functions.storage import LocalStorage
+
+    start = args.end - dt.timedelta(days=sizes["days"] - 1)
+    print(f"Profile : {args.profile} {json.dumps(params)}")
+    print(f"Storage : {root}")
+    try:
+        t = time.perf_counter()
+        landing_prefix = "streamliner-analytics/landing/euchistory/"
+        data = generate_landing(LocalStorage(root), landing_prefix, end=args.end, **params)
+        print(f"Data    : {data['rows']:,} rows in {data['blobs']:,} landing blobs, "
+              f"{start} -> {args.end} ({time.perf_counter() - t:.1f} s to generate)")
+        print("=" * 96)
+        results = run_stages(root, stages, start, args.end, data["rows"], data["rows_per_day"])
+    finally:
+        if not args.root and not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+    run = {
+        "profile": args.profile,
+        "params": params,
+        "machine": f"{platform.system()} {platform.machine()} / Python {platform.python_version()}",
+        "recorded_at": dt.datetime.utcnow().isoformat(timespec="seconds"),
+        "stages": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(run, indent=2))
+
+    baselines = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    key = args.profile if sizes == PROFILES[args.profile] else f"{args.profile}:{json.dumps(params, sort_keys=True)}"
+    previous = baselines.get(key)
+    regressed = False
+    print("=" * 96)
+    if previous and previous["params"] == params:
+        print(f"Baseline {key} ({previous['machine']}, {previous['recorded_at']}), tolerance +{args.tolerance:.0%}:")
+        lines, regressed = compare(results, previous["stages"], args.tolerance)
+        print("\n".join(lines) or "  no comparable stages")
+    else:
+        print(f"No baseline for {key} in {args.baseline}.")
+
+    if args.save_baseline:
+        baselines[key] = run
+        args.baseline.write_text(json.dumps(baselines, indent=2))
+        print(f"Saved baseline {key} -> {args.baseline}")
+
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,9 @@ Usage (PowerShell), in another terminal:
 The local host does NOT enforce function keys, so no key is needed locally. The
 function still reads/writes the real Azure Blob Storage + Key Vault, so make sure
 you are signed in for DefaultAzureCredential (e.g. `az login`) before starting it.
+To run against a local copy of the container instead (no credentials), set
+PERFORMANCEV3_STORAGE=local and PERFORMANCEV3_LOCAL_ROOT=<dir> in
+local.settings.json "Values" before `func start`.
 
 Other options:
     --end            defaults to today (UTC) if omitted